@@ -1,10 +1,21 @@
-import os
-import sys
-_current_dir = os.path.dirname(os.path.abspath(__file__))
-sys.path.append(_current_dir)
-import cafebot_pb2_grpc as pb2_grpc
-import cafebot_pb2 as pb2
-sys.path.remove(_current_dir)
-del _current_dir
-del os
-del sys
\ No newline at end of file
+'''
+generated messages (pb2) and gRPC stubs (pb2_grpc) of the cafebot service,
+both are imported on first access, so message-only clients never load grpc
+'''
+import importlib
+
+_SUBMODULES = {"pb2": "cafebot_pb2", "pb2_grpc": "cafebot_pb2_grpc"}
+
+__all__ = list(_SUBMODULES)
+
+
+def __getattr__(name: str):
+    if name not in _SUBMODULES:
+        raise AttributeError(f"module {__name__} has no attribute {name}")
+    module = importlib.import_module(f".{_SUBMODULES[name]}", __name__)
+    globals()[name] = module
+    return module
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -14,7 +14,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\rcafebot.proto\x12\x05robot\"\x07\n\x05\x45mpty\"2\n\x0eSimpleResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t2:\n\tMovements\x12-\n\x04park\x12\x0c.robot.Empty\x1a\x15.robot.SimpleResponse\"\x00\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\rcafebot.proto\x12\x05robot\"\x07\n\x05\x45mpty\" \n\x0bStopRequest\x12\x11\n\temergency\x18\x01 \x01(\x08\"2\n\x0eSimpleResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\"\xd4\x01\n\x0bMotionStats\x12\x13\n\x0bqueue_depth\x18\x01 \x01(\r\x12\x0f\n\x07running\x18\x02 \x01(\x08\x12\x16\n\x0elast_wait_time\x18\x03 \x01(\x01\x12\x16\n\x0emean_wait_time\x18\x04 \x01(\x01\x12\x15\n\rmax_wait_time\x18\x05 \x01(\x01\x12\x11\n\tcompleted\x18\x06 \x01(\x04\x12\x0e\n\x06\x66\x61iled\x18\x07 \x01(\x04\x12\x11\n\tcancelled\x18\x08 \x01(\x04\x12\x0f\n\x07\x65xpired\x18\t \x01(\x04\x12\x11\n\tpreempted\x18\n \x01(\x04\"8\n\x10TelemetryRequest\x12\x10\n\x08max_rate\x18\x01 \x01(\x02\x12\x12\n\nqueue_size\x18\x02 \x01(\r\"\xa3\x01\n\nRobotState\x12\x0b\n\x03seq\x18\x01 \x01(\x04\x12\x11\n\ttimestamp\x18\x02 \x01(\x01\x12\x0e\n\x06joints\x18\x03 \x03(\x02\x12\x10\n\x08tcp_pose\x18\x04 \x03(\x02\x12\x0c\n\x04mode\x18\x05 \x01(\x05\x12\r\n\x05state\x18\x06 \x01(\x05\x12\x12\n\nerror_code\x18\x07 \x01(\x05\x12\x11\n\twarn_code\x18\x08 \x01(\x05\x12\x0f\n\x07\x64ropped\x18\t \x01(\x04\"\x1d\n\x0bJointTarget\x12\x0e\n\x06values\x18\x01 \x03(\x02\"T\n\x0f\x43\x61rtesianTarget\x12\x10\n\x08position\x18\x01 \x03(\x02\x12\x13\n\x0borientation\x18\x02 \x03(\x02\x12\r\n\x05\x66rame\x18\x03 \x01(\t\x12\x0b\n\x03tcp\x18\x04 \x01(\t\"\x8e\x01\n\x08Waypoint\x12#\n\x05joint\x18\x01 \x01(\x0b\x32\x12.robot.JointTargetH\x00\x12+\n\tcartesian\x18\x02 \x01(\x0b\x32\x16.robot.CartesianTargetH\x00\x12\x10\n\x08velocity\x18\x03 \x01(\x02\x12\x14\n\x0c\x62lend_radius\x18\x04 \x01(\x02\x42\x08\n\x06target\"G\n\x11TrajectoryRequest\x12\"\n\twaypoints\x18\x01 \x03(\x0b\x32\x0f.robot.Waypoint\x12\x0e\n\x06linear\x18\x02 \x01(\x08\"J\n\x02TF\x12\x0e\n\x06parent\x18\x01 \x01(\t\x12\r\n\x05\x63hild\x18\x02 \x01(\t\x12\x13\n\x0btranslation\x18\x03 \x03(\x01\x12\x10\n\x08rotation\x18\x04 \x03(\x01\"E\n\x0bTFsResponse\x12\x0b\n\x03seq\x18\x01 \x01(\x04\x12\x11\n\ttimestamp\x18\x02 \x01(\x01\x12\x16\n\x03tfs\x18\x03 \x03(\x0b\x32\t.robot.TF\"\xb9\x01\n\rMotionRequest\x12\x1c\n\x04park\x18\x01 \x01(\x0b\x32\x0c.robot.EmptyH\x00\x12.\n\ntrajectory\x18\x02 \x01(\x0b\x32\x18.robot.TrajectoryRequestH\x00\x12\x39\n\x10servo_trajectory\x18\x04 \x01(\x0b\x32\x1d.robot.ServoTrajectoryRequestH\x00\x12\x15\n\rqueue_timeout\x18\x03 \x01(\x02\x42\x08\n\x06motion\"\x16\n\x08MotionId\x12\n\n\x02id\x18\x01 \x01(\t\"0\n\x11WaitMotionRequest\x12\n\n\x02id\x18\x01 \x01(\t\x12\x0f\n\x07timeout\x18\x02 \x01(\x02\"\xec\x01\n\x0cMotionStatus\x12\n\n\x02id\x18\x01 \x01(\t\x12\x0c\n\x04name\x18\x02 \x01(\t\x12(\n\x05state\x18\x03 \x01(\x0e\x32\x19.robot.MotionStatus.State\x12\x10\n\x08progress\x18\x04 \x01(\x02\x12\x0f\n\x07message\x18\x05 \x01(\t\x12\x13\n\x0bqueued_time\x18\x06 \x01(\x01\x12\x14\n\x0crunning_time\x18\x07 \x01(\x01\"J\n\x05State\x12\n\n\x06QUEUED\x10\x00\x12\x0b\n\x07RUNNING\x10\x01\x12\r\n\tSUCCEEDED\x10\x02\x12\n\n\x06\x46\x41ILED\x10\x03\x12\r\n\tCANCELLED\x10\x04\"=\n\rServoSettings\x12\x11\n\tcartesian\x18\x01 \x01(\x08\x12\x0c\n\x04rate\x18\x02 \x01(\x02\x12\x0b\n\x03tcp\x18\x03 \x01(\t\"D\n\nServoPoint\x12&\n\x08settings\x18\x01 \x01(\x0b\x32\x14.robot.ServoSettings\x12\x0e\n\x06values\x18\x02 \x03(\x02\"J\n\x16ServoTrajectoryRequest\x12\"\n\twaypoints\x18\x01 \x03(\x0b\x32\x0f.robot.Waypoint\x12\x0c\n\x04rate\x18\x02 \x01(\x02\"\xa5\x01\n\nServoStats\x12\x0e\n\x06points\x18\x01 \x01(\x04\x12\x0c\n\x04rate\x18\x02 \x01(\x02\x12\x10\n\x08\x64uration\x18\x03 \x01(\x01\x12\x14\n\x0cmissed_ticks\x18\x04 \x01(\x04\x12\x15\n\rmean_lateness\x18\x05 \x01(\x01\x12\x14\n\x0cmax_lateness\x18\x06 \x01(\x01\x12\r\n\x05\x64rift\x18\x07 \x01(\x01\x12\x15\n\rmax_send_time\x18\x08 \x01(\x01\x32\xcb\x05\n\tMovements\x12-\n\x04park\x12\x0c.robot.Empty\x1a\x15.robot.SimpleResponse\"\x00\x12\x33\n\x04stop\x12\x12.robot.StopRequest\x1a\x15.robot.SimpleResponse\"\x00\x12\x32\n\x0cmotion_stats\x12\x0c.robot.Empty\x1a\x12.robot.MotionStats\"\x00\x12;\n\ttelemetry\x12\x17.robot.TelemetryRequest\x1a\x11.robot.RobotState\"\x00\x30\x01\x12G\n\x12\x65xecute_trajectory\x12\x18.robot.TrajectoryRequest\x1a\x15.robot.SimpleResponse\"\x00\x12\x31\n\x0b\x63urrent_tfs\x12\x0c.robot.Empty\x1a\x12.robot.TFsResponse\"\x00\x12;\n\x0cstart_motion\x12\x14.robot.MotionRequest\x1a\x13.robot.MotionStatus\"\x00\x12\x35\n\x0bpoll_motion\x12\x0f.robot.MotionId\x1a\x13.robot.MotionStatus\"\x00\x12>\n\x0bwait_motion\x12\x18.robot.WaitMotionRequest\x1a\x13.robot.MotionStatus\"\x00\x12\x37\n\rcancel_motion\x12\x0f.robot.MotionId\x1a\x13.robot.MotionStatus\"\x00\x12\x38\n\x0cstream_servo\x12\x11.robot.ServoPoint\x1a\x11.robot.ServoStats\"\x00(\x01\x12\x46\n\x10servo_trajectory\x12\x1d.robot.ServoTrajectoryRequest\x1a\x11.robot.ServoStats\"\x00\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -23,8 +23,46 @@ if _descriptor._USE_C_DESCRIPTORS == False:
   DESCRIPTOR._options = None
   _globals['_EMPTY']._serialized_start=24
   _globals['_EMPTY']._serialized_end=31
-  _globals['_SIMPLERESPONSE']._serialized_start=33
-  _globals['_SIMPLERESPONSE']._serialized_end=83
-  _globals['_MOVEMENTS']._serialized_start=85
-  _globals['_MOVEMENTS']._serialized_end=143
+  _globals['_STOPREQUEST']._serialized_start=33
+  _globals['_STOPREQUEST']._serialized_end=65
+  _globals['_SIMPLERESPONSE']._serialized_start=67
+  _globals['_SIMPLERESPONSE']._serialized_end=117
+  _globals['_MOTIONSTATS']._serialized_start=120
+  _globals['_MOTIONSTATS']._serialized_end=332
+  _globals['_TELEMETRYREQUEST']._serialized_start=334
+  _globals['_TELEMETRYREQUEST']._serialized_end=390
+  _globals['_ROBOTSTATE']._serialized_start=393
+  _globals['_ROBOTSTATE']._serialized_end=556
+  _globals['_JOINTTARGET']._serialized_start=558
+  _globals['_JOINTTARGET']._serialized_end=587
+  _globals['_CARTESIANTARGET']._serialized_start=589
+  _globals['_CARTESIANTARGET']._serialized_end=673
+  _globals['_WAYPOINT']._serialized_start=676
+  _globals['_WAYPOINT']._serialized_end=818
+  _globals['_TRAJECTORYREQUEST']._serialized_start=820
+  _globals['_TRAJECTORYREQUEST']._serialized_end=891
+  _globals['_TF']._serialized_start=893
+  _globals['_TF']._serialized_end=967
+  _globals['_TFSRESPONSE']._serialized_start=969
+  _globals['_TFSRESPONSE']._serialized_end=1038
+  _globals['_MOTIONREQUEST']._serialized_start=1041
+  _globals['_MOTIONREQUEST']._serialized_end=1226
+  _globals['_MOTIONID']._serialized_start=1228
+  _globals['_MOTIONID']._serialized_end=1250
+  _globals['_WAITMOTIONREQUEST']._serialized_start=1252
+  _globals['_WAITMOTIONREQUEST']._serialized_end=1300
+  _globals['_MOTIONSTATUS']._serialized_start=1303
+  _globals['_MOTIONSTATUS']._serialized_end=1539
+  _globals['_MOTIONSTATUS_STATE']._serialized_start=1465
+  _globals['_MOTIONSTATUS_STATE']._serialized_end=1539
+  _globals['_SERVOSETTINGS']._serialized_start=1541
+  _globals['_SERVOSETTINGS']._serialized_end=1602
+  _globals['_SERVOPOINT']._serialized_start=1604
+  _globals['_SERVOPOINT']._serialized_end=1672
+  _globals['_SERVOTRAJECTORYREQUEST']._serialized_start=1674
+  _globals['_SERVOTRAJECTORYREQUEST']._serialized_end=1748
+  _globals['_SERVOSTATS']._serialized_start=1751
+  _globals['_SERVOSTATS']._serialized_end=1916
+  _globals['_MOVEMENTS']._serialized_start=1919
+  _globals['_MOVEMENTS']._serialized_end=2634
 # @@protoc_insertion_point(module_scope)
@@ -2,7 +2,7 @@
 """Client and server classes corresponding to protobuf-defined services."""
 import grpc
 
-import cafebot_pb2 as cafebot__pb2
+from . import cafebot_pb2 as cafebot__pb2
 
 
 class MovementsStub(object):
@@ -19,6 +19,61 @@ class MovementsStub(object):
                 request_serializer=cafebot__pb2.Empty.SerializeToString,
                 response_deserializer=cafebot__pb2.SimpleResponse.FromString,
                 )
+        self.stop = channel.unary_unary(
+                '/robot.Movements/stop',
+                request_serializer=cafebot__pb2.StopRequest.SerializeToString,
+                response_deserializer=cafebot__pb2.SimpleResponse.FromString,
+                )
+        self.motion_stats = channel.unary_unary(
+                '/robot.Movements/motion_stats',
+                request_serializer=cafebot__pb2.Empty.SerializeToString,
+                response_deserializer=cafebot__pb2.MotionStats.FromString,
+                )
+        self.telemetry = channel.unary_stream(
+                '/robot.Movements/telemetry',
+                request_serializer=cafebot__pb2.TelemetryRequest.SerializeToString,
+                response_deserializer=cafebot__pb2.RobotState.FromString,
+                )
+        self.execute_trajectory = channel.unary_unary(
+                '/robot.Movements/execute_trajectory',
+                request_serializer=cafebot__pb2.TrajectoryRequest.SerializeToString,
+                response_deserializer=cafebot__pb2.SimpleResponse.FromString,
+                )
+        self.current_tfs = channel.unary_unary(
+                '/robot.Movements/current_tfs',
+                request_serializer=cafebot__pb2.Empty.SerializeToString,
+                response_deserializer=cafebot__pb2.TFsResponse.FromString,
+                )
+        self.start_motion = channel.unary_unary(
+                '/robot.Movements/start_motion',
+                request_serializer=cafebot__pb2.MotionRequest.SerializeToString,
+                response_deserializer=cafebot__pb2.MotionStatus.FromString,
+                )
+        self.poll_motion = channel.unary_unary(
+                '/robot.Movements/poll_motion',
+                request_serializer=cafebot__pb2.MotionId.SerializeToString,
+                response_deserializer=cafebot__pb2.MotionStatus.FromString,
+                )
+        self.wait_motion = channel.unary_unary(
+                '/robot.Movements/wait_motion',
+                request_serializer=cafebot__pb2.WaitMotionRequest.SerializeToString,
+                response_deserializer=cafebot__pb2.MotionStatus.FromString,
+                )
+        self.cancel_motion = channel.unary_unary(
+                '/robot.Movements/cancel_motion',
+                request_serializer=cafebot__pb2.MotionId.SerializeToString,
+                response_deserializer=cafebot__pb2.MotionStatus.FromString,
+                )
+        self.stream_servo = channel.stream_unary(
+                '/robot.Movements/stream_servo',
+                request_serializer=cafebot__pb2.ServoPoint.SerializeToString,
+                response_deserializer=cafebot__pb2.ServoStats.FromString,
+                )
+        self.servo_trajectory = channel.unary_unary(
+                '/robot.Movements/servo_trajectory',
+                request_serializer=cafebot__pb2.ServoTrajectoryRequest.SerializeToString,
+                response_deserializer=cafebot__pb2.ServoStats.FromString,
+                )
 
 
 class MovementsServicer(object):
@@ -30,6 +85,72 @@ class MovementsServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def stop(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def motion_stats(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def telemetry(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def execute_trajectory(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def current_tfs(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def start_motion(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def poll_motion(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def wait_motion(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def cancel_motion(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def stream_servo(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def servo_trajectory(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_MovementsServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -38,6 +159,61 @@ def add_MovementsServicer_to_server(servicer, server):
                     request_deserializer=cafebot__pb2.Empty.FromString,
                     response_serializer=cafebot__pb2.SimpleResponse.SerializeToString,
             ),
+            'stop': grpc.unary_unary_rpc_method_handler(
+                    servicer.stop,
+                    request_deserializer=cafebot__pb2.StopRequest.FromString,
+                    response_serializer=cafebot__pb2.SimpleResponse.SerializeToString,
+            ),
+            'motion_stats': grpc.unary_unary_rpc_method_handler(
+                    servicer.motion_stats,
+                    request_deserializer=cafebot__pb2.Empty.FromString,
+                    response_serializer=cafebot__pb2.MotionStats.SerializeToString,
+            ),
+            'telemetry': grpc.unary_stream_rpc_method_handler(
+                    servicer.telemetry,
+                    request_deserializer=cafebot__pb2.TelemetryRequest.FromString,
+                    response_serializer=cafebot__pb2.RobotState.SerializeToString,
+            ),
+            'execute_trajectory': grpc.unary_unary_rpc_method_handler(
+                    servicer.execute_trajectory,
+                    request_deserializer=cafebot__pb2.TrajectoryRequest.FromString,
+                    response_serializer=cafebot__pb2.SimpleResponse.SerializeToString,
+            ),
+            'current_tfs': grpc.unary_unary_rpc_method_handler(
+                    servicer.current_tfs,
+                    request_deserializer=cafebot__pb2.Empty.FromString,
+                    response_serializer=cafebot__pb2.TFsResponse.SerializeToString,
+            ),
+            'start_motion': grpc.unary_unary_rpc_method_handler(
+                    servicer.start_motion,
+                    request_deserializer=cafebot__pb2.MotionRequest.FromString,
+                    response_serializer=cafebot__pb2.MotionStatus.SerializeToString,
+            ),
+            'poll_motion': grpc.unary_unary_rpc_method_handler(
+                    servicer.poll_motion,
+                    request_deserializer=cafebot__pb2.MotionId.FromString,
+                    response_serializer=cafebot__pb2.MotionStatus.SerializeToString,
+            ),
+            'wait_motion': grpc.unary_unary_rpc_method_handler(
+                    servicer.wait_motion,
+                    request_deserializer=cafebot__pb2.WaitMotionRequest.FromString,
+                    response_serializer=cafebot__pb2.MotionStatus.SerializeToString,
+            ),
+            'cancel_motion': grpc.unary_unary_rpc_method_handler(
+                    servicer.cancel_motion,
+                    request_deserializer=cafebot__pb2.MotionId.FromString,
+                    response_serializer=cafebot__pb2.MotionStatus.SerializeToString,
+            ),
+            'stream_servo': grpc.stream_unary_rpc_method_handler(
+                    servicer.stream_servo,
+                    request_deserializer=cafebot__pb2.ServoPoint.FromString,
+                    response_serializer=cafebot__pb2.ServoStats.SerializeToString,
+            ),
+            'servo_trajectory': grpc.unary_unary_rpc_method_handler(
+                    servicer.servo_trajectory,
+                    request_deserializer=cafebot__pb2.ServoTrajectoryRequest.FromString,
+                    response_serializer=cafebot__pb2.ServoStats.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'robot.Movements', rpc_method_handlers)
@@ -64,3 +240,190 @@ class Movements(object):
             cafebot__pb2.SimpleResponse.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def stop(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/robot.Movements/stop',
+            cafebot__pb2.StopRequest.SerializeToString,
+            cafebot__pb2.SimpleResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def motion_stats(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/robot.Movements/motion_stats',
+            cafebot__pb2.Empty.SerializeToString,
+            cafebot__pb2.MotionStats.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def telemetry(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/robot.Movements/telemetry',
+            cafebot__pb2.TelemetryRequest.SerializeToString,
+            cafebot__pb2.RobotState.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def execute_trajectory(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/robot.Movements/execute_trajectory',
+            cafebot__pb2.TrajectoryRequest.SerializeToString,
+            cafebot__pb2.SimpleResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def current_tfs(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/robot.Movements/current_tfs',
+            cafebot__pb2.Empty.SerializeToString,
+            cafebot__pb2.TFsResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def start_motion(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/robot.Movements/start_motion',
+            cafebot__pb2.MotionRequest.SerializeToString,
+            cafebot__pb2.MotionStatus.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def poll_motion(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/robot.Movements/poll_motion',
+            cafebot__pb2.MotionId.SerializeToString,
+            cafebot__pb2.MotionStatus.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def wait_motion(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/robot.Movements/wait_motion',
+            cafebot__pb2.WaitMotionRequest.SerializeToString,
+            cafebot__pb2.MotionStatus.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def cancel_motion(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/robot.Movements/cancel_motion',
+            cafebot__pb2.MotionId.SerializeToString,
+            cafebot__pb2.MotionStatus.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def stream_servo(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_unary(request_iterator, target, '/robot.Movements/stream_servo',
+            cafebot__pb2.ServoPoint.SerializeToString,
+            cafebot__pb2.ServoStats.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def servo_trajectory(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/robot.Movements/servo_trajectory',
+            cafebot__pb2.ServoTrajectoryRequest.SerializeToString,
+            cafebot__pb2.ServoStats.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
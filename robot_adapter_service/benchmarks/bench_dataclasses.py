@@ -0,0 +1,38 @@
+from modules._dataclasses import TCPOffset, BaseOffset, JointPose, CartesianPose, Waypoint
+from modules.transforms import FrameChain, OffsetComparator, DEG2RAD
+
+OFFSET = (12.5, -3.0, 110.0, 0.1, -0.2, 1.5)
+# offsets as the controller reports them, orientation in degrees
+REPORTED_DEG = (12.5, -3.0, 110.0, 0.1 / DEG2RAD, -0.2 / DEG2RAD, 1.5 / DEG2RAD)
+
+
+def test_tcp_offset(benchmark):
+    benchmark(TCPOffset, *OFFSET)
+
+
+def test_base_offset(benchmark):
+    benchmark(BaseOffset, *OFFSET)
+
+
+def test_joint_pose(benchmark):
+    benchmark(JointPose, [0.0, -30.0, -45.0, 0.0, 75.0, 0.0])
+
+
+def test_cartesian_pose(benchmark):
+    benchmark(CartesianPose, [300.0, 0.0, 200.0], [180.0, 0.0, 0.0], "world", "flange")
+
+
+def test_waypoint(benchmark):
+    pose = JointPose([0.0, -30.0, -45.0, 0.0, 75.0, 0.0])
+    benchmark(Waypoint, pose, 30.0, 5.0)
+
+
+def test_offset_comparator(benchmark):
+    comparator = OffsetComparator()
+    assert benchmark(comparator.matches, REPORTED_DEG, TCPOffset(*OFFSET).as_array())
+
+
+def test_frame_chain_update(benchmark):
+    chain = FrameChain()
+    poses = benchmark(chain.update, REPORTED_DEG, [300.0, 0.0, 200.0, 180.0, 0.0, 0.0], REPORTED_DEG)
+    assert poses.shape == (len(FrameChain.FRAMES), 7)
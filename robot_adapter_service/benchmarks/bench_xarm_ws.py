@@ -0,0 +1,24 @@
+from modules.xarm_ws import XArmWebsocket
+
+
+def test_run_blocking_command(benchmark, xarm_ws: XArmWebsocket):
+    # a small command, so the round trip through the session dominates
+    data = benchmark(xarm_ws._run_blocking_command, "get_world_offset_config", {"userId": "test", "version": "xarm6"})
+    assert "configs" in data
+
+
+def test_parse_tcp_configs(benchmark, xarm_ws: XArmWebsocket, ws_server):
+    response = ws_server._tcp_offset_load_config({})
+    configs = benchmark(xarm_ws._parse_tcp_configs, response)
+    assert len(configs) == len(ws_server.tcp_configs)
+
+
+def test_parse_base_configs(benchmark, xarm_ws: XArmWebsocket, ws_server):
+    response = ws_server._world_offset_config({})
+    configs = benchmark(xarm_ws._parse_base_configs, response)
+    assert len(configs) == len(ws_server.base_configs)
+
+
+def test_get_tcp_configs_cached(benchmark, xarm_ws: XArmWebsocket):
+    xarm_ws.get_tcp_configs()
+    assert benchmark(xarm_ws.get_tcp_configs)
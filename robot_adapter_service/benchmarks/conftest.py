@@ -0,0 +1,35 @@
+import os
+import sys
+import pytest
+
+# benchmarks import modules and simulator like main.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from modules.config import SharedExtConfig
+from simulator.fake_ws_server import FakeWebsocketServer
+
+BENCH_STAND = "sim_stand"
+# catalogs of a busy stand, so parsing cost is visible
+CATALOG_SIZE = 50
+
+
+def _catalog(prefix: str) -> dict:
+    return {f"{prefix}_{i}": [i * 0.5, -i * 0.25, 100.0 + i, (i * 7) % 360 - 180, (i * 3) % 180 - 90, (i * 11) % 360 - 180]
+            for i in range(CATALOG_SIZE)}
+
+
+@pytest.fixture(scope="session")
+def ws_server():
+    '''
+    simulated xArm websocket of the benchmark stand answering without latency
+    '''
+    server = FakeWebsocketServer(host=SharedExtConfig(BENCH_STAND).robot_ip, latency=0.0,
+                                 tcp_configs=_catalog("tcp"), base_configs=_catalog("base")).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(scope="session")
+def xarm_ws(ws_server):
+    from modules.xarm_ws import XArmWebsocket
+    return XArmWebsocket(BENCH_STAND)
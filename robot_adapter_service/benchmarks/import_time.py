@@ -0,0 +1,103 @@
+import os
+import re
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List, Tuple
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+ROOT_DIR = os.path.dirname(SERVICE_DIR)
+# statement -> name in the report, client-only imports first
+TARGETS = {"from cafebot_proto import pb2": "cafebot_proto.pb2",
+           "from cafebot_proto import pb2_grpc": "cafebot_proto.pb2_grpc",
+           "import modules.robot_adapter": "modules.robot_adapter",
+           "import main": "main"}
+# dependencies that should only be loaded when used
+HEAVY_MODULES = ("numpy", "xarm", "websocket", "grpc")
+_LINE_PATTERN = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def _import_once(statement: str) -> List[Tuple[str, int, int]]:
+    '''
+    (module, self us, cumulative us) of every module imported by statement in a fresh interpreter
+    '''
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [SERVICE_DIR, ROOT_DIR, os.environ.get("PYTHONPATH")])))
+    # measured with bytecode caches like an installed service, not compile time
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                            cwd=SERVICE_DIR, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{statement} failed:\n{result.stderr[-2000:]}")
+    modules = []
+    for line in result.stderr.splitlines():
+        match = _LINE_PATTERN.match(line)
+        if match:
+            modules.append((match.group(4), int(match.group(1)), int(match.group(2))))
+    return modules
+
+
+def measure(statement: str, repeat: int = 5, top: int = 10) -> dict:
+    '''
+    median import time of statement over repeat runs after a warm-up run that writes bytecode caches,
+    with the slowest modules by self time of the median run
+    '''
+    _import_once(statement)
+    runs = sorted((sum(self_us for _, self_us, _ in modules), modules) for modules in
+                  (_import_once(statement) for _ in range(repeat)))
+    totals = [total for total, _ in runs]
+    median_modules = runs[len(runs) // 2][1]
+    loaded = {name.split(".")[0] for name, _, _ in median_modules}
+    return {"median_ms": round(statistics.median(totals) / 1000, 3),
+            "min_ms": round(totals[0] / 1000, 3),
+            "max_ms": round(totals[-1] / 1000, 3),
+            "modules": len(median_modules),
+            "heavy": sorted(loaded.intersection(HEAVY_MODULES)),
+            "slowest": [{"module": name, "self_ms": round(self_us / 1000, 3), "cumulative_ms": round(cumulative_us / 1000, 3)}
+                        for name, self_us, cumulative_us in sorted(median_modules, key=lambda item: -item[1])[:top]]}
+
+
+def compare(report: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> Tuple[dict, bool]:
+    '''
+    ratio of every median to the baseline one, regressed is True if one grew by more than tolerance
+    or a target loads a heavy module its baseline did not
+    '''
+    regressed = False
+    ratios = {}
+    for name, result in report.items():
+        reference = baseline.get(name)
+        if not reference or reference["median_ms"] <= 0:
+            continue
+        ratio = round(result["median_ms"] / reference["median_ms"], 3)
+        new_heavy = sorted(set(result["heavy"]) - set(reference["heavy"]))
+        ratios[name] = {"median_ms": ratio, "new_heavy": new_heavy}
+        regressed |= ratio > 1.0 + tolerance or bool(new_heavy)
+    return ratios, regressed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="import time of the service and client entry points from python -X importtime, "
+                                                 "prints a JSON report")
+    parser.add_argument("-t", "--target", type=str, action="append", default=None,
+                        help=f"import statement to measure, repeatable, default: {'; '.join(TARGETS)}")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="fresh interpreters per target")
+    parser.add_argument("--top", type=int, default=10, help="slowest modules listed per target")
+    parser.add_argument("-o", "--output", type=str, default=None, help="also write the report to this file")
+    parser.add_argument("--baseline", type=str, default=None, help="report to compare with, exits with 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression against the baseline")
+    args = parser.parse_args()
+    targets = {statement: statement for statement in args.target} if args.target else TARGETS
+    report = {"python": sys.version.split()[0],
+              "targets": {name: measure(statement, args.repeat, args.top) for statement, name in targets.items()}}
+    regressed = False
+    if args.baseline:
+        with open(args.baseline) as file:
+            report["baseline"], regressed = compare(report["targets"], json.load(file)["targets"], args.tolerance)
+        report["regressed"] = regressed
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    print(text)
+    sys.exit(1 if regressed else 0)
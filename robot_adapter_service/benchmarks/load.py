@@ -0,0 +1,200 @@
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+import grpc
+from google.protobuf import json_format
+from cafebot_proto import pb2
+
+SERVICE = pb2.DESCRIPTOR.services_by_name["Movements"]
+STAND_METADATA_KEY = "x-stand-id"
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(q * (len(values) - 1)))))
+    return values[index]
+
+
+def _summary(latencies: List[float], errors: int, duration: float) -> dict:
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {"count": count,
+            "errors": errors,
+            "error_rate": round(errors / count, 6) if count else 0.0,
+            "rps": round(count / duration, 3) if duration > 0 else 0.0,
+            "mean_ms": round(1000 * sum(latencies) / count, 3) if count else 0.0,
+            "p50_ms": round(1000 * _percentile(latencies, 0.50), 3),
+            "p95_ms": round(1000 * _percentile(latencies, 0.95), 3),
+            "p99_ms": round(1000 * _percentile(latencies, 0.99), 3),
+            "max_ms": round(1000 * latencies[-1], 3) if count else 0.0}
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    '''
+    "current_tfs=8,park=1" -> method -> weight, every unary method of the Movements service can be used
+    '''
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.strip().partition("=")
+        method = SERVICE.methods_by_name.get(name)
+        if method is None:
+            raise ValueError(f"unknown method {name}, available: {', '.join(SERVICE.methods_by_name)}")
+        if method.client_streaming or method.server_streaming:
+            raise ValueError(f"{name} is a streaming method")
+        weights[name] = float(weight or 1.0)
+    return weights
+
+
+def _request(name: str, requests: Dict[str, str]):
+    '''
+    request of method name, from its JSON in requests or the default instance of its input type
+    '''
+    message_class = getattr(pb2, SERVICE.methods_by_name[name].input_type.name)
+    return json_format.Parse(requests[name], message_class()) if name in requests else message_class()
+
+
+class LoadGenerator:
+    '''
+    calls unary Movements methods from concurrency threads in a closed loop for duration seconds,
+    picking methods at random by weight, calls during the first warmup seconds are not measured
+    '''
+    def __init__(self, address: str, weights: Dict[str, float],
+                 concurrency: int = 4,
+                 duration: float = 10.0,
+                 warmup: float = 1.0,
+                 timeout: float = 30.0,
+                 stand: Optional[str] = None,
+                 requests: Optional[Dict[str, str]] = None,
+                 seed: Optional[int] = None):
+        self._address = address
+        self._weights = weights
+        self._concurrency = concurrency
+        self._duration = duration
+        self._warmup = warmup
+        self._timeout = timeout
+        self._metadata = ((STAND_METADATA_KEY, stand),) if stand else ()
+        self._requests = {name: _request(name, requests or {}).SerializeToString() for name in weights}
+        self._seed = seed
+        self._lock = threading.Lock()
+        self._latencies = defaultdict(list)
+        self._errors = defaultdict(int)
+        self._error_codes = defaultdict(int)
+
+
+    def run(self) -> dict:
+        channel = grpc.insecure_channel(self._address)
+        grpc.channel_ready_future(channel).result(timeout=self._timeout)
+        calls = {name: channel.unary_unary(f"/{SERVICE.full_name}/{name}") for name in self._weights}
+        start = time.monotonic()
+        measure_from = start + self._warmup
+        stop_at = measure_from + self._duration
+        workers = [threading.Thread(target=self._worker, args=(calls, measure_from, stop_at, i), daemon=True)
+                   for i in range(self._concurrency)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        channel.close()
+        duration = time.monotonic() - measure_from
+        all_latencies = [latency for latencies in self._latencies.values() for latency in latencies]
+        return {"config": {"address": self._address,
+                           "concurrency": self._concurrency,
+                           "duration": self._duration,
+                           "warmup": self._warmup,
+                           "mix": self._weights},
+                "total": _summary(all_latencies, sum(self._errors.values()), duration),
+                "methods": {name: _summary(self._latencies[name], self._errors[name], duration) for name in self._weights},
+                "error_codes": dict(self._error_codes)}
+
+
+    def _worker(self, calls: dict, measure_from: float, stop_at: float, index: int):
+        rng = random.Random(None if self._seed is None else self._seed + index)
+        names = list(self._weights)
+        weights = [self._weights[name] for name in names]
+        while True:
+            name = rng.choices(names, weights)[0]
+            started = time.monotonic()
+            if started >= stop_at:
+                return
+            error = None
+            try:
+                calls[name](self._requests[name], metadata=self._metadata, timeout=self._timeout)
+            except grpc.RpcError as e:
+                error = e.code().name
+            finished = time.monotonic()
+            if started < measure_from:
+                continue
+            with self._lock:
+                self._latencies[name].append(finished - started)
+                if error is not None:
+                    self._errors[name] += 1
+                    self._error_codes[error] += 1
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> Tuple[dict, bool]:
+    '''
+    ratio of every latency percentile and RPS to the baseline report per method,
+    regressed is True if a percentile grew or RPS fell by more than tolerance
+    '''
+    regressed = False
+    ratios = {}
+    for name, summary in {"total": report["total"], **report["methods"]}.items():
+        reference = baseline["total"] if name == "total" else baseline.get("methods", {}).get(name)
+        if not reference:
+            continue
+        ratios[name] = {}
+        for key in ("p50_ms", "p95_ms", "p99_ms", "rps"):
+            if reference[key] > 0:
+                ratio = round(summary[key] / reference[key], 3)
+                ratios[name][key] = ratio
+                regressed |= ratio < 1.0 - tolerance if key == "rps" else ratio > 1.0 + tolerance
+    return ratios, regressed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="closed-loop load generator for the Movements gRPC service, prints a JSON report")
+    parser.add_argument("-a", "--address", type=str, default="127.0.0.1:50051")
+    parser.add_argument("--mix", type=str, default="current_tfs=8,motion_stats=2",
+                        help='weighted methods, e.g. "current_tfs=8,park=1"')
+    parser.add_argument("--request", type=str, action="append", default=[],
+                        help='request of a method as JSON, e.g. \'poll_motion={"id": "..."}\', default instance if not set')
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="concurrent callers")
+    parser.add_argument("-d", "--duration", type=float, default=10.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=1.0, help="seconds of calls before measuring")
+    parser.add_argument("--timeout", type=float, default=30.0, help="deadline of each call, s")
+    parser.add_argument("--stand", type=str, default=None, help="stand sent as x-stand-id metadata")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("-o", "--output", type=str, default=None, help="also write the report to this file")
+    parser.add_argument("--baseline", type=str, default=None, help="report to compare with, exits with 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed relative regression against the baseline")
+    args = parser.parse_args()
+    try:
+        weights = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    requests = dict(item.split("=", 1) for item in args.request)
+    report = LoadGenerator(args.address, weights,
+                           concurrency=args.concurrency,
+                           duration=args.duration,
+                           warmup=args.warmup,
+                           timeout=args.timeout,
+                           stand=args.stand,
+                           requests=requests,
+                           seed=args.seed).run()
+    regressed = False
+    if args.baseline:
+        with open(args.baseline) as file:
+            report["baseline"], regressed = compare(report, json.load(file), args.tolerance)
+        report["regressed"] = regressed
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    print(text)
+    sys.exit(1 if regressed else 0)
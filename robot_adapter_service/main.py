@@ -2,21 +2,236 @@
 import sys, os
 import logging
 import argparse
+import asyncio
+import functools
+import dataclasses
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 import grpc
+from grpc_health.v1 import health, health_pb2, health_pb2_grpc
 from concurrent import futures
 from cafebot_proto import pb2_grpc, pb2
 from modules.robot_adapter import RobotAdapter, RobotException
+from modules._exceptions import ServoPathException
+from modules.motion_scheduler import MotionScheduler, MotionHandle, MotionPriority
+from modules.telemetry import TelemetryHub, TelemetryFrame
+from modules._dataclasses import JointPose, CartesianPose, Waypoint, TFSnapshot, ServerTuning, ServoStats
+from modules.metrics import MetricsRegistry
+from modules.config import SharedExtConfig, available_stands
+from modules._utils import default_stand_name
+from modules.interceptors import (MetricsInterceptor,
+                                  AsyncMetricsInterceptor,
+                                  TracingInterceptor,
+                                  AsyncTracingInterceptor,
+                                  DeadlineInterceptor,
+                                  AsyncDeadlineInterceptor,
+                                  RecordingInterceptor,
+                                  AsyncRecordingInterceptor,
+                                  AdmissionInterceptor,
+                                  AsyncAdmissionInterceptor)
+from modules.logging_setup import configure_logging
+from modules.warmup import StandWarmup
+from modules import tracing, recorder
+
+# gRPC metadata key selecting the stand of a request, requests without it go to STAND_NAME
+STAND_METADATA_KEY = "x-stand-id"
+MOVEMENTS_SERVICE = pb2.DESCRIPTOR.services_by_name["Movements"].full_name
+# blocking motion requests are rejected once a motion waits, handles queue a few before,
+# park is never rejected, it gets ahead of queued motions
+DEFAULT_ADMISSION_LIMITS = "execute_trajectory=1,servo_trajectory=1,stream_servo=1,start_motion=8"
+# scheduling of motions other than the default normal priority without preemption:
+# park runs before queued motions and stops a running one, e.g. to clear the way after a client gave up
+MOTION_SCHEDULING = {"park": {"priority": MotionPriority.urgent, "preempt": True}}
+COMPRESSION = {"none": grpc.Compression.NoCompression,
+               "deflate": grpc.Compression.Deflate,
+               "gzip": grpc.Compression.Gzip}
+
+
+def _robot_state(frame: TelemetryFrame, dropped: int) -> pb2.RobotState:
+    return pb2.RobotState(seq=frame.seq,
+                          timestamp=frame.timestamp,
+                          joints=frame.joints,
+                          tcp_pose=frame.tcp_pose,
+                          mode=frame.mode,
+                          state=frame.state,
+                          error_code=frame.error_code,
+                          warn_code=frame.warn_code,
+                          dropped=dropped)
+
+
+def _tfs_response(snapshot: TFSnapshot) -> pb2.TFsResponse:
+    tfs = [pb2.TF(parent="base", child=frame, translation=pose[:3], rotation=pose[3:])
+           for frame, pose in zip(snapshot.frames, snapshot.poses.tolist())]
+    return pb2.TFsResponse(seq=snapshot.seq, timestamp=snapshot.timestamp, tfs=tfs)
+
+
+def _metadata_stand(metadata) -> str:
+    for key, value in metadata or ():
+        if key == STAND_METADATA_KEY:
+            return value
+    return default_stand_name()
+
+
+def _requested_stand(context) -> str:
+    return _metadata_stand(context.invocation_metadata())
+
+
+def _health_statuses(warmup: StandWarmup) -> dict:
+    '''
+    health service name -> status: "<service>/<stand>" per stand, the service itself and "" while any stand is ready
+    '''
+    statuses = {f"{MOVEMENTS_SERVICE}/{stand}": health_pb2.HealthCheckResponse.SERVING if warmup.is_ready(stand)
+                else health_pb2.HealthCheckResponse.NOT_SERVING for stand in warmup.stands}
+    overall = health_pb2.HealthCheckResponse.SERVING if any(map(warmup.is_ready, warmup.stands)) \
+        else health_pb2.HealthCheckResponse.NOT_SERVING
+    return {"": overall, MOVEMENTS_SERVICE: overall, **statuses}
+
+
+def _interceptors(interceptors: list, recording_interceptor) -> list:
+    trace_recorder = recorder.current_recorder()
+    return interceptors + [recording_interceptor(trace_recorder)] if trace_recorder is not None else interceptors
+
+
+def _motion_queue_depth(warmup: StandWarmup) -> Callable:
+    '''
+    queued motions of the stand a request is routed to, None for stands not ready, so the servicer answers them
+    '''
+    def queued(handler_call_details) -> Optional[int]:
+        stand = _metadata_stand(handler_call_details.invocation_metadata)
+        return MotionScheduler(stand).queued() if warmup.is_ready(stand) else None
+    return queued
+
+
+def _admission_limits(text: str) -> Dict[str, int]:
+    '''
+    "park=1,start_motion=8" -> method -> queued motions at which it is rejected, empty disables admission control
+    '''
+    limits = {}
+    for item in filter(None, map(str.strip, text.split(","))):
+        method, _, limit = item.partition("=")
+        descriptor = pb2.DESCRIPTOR.services_by_name["Movements"].methods_by_name.get(method)
+        if descriptor is None:
+            raise ValueError(f"unknown method {method}")
+        if descriptor.server_streaming:
+            raise ValueError(f"{method} streams responses, only unary and client streaming methods can be limited")
+        limits[method] = int(limit)
+    return limits
+
+
+def _server_options(tuning: ServerTuning) -> List[Tuple[str, int]]:
+    options = []
+    if tuning.keepalive_time is not None:
+        options += [("grpc.keepalive_time_ms", int(tuning.keepalive_time * 1000)),
+                    # clients may ping as often as the server does
+                    ("grpc.http2.min_ping_interval_without_data_ms", int(tuning.keepalive_time * 1000))]
+    if tuning.keepalive_timeout is not None:
+        options.append(("grpc.keepalive_timeout_ms", int(tuning.keepalive_timeout * 1000)))
+    if tuning.max_message_size is not None:
+        size = int(tuning.max_message_size * 1024 * 1024)
+        options += [("grpc.max_receive_message_length", size), ("grpc.max_send_message_length", size)]
+    return options
+
+
+def _waypoints(request: pb2.TrajectoryRequest) -> List[Waypoint]:
+    waypoints = []
+    for i, message in enumerate(request.waypoints):
+        target = message.WhichOneof("target")
+        if target == "joint":
+            pose = JointPose(values=list(message.joint.values))
+        elif target == "cartesian":
+            pose = CartesianPose(position=list(message.cartesian.position),
+                                 orientation=list(message.cartesian.orientation),
+                                 frame=message.cartesian.frame or "base",
+                                 tcp=message.cartesian.tcp)
+        else:
+            raise ValueError(f"waypoint {i} has no target")
+        waypoints.append(Waypoint(pose=pose, velocity=message.velocity, blend_radius=message.blend_radius))
+    return waypoints
+
+
+def _servo_path(messages: Iterable[pb2.ServoPoint]) -> Tuple[List[List[float]], pb2.ServoSettings]:
+    '''
+    points of a servo stream and the settings sent with its first point
+    '''
+    settings, points = None, []
+    for message in messages:
+        if settings is None:
+            settings = message.settings
+        if len(message.values) != 6:
+            raise ValueError(f"servo point {len(points)} has {len(message.values)} values, expected 6")
+        points.append(list(message.values))
+    if not points:
+        raise ValueError("servo stream has no points")
+    return points, settings
+
+
+def _servo_stats(stats: ServoStats) -> pb2.ServoStats:
+    return pb2.ServoStats(**dataclasses.asdict(stats))
+
+
+def _motion(stand: str, request: pb2.MotionRequest) -> Tuple[str, Callable]:
+    motion = request.WhichOneof("motion")
+    if motion == "park":
+        return "park", RobotAdapter(stand).park
+    if motion == "trajectory":
+        waypoints = _waypoints(request.trajectory)
+        linear = request.trajectory.linear
+        return "execute_trajectory", lambda: RobotAdapter(stand).execute_trajectory(waypoints, linear=linear)
+    if motion == "servo_trajectory":
+        waypoints = _waypoints(request.servo_trajectory)
+        rate = request.servo_trajectory.rate or None
+        return "servo_trajectory", lambda: RobotAdapter(stand).servo_trajectory(waypoints, rate=rate)
+    raise ValueError("no motion given")
+
+
+def _motion_status(handle: MotionHandle) -> pb2.MotionStatus:
+    return pb2.MotionStatus(id=handle.id,
+                            name=handle.name,
+                            state=int(handle.state),
+                            progress=handle.progress(),
+                            message=handle.error or "",
+                            **handle.timing())
+
+
+def _wait_timeout(timeout: float, time_remaining: Optional[float]) -> Optional[float]:
+    '''
+    seconds wait_motion may block, it returns the status shortly before the call deadline instead of failing
+    '''
+    limits = [timeout] if timeout > 0 else []
+    if time_remaining is not None:
+        limits.append(max(0.0, time_remaining - 0.05))
+    return min(limits) if limits else None
 
 
 class MovementsServicer(pb2_grpc.MovementsServicer):
-    def __init__(self):
+    '''
+    serves several stands, each request is routed by its x-stand-id metadata
+    requests to a stand that has not finished warm-up fail with UNAVAILABLE
+    '''
+    def __init__(self, warmup: StandWarmup):
         self._logger = logging.getLogger("movements_servicer")
+        self._warmup = warmup
+        self._stands = set(warmup.stands)
+
+
+    def _stand(self, context) -> str:
+        stand = _requested_stand(context)
+        if stand not in self._stands:
+            context.abort(grpc.StatusCode.NOT_FOUND, f'stand "{stand}" is not served')
+        if not self._warmup.is_ready(stand):
+            context.abort(grpc.StatusCode.UNAVAILABLE, f'stand "{stand}" is warming up')
+        tracing.annotate(stand=stand)
+        return stand
 
 
     def park(self, request, context):
+        stand = self._stand(context)
         self._logger.info("parking robot")
+        motion = MotionScheduler(stand).submit("park", RobotAdapter(stand).park, timeout=context.time_remaining(),
+                                               **MOTION_SCHEDULING["park"])
+        # motion that has not started yet is dropped when the client goes away
+        context.add_callback(motion.cancel)
         try:
-            RobotAdapter().park()
+            motion.result()
         except RobotException as e:
             self._logger.error(f"failed to park: {e}")
             raise
@@ -24,32 +239,486 @@ class MovementsServicer(pb2_grpc.MovementsServicer):
             return pb2.SimpleResponse(success=True, message="ok")
 
 
+    def execute_trajectory(self, request, context):
+        stand = self._stand(context)
+        self._logger.info(f"executing trajectory of {len(request.waypoints)} waypoints")
+        try:
+            waypoints = _waypoints(request)
+        except (AssertionError, ValueError) as e:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"invalid trajectory: {e}")
+        motion = MotionScheduler(stand).submit("execute_trajectory",
+                                               lambda: RobotAdapter(stand).execute_trajectory(waypoints, linear=request.linear),
+                                               timeout=context.time_remaining())
+        context.add_callback(motion.cancel)
+        try:
+            motion.result()
+        except RobotException as e:
+            self._logger.error(f"failed to execute trajectory: {e}")
+            raise
+        else:
+            return pb2.SimpleResponse(success=True, message="ok")
+
+
+    def stream_servo(self, request_iterator, context):
+        stand = self._stand(context)
+        try:
+            points, settings = _servo_path(request_iterator)
+        except ValueError as e:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"invalid servo path: {e}")
+        self._logger.info(f"streaming servo path of {len(points)} points")
+        motion = MotionScheduler(stand).submit("stream_servo",
+                                               lambda: RobotAdapter(stand).stream_servo(points,
+                                                                                        cartesian=settings.cartesian,
+                                                                                        rate=settings.rate or None,
+                                                                                        tcp=settings.tcp or None),
+                                               timeout=context.time_remaining())
+        context.add_callback(motion.cancel)
+        return self._servo_result(motion, context)
+
+
+    def servo_trajectory(self, request, context):
+        stand = self._stand(context)
+        self._logger.info(f"streaming servo trajectory of {len(request.waypoints)} waypoints")
+        try:
+            waypoints = _waypoints(request)
+        except (AssertionError, ValueError) as e:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"invalid trajectory: {e}")
+        motion = MotionScheduler(stand).submit("servo_trajectory",
+                                               lambda: RobotAdapter(stand).servo_trajectory(waypoints, rate=request.rate or None),
+                                               timeout=context.time_remaining())
+        context.add_callback(motion.cancel)
+        return self._servo_result(motion, context)
+
+
+    def _servo_result(self, motion: futures.Future, context) -> pb2.ServoStats:
+        try:
+            return _servo_stats(motion.result())
+        except ServoPathException as e:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"invalid servo path: {e}")
+        except RobotException as e:
+            self._logger.error(f"failed to stream servo path: {e}")
+            raise
+
+
+    def stop(self, request, context):
+        stand = self._stand(context)
+        self._logger.info(f"stopping robot, emergency: {request.emergency}")
+        cancelled = MotionScheduler(stand).stop(emergency=request.emergency)
+        return pb2.SimpleResponse(success=True, message=f"stopped, cancelled {cancelled} queued motions")
+
+
+    def motion_stats(self, request, context):
+        stand = self._stand(context)
+        return pb2.MotionStats(**MotionScheduler(stand).stats())
+
+
+    def telemetry(self, request, context):
+        stand = self._stand(context)
+        self._logger.info(f"streaming telemetry, max rate: {request.max_rate}")
+        subscription = TelemetryHub(stand).subscribe(max_rate=request.max_rate, queue_size=request.queue_size or 16)
+        context.add_callback(subscription.close)
+        try:
+            while context.is_active() and not subscription.closed:
+                frame = subscription.get(timeout=1.0)
+                if frame is not None:
+                    yield _robot_state(frame, subscription.dropped)
+        finally:
+            subscription.close()
+
+
     def current_tfs(self, request, context):
-        self._logger.info("getting current tfs")
+        stand = self._stand(context)
+        self._logger.debug("getting current tfs")
         try:
-            tfs = RobotAdapter().get_current_tfs()
+            snapshot = RobotAdapter(stand).current_tfs()
         except RobotException as e:
             self._logger.error(f"failed to get current tfs: {e}")
             raise
         else:
-            return pb2.TFsResponse(tfs=tfs)
-        
+            return _tfs_response(snapshot)
 
-if __name__ == '__main__':
-    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s]%(name)s.%(funcName)s: %(message)s")
-    parser = argparse.ArgumentParser()
-    parser.add_argument("-a", "--address", type=str, default="[::]:50051")
-    args = parser.parse_args()
-    movements_servicer = MovementsServicer()
-    RobotAdapter()
-    grpc_server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
+
+    def _motion_handle(self, stand: str, motion_id: str, context) -> MotionHandle:
+        handle = MotionScheduler(stand).handle(motion_id)
+        if handle is None:
+            context.abort(grpc.StatusCode.NOT_FOUND, f'motion "{motion_id}" not found')
+        return handle
+
+
+    def start_motion(self, request, context):
+        stand = self._stand(context)
+        try:
+            name, func = _motion(stand, request)
+        except (AssertionError, ValueError) as e:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"invalid motion: {e}")
+        handle = MotionScheduler(stand).start(name, func, timeout=request.queue_timeout or None,
+                                              **MOTION_SCHEDULING.get(name, {}))
+        self._logger.info(f'started motion "{name}": {handle.id}')
+        return _motion_status(handle)
+
+
+    def poll_motion(self, request, context):
+        stand = self._stand(context)
+        return _motion_status(self._motion_handle(stand, request.id, context))
+
+
+    def wait_motion(self, request, context):
+        stand = self._stand(context)
+        handle = self._motion_handle(stand, request.id, context)
+        handle.wait(_wait_timeout(request.timeout, context.time_remaining()))
+        return _motion_status(handle)
+
+
+    def cancel_motion(self, request, context):
+        stand = self._stand(context)
+        handle = self._motion_handle(stand, request.id, context)
+        self._logger.info(f'cancelling motion "{handle.name}": {handle.id}')
+        handle.cancel()
+        return _motion_status(handle)
+
+
+class AsyncMovementsServicer(pb2_grpc.MovementsServicer):
+    '''
+    grpc.aio servicer, motions run on the motion scheduler thread and read-only requests on a bounded query executor,
+    so queries never queue behind motions
+    '''
+    def __init__(self, warmup: StandWarmup, query_workers: int = 2):
+        self._logger = logging.getLogger("async_movements_servicer")
+        self._warmup = warmup
+        self._stands = set(warmup.stands)
+        self._query_executor = futures.ThreadPoolExecutor(max_workers=query_workers, thread_name_prefix="query")
+
+
+    async def _stand(self, context) -> str:
+        stand = _requested_stand(context)
+        if stand not in self._stands:
+            await context.abort(grpc.StatusCode.NOT_FOUND, f'stand "{stand}" is not served')
+        if not self._warmup.is_ready(stand):
+            await context.abort(grpc.StatusCode.UNAVAILABLE, f'stand "{stand}" is warming up')
+        tracing.annotate(stand=stand)
+        return stand
+
+
+    async def _run(self, executor, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(func, *args))
+
+
+    async def park(self, request, context):
+        stand = await self._stand(context)
+        self._logger.info("parking robot")
+        motion = MotionScheduler(stand).submit("park", RobotAdapter(stand).park, timeout=context.time_remaining(),
+                                               **MOTION_SCHEDULING["park"])
+        try:
+            await asyncio.wrap_future(motion)
+        except asyncio.CancelledError:
+            motion.cancel()
+            raise
+        except RobotException as e:
+            self._logger.error(f"failed to park: {e}")
+            raise
+        else:
+            return pb2.SimpleResponse(success=True, message="ok")
+
+
+    async def execute_trajectory(self, request, context):
+        stand = await self._stand(context)
+        self._logger.info(f"executing trajectory of {len(request.waypoints)} waypoints")
+        try:
+            waypoints = _waypoints(request)
+        except (AssertionError, ValueError) as e:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"invalid trajectory: {e}")
+        motion = MotionScheduler(stand).submit("execute_trajectory",
+                                               lambda: RobotAdapter(stand).execute_trajectory(waypoints, linear=request.linear),
+                                               timeout=context.time_remaining())
+        try:
+            await asyncio.wrap_future(motion)
+        except asyncio.CancelledError:
+            motion.cancel()
+            raise
+        except RobotException as e:
+            self._logger.error(f"failed to execute trajectory: {e}")
+            raise
+        else:
+            return pb2.SimpleResponse(success=True, message="ok")
+
+
+    async def stream_servo(self, request_iterator, context):
+        stand = await self._stand(context)
+        try:
+            points, settings = _servo_path([message async for message in request_iterator])
+        except ValueError as e:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"invalid servo path: {e}")
+        self._logger.info(f"streaming servo path of {len(points)} points")
+        motion = MotionScheduler(stand).submit("stream_servo",
+                                               lambda: RobotAdapter(stand).stream_servo(points,
+                                                                                        cartesian=settings.cartesian,
+                                                                                        rate=settings.rate or None,
+                                                                                        tcp=settings.tcp or None),
+                                               timeout=context.time_remaining())
+        return await self._servo_result(motion, context)
+
+
+    async def servo_trajectory(self, request, context):
+        stand = await self._stand(context)
+        self._logger.info(f"streaming servo trajectory of {len(request.waypoints)} waypoints")
+        try:
+            waypoints = _waypoints(request)
+        except (AssertionError, ValueError) as e:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"invalid trajectory: {e}")
+        motion = MotionScheduler(stand).submit("servo_trajectory",
+                                               lambda: RobotAdapter(stand).servo_trajectory(waypoints, rate=request.rate or None),
+                                               timeout=context.time_remaining())
+        return await self._servo_result(motion, context)
+
+
+    async def _servo_result(self, motion: futures.Future, context) -> pb2.ServoStats:
+        try:
+            return _servo_stats(await asyncio.wrap_future(motion))
+        except asyncio.CancelledError:
+            motion.cancel()
+            raise
+        except ServoPathException as e:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"invalid servo path: {e}")
+        except RobotException as e:
+            self._logger.error(f"failed to stream servo path: {e}")
+            raise
+
+
+    async def stop(self, request, context):
+        stand = await self._stand(context)
+        self._logger.info(f"stopping robot, emergency: {request.emergency}")
+        cancelled = await self._run(self._query_executor, MotionScheduler(stand).stop, request.emergency)
+        return pb2.SimpleResponse(success=True, message=f"stopped, cancelled {cancelled} queued motions")
+
+
+    async def motion_stats(self, request, context):
+        stand = await self._stand(context)
+        return pb2.MotionStats(**MotionScheduler(stand).stats())
+
+
+    async def telemetry(self, request, context):
+        stand = await self._stand(context)
+        self._logger.info(f"streaming telemetry, max rate: {request.max_rate}")
+        subscription = TelemetryHub(stand).subscribe(max_rate=request.max_rate, queue_size=request.queue_size or 16)
+        try:
+            while not subscription.closed:
+                frame = await subscription.get_async(timeout=1.0)
+                if frame is not None:
+                    yield _robot_state(frame, subscription.dropped)
+        finally:
+            subscription.close()
+
+
+    async def current_tfs(self, request, context):
+        stand = await self._stand(context)
+        self._logger.debug("getting current tfs")
+        try:
+            # served from the cached snapshot, cheap enough for the event loop
+            snapshot = RobotAdapter(stand).current_tfs()
+        except RobotException as e:
+            self._logger.error(f"failed to get current tfs: {e}")
+            raise
+        else:
+            return _tfs_response(snapshot)
+
+
+    async def _motion_handle(self, stand: str, motion_id: str, context) -> MotionHandle:
+        handle = MotionScheduler(stand).handle(motion_id)
+        if handle is None:
+            await context.abort(grpc.StatusCode.NOT_FOUND, f'motion "{motion_id}" not found')
+        return handle
+
+
+    async def start_motion(self, request, context):
+        stand = await self._stand(context)
+        try:
+            name, func = _motion(stand, request)
+        except (AssertionError, ValueError) as e:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"invalid motion: {e}")
+        handle = MotionScheduler(stand).start(name, func, timeout=request.queue_timeout or None,
+                                              **MOTION_SCHEDULING.get(name, {}))
+        self._logger.info(f'started motion "{name}": {handle.id}')
+        return _motion_status(handle)
+
+
+    async def poll_motion(self, request, context):
+        stand = await self._stand(context)
+        return _motion_status(await self._motion_handle(stand, request.id, context))
+
+
+    async def wait_motion(self, request, context):
+        stand = await self._stand(context)
+        handle = await self._motion_handle(stand, request.id, context)
+        loop = asyncio.get_running_loop()
+        done = asyncio.Event()
+        handle.future.add_done_callback(lambda _: loop.call_soon_threadsafe(done.set))
+        try:
+            await asyncio.wait_for(done.wait(), _wait_timeout(request.timeout, context.time_remaining()))
+        except asyncio.TimeoutError:
+            pass
+        return _motion_status(handle)
+
+
+    async def cancel_motion(self, request, context):
+        stand = await self._stand(context)
+        handle = await self._motion_handle(stand, request.id, context)
+        self._logger.info(f'cancelling motion "{handle.name}": {handle.id}')
+        # stopping a running motion talks to the controller
+        await self._run(self._query_executor, handle.cancel)
+        return _motion_status(handle)
+
+
+    def shutdown(self):
+        self._query_executor.shutdown(wait=False, cancel_futures=True)
+
+
+def serve_threaded(address: str, stands: List[str], tuning: Optional[ServerTuning] = None):
+    tuning = tuning or ServerTuning()
+    health_servicer = health.HealthServicer()
+
+    def update_health():
+        for service, status in _health_statuses(warmup).items():
+            health_servicer.set(service, status)
+
+    warmup = StandWarmup(stands, on_ready=lambda stand: update_health())
+    movements_servicer = MovementsServicer(warmup)
+    # motions block their RPC thread until the scheduler runs them, keep workers free for stop and queries of every stand
+    grpc_server = grpc.server(futures.ThreadPoolExecutor(max_workers=tuning.workers or 4 * len(stands)),
+                              interceptors=_interceptors([MetricsInterceptor(),
+                                                          AdmissionInterceptor(tuning.admission_limits, _motion_queue_depth(warmup)),
+                                                          TracingInterceptor(),
+                                                          DeadlineInterceptor()],
+                                                         RecordingInterceptor),
+                              options=_server_options(tuning),
+                              maximum_concurrent_rpcs=tuning.max_concurrent_rpcs,
+                              compression=COMPRESSION[tuning.compression])
     pb2_grpc.add_MovementsServicer_to_server(movements_servicer, grpc_server)
-    logging.info(f"starting gRPC server on {args.address}")
-    grpc_server.add_insecure_port(args.address)
+    health_pb2_grpc.add_HealthServicer_to_server(health_servicer, grpc_server)
+    logging.info(f"starting gRPC server on {address}, {tuning}")
+    grpc_server.add_insecure_port(address)
+    update_health()
     grpc_server.start()
+    # the server answers health checks right away, stands come up in the background
+    warmup.start()
     try:
         grpc_server.wait_for_termination()
     except KeyboardInterrupt:
         logging.info("stopping gRPC server")
         grpc_server.stop(0)
-        sys.exit(0)
+
+
+async def serve_aio(address: str, stands: List[str], tuning: Optional[ServerTuning] = None):
+    tuning = tuning or ServerTuning()
+    loop = asyncio.get_running_loop()
+    health_servicer = health.aio.HealthServicer()
+
+    async def update_health():
+        for service, status in _health_statuses(warmup).items():
+            await health_servicer.set(service, status)
+
+    warmup = StandWarmup(stands, on_ready=lambda stand: asyncio.run_coroutine_threadsafe(update_health(), loop))
+    movements_servicer = AsyncMovementsServicer(warmup, query_workers=tuning.query_workers)
+    grpc_server = grpc.aio.server(interceptors=_interceptors([AsyncMetricsInterceptor(),
+                                                              AsyncAdmissionInterceptor(tuning.admission_limits,
+                                                                                        _motion_queue_depth(warmup)),
+                                                              AsyncTracingInterceptor(),
+                                                              AsyncDeadlineInterceptor()],
+                                                             AsyncRecordingInterceptor),
+                                  options=_server_options(tuning),
+                                  maximum_concurrent_rpcs=tuning.max_concurrent_rpcs,
+                                  compression=COMPRESSION[tuning.compression])
+    pb2_grpc.add_MovementsServicer_to_server(movements_servicer, grpc_server)
+    health_pb2_grpc.add_HealthServicer_to_server(health_servicer, grpc_server)
+    logging.info(f"starting asyncio gRPC server on {address}, {tuning}")
+    grpc_server.add_insecure_port(address)
+    await update_health()
+    await grpc_server.start()
+    warmup.start()
+    try:
+        await grpc_server.wait_for_termination()
+    finally:
+        logging.info("stopping gRPC server")
+        await grpc_server.stop(0)
+        movements_servicer.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-a", "--address", type=str, default="[::]:50051")
+    parser.add_argument("-s", "--server", type=str, choices=["threaded", "aio"], default="threaded",
+                        help="threaded grpc.server or asyncio grpc.aio.server")
+    parser.add_argument("-m", "--metrics-address", type=str, default="127.0.0.1:9100",
+                        help="address of the Prometheus scrape endpoint, empty to disable")
+    parser.add_argument("--stands", type=str, default=None,
+                        help="comma separated stands served by this process, STAND_NAME if not set")
+    parser.add_argument("--simulate", action="store_true",
+                        help="drive a simulated xArm and websocket instead of the real robot (use with STAND_NAME=sim_stand or --stands sim_stand,sim_stand_2)")
+    parser.add_argument("--sim-latency", type=float, default=0.005, help="simulated websocket response latency, s")
+    parser.add_argument("--sim-jitter", type=float, default=0.0, help="simulated websocket latency jitter, s")
+    parser.add_argument("--sim-drop-rate", type=float, default=0.0, help="fraction of simulated websocket responses dropped")
+    parser.add_argument("--sim-push-rate", type=float, default=0.0, help="unsolicited status messages pushed by the simulated websocket per second")
+    parser.add_argument("--sim-time-scale", type=float, default=1.0, help="multiplier of simulated motion durations")
+    parser.add_argument("--record", type=str, default=None,
+                        help="append SDK calls, websocket frames and unary requests to this trace file")
+    parser.add_argument("--replay", type=str, default=None,
+                        help="answer SDK calls and websocket commands from this trace instead of the robot, implies simulation")
+    parser.add_argument("--replay-speed", type=float, default=1.0, help="replay speed, 2 halves recorded latencies and SDK call durations")
+    parser.add_argument("--workers", type=int, default=None, help="RPC threads of the threaded server, 4 per stand if not set")
+    parser.add_argument("--query-workers", type=int, default=2, help="read-only request threads of the aio server")
+    parser.add_argument("--max-concurrent-rpcs", type=int, default=None,
+                        help="RPCs beyond this are rejected with RESOURCE_EXHAUSTED, unbounded if not set")
+    parser.add_argument("--keepalive-time", type=float, default=None, help="interval of server keepalive pings, s")
+    parser.add_argument("--keepalive-timeout", type=float, default=None, help="time to wait for a keepalive ping ack, s")
+    parser.add_argument("--compression", type=str, choices=list(COMPRESSION), default="none", help="compression of responses")
+    parser.add_argument("--max-message-size", type=float, default=None, help="limit of received and sent messages, MiB")
+    parser.add_argument("--admission", type=str, default=DEFAULT_ADMISSION_LIMITS,
+                        help='method=N rejects the method with RESOURCE_EXHAUSTED while N motions are queued on the stand, '
+                             'comma separated, empty to disable')
+    parser.add_argument("--slow-threshold", type=float, default=5.0,
+                        help="requests slower than this are written to the slow operation log, s")
+    parser.add_argument("--slow-log", type=str, default=None, help="file of the slow operation log, stderr only if not set")
+    args = parser.parse_args()
+    configure_logging(logging.INFO, "%(asctime)s [%(levelname)s]%(name)s.%(funcName)s: %(message)s", args.slow_log)
+    tracing.configure(slow_threshold=args.slow_threshold)
+    recorder.configure(args.record)
+    try:
+        tuning = ServerTuning(workers=args.workers,
+                              query_workers=args.query_workers,
+                              max_concurrent_rpcs=args.max_concurrent_rpcs,
+                              keepalive_time=args.keepalive_time,
+                              keepalive_timeout=args.keepalive_timeout,
+                              compression=args.compression,
+                              max_message_size=args.max_message_size,
+                              admission_limits=_admission_limits(args.admission))
+    except (AssertionError, ValueError) as e:
+        parser.error(f"invalid server settings: {e}")
+    stands = args.stands.split(",") if args.stands else [default_stand_name()]
+    unknown_stands = set(stands) - set(available_stands())
+    if unknown_stands:
+        parser.error(f"stands not found in config: {', '.join(sorted(unknown_stands))}")
+    if args.metrics_address:
+        MetricsRegistry().serve(args.metrics_address)
+    if args.replay:
+        from simulator import replay
+        RobotAdapter.api_factory = replay.install(replay.TraceReader(args.replay), stands,
+                                                  {stand: SharedExtConfig(stand).robot_ip for stand in stands},
+                                                  speed=args.replay_speed, time_scale=args.sim_time_scale)
+    elif args.simulate:
+        from simulator.fake_xarm import FakeXArmAPI
+        from simulator.fake_ws_server import FakeWebsocketServer
+        RobotAdapter.api_factory = functools.partial(FakeXArmAPI, time_scale=args.sim_time_scale)
+        for stand in stands:
+            FakeWebsocketServer(host=SharedExtConfig(stand).robot_ip,
+                                latency=args.sim_latency,
+                                jitter=args.sim_jitter,
+                                drop_rate=args.sim_drop_rate,
+                                push_rate=args.sim_push_rate).start()
+    if args.server == "aio":
+        try:
+            asyncio.run(serve_aio(args.address, stands, tuning))
+        except KeyboardInterrupt:
+            pass
+    else:
+        serve_threaded(args.address, stands, tuning)
+    sys.exit(0)
@@ -1,11 +1,30 @@
-from typing import List, Tuple, Union
-from dataclasses import dataclass
+from __future__ import annotations
+from typing import Dict, List, Tuple, Union, Optional
+from dataclasses import dataclass, field
+from modules._utils import LazyModule
+
+# loaded with the first offset, config loading does not need it
+np = LazyModule("numpy")
 
 
 @dataclass
 class ExtConfig:
     robot_ip: str
     retry_attempts: int
+    # first retry backoff and its upper bound, s
+    retry_base_delay: float = 0.05
+    retry_max_delay: float = 1.0
+    # websocket link supervision, s
+    ws_connect_timeout: float = 3.0
+    ws_heartbeat_interval: float = 2.0
+    ws_heartbeat_timeout: float = 6.0
+    ws_reconnect_max_delay: float = 5.0
+    catalog_ttl: float = 300.0
+    catalog_snapshot_dir: Optional[str] = None
+    # servo streaming, points per second and speed limits of a streamed path (deg/s, mm/s)
+    servo_rate: float = 100.0
+    servo_max_joint_speed: float = 60.0
+    servo_max_linear_speed: float = 250.0
 
 
 @dataclass
@@ -46,6 +65,19 @@ class Poses:
             setattr(self, attr_name, dataclass(**getattr(self, attr_name)))
 
 
+@dataclass
+class Waypoint:
+    pose: Union[JointPose, CartesianPose]
+    # deg/s for JointPose, mm/s for CartesianPose
+    velocity: float
+    # mm, 0 stops at the waypoint
+    blend_radius: float = 0.0
+
+    def __post_init__(self):
+        assert self.velocity > 0, "waypoint velocity must be positive"
+        assert self.blend_radius >= 0, "blend radius must not be negative"
+
+
 @dataclass
 class Velocity:
     joint: float
@@ -72,10 +104,23 @@ class TCPOffset:
     yaw: float
 
 
+    # read-only [x, y, z, roll, pitch, yaw], built once for offset comparisons
+    _array: np.ndarray = field(init=False, repr=False, compare=False)
+
+
+    def __post_init__(self):
+        self._array = np.array(self.as_list(), dtype=float)
+        self._array.flags.writeable = False
+
+
     def as_list(self) -> List[float]:
         return [self.x, self.y, self.z, self.roll, self.pitch, self.yaw]
 
 
+    def as_array(self) -> np.ndarray:
+        return self._array
+
+
 @dataclass
 class BaseOffset:
     x: float
@@ -85,6 +130,80 @@ class BaseOffset:
     pitch: float
     yaw: float
 
+
+    # read-only [x, y, z, roll, pitch, yaw], built once for offset comparisons
+    _array: np.ndarray = field(init=False, repr=False, compare=False)
+
+
+    def __post_init__(self):
+        self._array = np.array(self.as_list(), dtype=float)
+        self._array.flags.writeable = False
+
+
     def as_list(self) -> List[float]:
         return [self.x, self.y, self.z, self.roll, self.pitch, self.yaw]
+
+
+    def as_array(self) -> np.ndarray:
+        return self._array
     
+
+
+@dataclass(frozen=True)
+class TFSnapshot:
+    '''
+    frames of the arm in the robot base computed from a single report
+    '''
+    seq: int
+    timestamp: float
+    frames: Tuple[str, ...]
+    # one row of x, y, z (mm) and quaternion x, y, z, w per frame
+    poses: np.ndarray = field(repr=False)
+
+
+@dataclass(frozen=True)
+class ServoStats:
+    '''
+    timing of a streamed servo path, lateness of a tick is how late its point was sent
+    '''
+    points: int
+    # planned points per second
+    rate: float
+    # s
+    duration: float
+    # ticks sent more than one period late, the schedule is shifted by their lateness
+    missed_ticks: int
+    mean_lateness: float
+    max_lateness: float
+    # duration beyond the planned one, the sum of the shifts
+    drift: float
+    max_send_time: float
+
+
+@dataclass
+class ServerTuning:
+    '''
+    gRPC server settings, None keeps the gRPC default
+    '''
+    # RPC threads of grpc.server, 4 per stand if not set
+    workers: Optional[int] = None
+    # read-only request threads of the asyncio server
+    query_workers: int = 2
+    # RPCs beyond this are rejected with RESOURCE_EXHAUSTED by gRPC itself
+    max_concurrent_rpcs: Optional[int] = None
+    # s
+    keepalive_time: Optional[float] = None
+    keepalive_timeout: Optional[float] = None
+    # "none", "deflate" or "gzip"
+    compression: str = "none"
+    # MiB, both directions
+    max_message_size: Optional[float] = None
+    # method -> queued motions of the stand at which the method is rejected with RESOURCE_EXHAUSTED
+    admission_limits: Dict[str, int] = field(default_factory=dict)
+
+    def __post_init__(self):
+        assert self.workers is None or self.workers > 0, "workers must be positive"
+        assert self.query_workers > 0, "query workers must be positive"
+        assert self.max_concurrent_rpcs is None or self.max_concurrent_rpcs > 0, "max concurrent RPCs must be positive"
+        assert self.compression in ("none", "deflate", "gzip"), f"unknown compression: {self.compression}"
+        assert all(limit > 0 for limit in self.admission_limits.values()), "admission limits must be positive"
@@ -11,4 +11,40 @@ class WebsocketException(RobotException):
 
 
 class ConfigException(RobotException):
-    pass
\ No newline at end of file
+    pass
+
+
+class MotionCancelledException(RobotException):
+    pass
+
+
+class MotionPreemptedException(MotionCancelledException):
+    pass
+
+
+class MotionDeadlineException(MotionCancelledException):
+    pass
+
+
+class ServoPathException(RobotException):
+    pass
+
+
+class WebsocketTimeoutException(WebsocketException):
+    pass
+
+
+class SDKCallException(RobotException):
+    '''
+    xArm SDK call returned non-zero code
+    @param code: SDK return code (APIState)
+    @param error_code: controller error code at the time of the failure, 0 if none
+    '''
+    def __init__(self, message: str, code: int, error_code: int = 0):
+        super().__init__(message)
+        self.code = code
+        self.error_code = error_code
+
+
+class RetryBudgetExceededException(RobotException):
+    pass
@@ -1,6 +1,87 @@
+import os
+import time
+import threading
+import importlib
+from typing import Optional
+
+DEFAULT_STAND_NAME = "default_stand"
+
+
+def default_stand_name() -> str:
+    return os.environ.get("STAND_NAME", DEFAULT_STAND_NAME)
+
+
+class LazyModule:
+    '''
+    stands in for a heavy module (numpy, the xArm SDK, websocket-client) until its first attribute is read,
+    then imports it and copies its namespace, so later reads cost the same as on the module itself
+    '''
+    def __init__(self, name: str):
+        self.__name = name
+        self.__loaded = False
+        self.__lock = threading.Lock()
+
+
+    def __getattr__(self, attr: str):
+        # only called for names not copied yet: before the import and for submodules the module loads on access
+        module = importlib.import_module(self.__name)
+        with self.__lock:
+            if not self.__loaded:
+                self.__dict__.update(vars(module))
+                self.__loaded = True
+        value = getattr(module, attr)
+        self.__dict__[attr] = value
+        return value
+
+
 class Singleton(type):
     _instances = {}
     def __call__(cls, *args, **kwargs):
         if cls not in cls._instances:
             cls._instances[cls] = super(Singleton, cls).__call__(*args, **kwargs)
         return cls._instances[cls]
+
+
+class StandSingleton(type):
+    '''
+    one instance per class and stand, created with the stand name as the first argument
+    stand_name defaults to the STAND_NAME environment variable
+    instances of different stands are created independently, a slow robot connection never blocks another stand
+    '''
+    _instances = {}
+    _locks = {}
+    _locks_lock = threading.Lock()
+    def __call__(cls, stand_name: Optional[str] = None, *args, **kwargs):
+        key = (cls, stand_name or default_stand_name())
+        instance = cls._instances.get(key)
+        if instance is not None:
+            return instance
+        with StandSingleton._locks_lock:
+            lock = StandSingleton._locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in cls._instances:
+                cls._instances[key] = super(StandSingleton, cls).__call__(key[1], *args, **kwargs)
+        return cls._instances[key]
+
+
+    def created(cls, stand_name: Optional[str] = None) -> bool:
+        return (cls, stand_name or default_stand_name()) in cls._instances
+
+
+def wait_until(predicate, timeout: float, interval: float = 0.005, condition=None) -> bool:
+    '''
+    waits until predicate() returns True or timeout expires, returns the last predicate result
+    if condition (threading.Condition) is given, waiting also wakes up on condition.notify_all()
+    '''
+    deadline = time.monotonic() + timeout
+    while True:
+        if predicate():
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        if condition is not None:
+            with condition:
+                condition.wait(min(interval, remaining))
+        else:
+            time.sleep(min(interval, remaining))
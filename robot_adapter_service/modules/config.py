@@ -1,26 +1,33 @@
 import os, sys
 import json
 import logging
-from modules._utils import Singleton
+from modules._utils import StandSingleton, DEFAULT_STAND_NAME
 from modules._dataclasses import *
 
+CONFIG_FILE_PATH = os.path.abspath(os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                                                os.pardir, os.pardir, "config", "ext_config.json"))
 
-class SharedExtConfig(metaclass=Singleton):
-    def __init__(self):
-        self._logger = logging.getLogger("shared_ext_config")
-        self._load_config()
 
+def available_stands() -> List[str]:
+    '''
+    names of all stands described in the config file
+    '''
+    with open(CONFIG_FILE_PATH, "r") as f:
+        return list(json.load(f))
 
-    def _load_config(self):
-        try:
-            self._stand_name = os.environ["STAND_NAME"]
-        except KeyError:
-            _default_stand_name = "default_stand"
-            self._logger.warning(f'"STAND_NAME" environment variable not set, using: {_default_stand_name}')
-            self._stand_name = _default_stand_name
+
+class SharedExtConfig(metaclass=StandSingleton):
+    def __init__(self, stand_name: str):
+        self._logger = logging.getLogger("shared_ext_config").getChild(stand_name)
+        self._load_config(stand_name)
+
+
+    def _load_config(self, stand_name: str):
+        if "STAND_NAME" not in os.environ and stand_name == DEFAULT_STAND_NAME:
+            self._logger.warning(f'"STAND_NAME" environment variable not set, using: {DEFAULT_STAND_NAME}')
+        self._stand_name = stand_name
         self._logger.info(f"stand name: {self._stand_name}")
-        config_file_path = os.path.abspath(os.path.join(os.path.dirname(os.path.realpath(__file__)),
-                                                    os.pardir, os.pardir, "config", "ext_config.json"))
+        config_file_path = CONFIG_FILE_PATH
         self._logger.info(f'loading config from: {config_file_path}')
         with open(config_file_path, "r") as f:
             config_dict = json.load(f)[self._stand_name]
@@ -47,6 +54,61 @@ class SharedExtConfig(metaclass=Singleton):
         return self._ext_config.retry_attempts
     
 
+    @property
+    def retry_base_delay(self):
+        return self._ext_config.retry_base_delay
+    
+
+    @property
+    def retry_max_delay(self):
+        return self._ext_config.retry_max_delay
+    
+
+    @property
+    def ws_connect_timeout(self):
+        return self._ext_config.ws_connect_timeout
+    
+
+    @property
+    def ws_heartbeat_interval(self):
+        return self._ext_config.ws_heartbeat_interval
+    
+
+    @property
+    def ws_heartbeat_timeout(self):
+        return self._ext_config.ws_heartbeat_timeout
+    
+
+    @property
+    def ws_reconnect_max_delay(self):
+        return self._ext_config.ws_reconnect_max_delay
+    
+
+    @property
+    def catalog_ttl(self):
+        return self._ext_config.catalog_ttl
+    
+
+    @property
+    def catalog_snapshot_dir(self):
+        return self._ext_config.catalog_snapshot_dir
+    
+
+    @property
+    def servo_rate(self):
+        return self._ext_config.servo_rate
+    
+
+    @property
+    def servo_max_joint_speed(self):
+        return self._ext_config.servo_max_joint_speed
+    
+
+    @property
+    def servo_max_linear_speed(self):
+        return self._ext_config.servo_max_linear_speed
+    
+
     @property
     def velocities(self):
         return self._velocities
@@ -0,0 +1,340 @@
+import grpc
+import base64
+import inspect
+import contextvars
+from time import perf_counter
+from typing import Callable, Dict, Optional
+from modules.metrics import MetricsRegistry
+from modules.tracing import trace_request
+from modules.retry import deadline
+from modules.recorder import TraceRecorder
+
+_rpc_seconds = MetricsRegistry().histogram("cafebot_rpc_seconds", "duration of unary gRPC requests", ("method", "status"))
+_rpc_streams = MetricsRegistry().counter("cafebot_rpc_streams_total", "started streaming gRPC requests", ("method",))
+_rpc_rejected = MetricsRegistry().counter("cafebot_rpc_rejected_total", "requests rejected by admission control", ("method",))
+
+
+def _method_name(handler_call_details) -> str:
+    return handler_call_details.method.rsplit("/", 1)[-1]
+
+
+def _timed_handler(handler, method: str):
+    if handler is None:
+        return None
+    if handler.unary_unary is not None:
+        behavior = handler.unary_unary
+
+        def unary_unary(request, context):
+            start = perf_counter()
+            status = "error"
+            try:
+                response = behavior(request, context)
+                status = "ok"
+                return response
+            finally:
+                _rpc_seconds.labels(method, status).observe(perf_counter() - start)
+        return handler._replace(unary_unary=unary_unary)
+    _rpc_streams.labels(method).inc()
+    return handler
+
+
+def _async_timed_handler(handler, method: str):
+    if handler is None:
+        return None
+    if handler.unary_unary is not None:
+        behavior = handler.unary_unary
+
+        async def unary_unary(request, context):
+            start = perf_counter()
+            status = "error"
+            try:
+                response = await behavior(request, context)
+                status = "ok"
+                return response
+            finally:
+                _rpc_seconds.labels(method, status).observe(perf_counter() - start)
+        return handler._replace(unary_unary=unary_unary)
+    _rpc_streams.labels(method).inc()
+    return handler
+
+
+def _unary_response_behavior(handler) -> Optional[str]:
+    '''
+    name of the handler behavior answering with a single response: unary_unary or stream_unary, None for response streams
+    '''
+    if handler is None:
+        return None
+    if handler.unary_unary is not None:
+        return "unary_unary"
+    if handler.stream_unary is not None:
+        return "stream_unary"
+    return None
+
+
+def _traced_stream(behavior, method: str, request, context):
+    '''
+    responses of behavior traced as one request, the stream is driven in its own context,
+    so the trace ends in it even when gRPC closes the stream from another thread
+    '''
+    def responses():
+        with trace_request(method):
+            yield from behavior(request, context)
+    stream_context = contextvars.copy_context()
+    stream = responses()
+    try:
+        while True:
+            try:
+                response = stream_context.run(next, stream)
+            except StopIteration:
+                return
+            yield response
+    finally:
+        stream_context.run(stream.close)
+
+
+def _traced_handler(handler, method: str):
+    kind = _unary_response_behavior(handler)
+    if kind is not None:
+        behavior = getattr(handler, kind)
+
+        def traced(request, context):
+            with trace_request(method):
+                return behavior(request, context)
+        return handler._replace(**{kind: traced})
+    if handler is not None and handler.unary_stream is not None:
+        behavior = handler.unary_stream
+
+        def unary_stream(request, context):
+            return _traced_stream(behavior, method, request, context)
+        return handler._replace(unary_stream=unary_stream)
+    return handler
+
+
+def _async_traced_handler(handler, method: str):
+    kind = _unary_response_behavior(handler)
+    if kind is not None:
+        behavior = getattr(handler, kind)
+
+        async def traced(request, context):
+            with trace_request(method):
+                return await behavior(request, context)
+        return handler._replace(**{kind: traced})
+    if handler is not None and handler.unary_stream is not None and inspect.isasyncgenfunction(handler.unary_stream):
+        behavior = handler.unary_stream
+
+        async def unary_stream(request, context):
+            with trace_request(method):
+                async for response in behavior(request, context):
+                    yield response
+        return handler._replace(unary_stream=unary_stream)
+    return handler
+
+
+def _deadline_handler(handler):
+    # response streams do not retry motions, they run until the client cancels them
+    kind = _unary_response_behavior(handler)
+    if kind is None:
+        return handler
+    behavior = getattr(handler, kind)
+
+    def bounded(request, context):
+        with deadline(context.time_remaining()):
+            return behavior(request, context)
+    return handler._replace(**{kind: bounded})
+
+
+def _async_deadline_handler(handler):
+    kind = _unary_response_behavior(handler)
+    if kind is None:
+        return handler
+    behavior = getattr(handler, kind)
+
+    async def bounded(request, context):
+        with deadline(context.time_remaining()):
+            return await behavior(request, context)
+    return handler._replace(**{kind: bounded})
+
+
+def _recorded_handler(handler, recorder: TraceRecorder, handler_call_details):
+    if handler is None or handler.unary_unary is None:
+        return handler
+    behavior = handler.unary_unary
+    method = handler_call_details.method
+    metadata = [(key, value) for key, value in handler_call_details.invocation_metadata or () if isinstance(value, str)]
+
+    def unary_unary(request, context):
+        start = perf_counter()
+        ok = False
+        try:
+            response = behavior(request, context)
+            ok = True
+            return response
+        finally:
+            recorder.record("", "rpc", n=method, md=metadata, req=base64.b64encode(request.SerializeToString()).decode(),
+                            d=round(perf_counter() - start, 6), ok=ok)
+    return handler._replace(unary_unary=unary_unary)
+
+
+def _async_recorded_handler(handler, recorder: TraceRecorder, handler_call_details):
+    if handler is None or handler.unary_unary is None:
+        return handler
+    behavior = handler.unary_unary
+    method = handler_call_details.method
+    metadata = [(key, value) for key, value in handler_call_details.invocation_metadata or () if isinstance(value, str)]
+
+    async def unary_unary(request, context):
+        start = perf_counter()
+        ok = False
+        try:
+            response = await behavior(request, context)
+            ok = True
+            return response
+        finally:
+            recorder.record("", "rpc", n=method, md=metadata, req=base64.b64encode(request.SerializeToString()).decode(),
+                            d=round(perf_counter() - start, 6), ok=ok)
+    return handler._replace(unary_unary=unary_unary)
+
+
+def _queued_motions(limits: Dict[str, int], queued: Callable, handler_call_details) -> Optional[int]:
+    '''
+    queued motions of the requested stand if they reach the limit of the method, None if the request is admitted
+    '''
+    limit = limits.get(_method_name(handler_call_details))
+    if limit is None:
+        return None
+    depth = queued(handler_call_details)
+    return depth if depth is not None and depth >= limit else None
+
+
+def _rejected_handler(handler, method: str, depth: int):
+    # methods streaming responses do not queue motions, client streams are rejected before they are read
+    behavior = _unary_response_behavior(handler)
+    if behavior is None:
+        return handler
+    _rpc_rejected.labels(method).inc()
+    details = f"{depth} motions already queued on the stand, retry later"
+
+    def reject(request, context):
+        context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, details)
+    return handler._replace(**{behavior: reject})
+
+
+def _async_rejected_handler(handler, method: str, depth: int):
+    behavior = _unary_response_behavior(handler)
+    if behavior is None:
+        return handler
+    _rpc_rejected.labels(method).inc()
+    details = f"{depth} motions already queued on the stand, retry later"
+
+    async def reject(request, context):
+        await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, details)
+    return handler._replace(**{behavior: reject})
+
+
+class MetricsInterceptor(grpc.ServerInterceptor):
+    '''
+    records latency of unary requests and counts started streams per method
+    '''
+    def intercept_service(self, continuation, handler_call_details):
+        return _timed_handler(continuation(handler_call_details), _method_name(handler_call_details))
+
+
+class AsyncMetricsInterceptor(grpc.aio.ServerInterceptor):
+    '''
+    grpc.aio counterpart of MetricsInterceptor
+    '''
+    async def intercept_service(self, continuation, handler_call_details):
+        return _async_timed_handler(await continuation(handler_call_details), _method_name(handler_call_details))
+
+
+class TracingInterceptor(grpc.ServerInterceptor):
+    '''
+    traces requests, each request logs one summary of its phases, a response stream when it ends
+    '''
+    def intercept_service(self, continuation, handler_call_details):
+        return _traced_handler(continuation(handler_call_details), _method_name(handler_call_details))
+
+
+class AsyncTracingInterceptor(grpc.aio.ServerInterceptor):
+    '''
+    grpc.aio counterpart of TracingInterceptor
+    '''
+    async def intercept_service(self, continuation, handler_call_details):
+        return _async_traced_handler(await continuation(handler_call_details), _method_name(handler_call_details))
+
+
+class DeadlineInterceptor(grpc.ServerInterceptor):
+    '''
+    bounds retries of requests answered with a single response by the client deadline
+    '''
+    def intercept_service(self, continuation, handler_call_details):
+        return _deadline_handler(continuation(handler_call_details))
+
+
+class AsyncDeadlineInterceptor(grpc.aio.ServerInterceptor):
+    '''
+    grpc.aio counterpart of DeadlineInterceptor
+    '''
+    async def intercept_service(self, continuation, handler_call_details):
+        return _async_deadline_handler(await continuation(handler_call_details))
+
+
+class RecordingInterceptor(grpc.ServerInterceptor):
+    '''
+    records unary requests to the trace, so simulator.replay can issue them again
+    '''
+    def __init__(self, recorder: TraceRecorder):
+        self._recorder = recorder
+
+
+    def intercept_service(self, continuation, handler_call_details):
+        return _recorded_handler(continuation(handler_call_details), self._recorder, handler_call_details)
+
+
+class AsyncRecordingInterceptor(grpc.aio.ServerInterceptor):
+    '''
+    grpc.aio counterpart of RecordingInterceptor
+    '''
+    def __init__(self, recorder: TraceRecorder):
+        self._recorder = recorder
+
+
+    async def intercept_service(self, continuation, handler_call_details):
+        return _async_recorded_handler(await continuation(handler_call_details), self._recorder, handler_call_details)
+
+
+class AdmissionInterceptor(grpc.ServerInterceptor):
+    '''
+    rejects unary and client streaming requests with RESOURCE_EXHAUSTED before they reach the servicer
+    while the stand already has as many queued motions as the limit of the method
+    @param limits: method name -> queued motions at which the method is rejected, other methods are always admitted
+    @param queued: queued(handler_call_details) -> queued motions of the requested stand, None to admit the request
+    '''
+    def __init__(self, limits: Dict[str, int], queued: Callable):
+        self._limits = dict(limits)
+        self._queued = queued
+
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        depth = _queued_motions(self._limits, self._queued, handler_call_details)
+        if depth is None:
+            return handler
+        return _rejected_handler(handler, _method_name(handler_call_details), depth)
+
+
+class AsyncAdmissionInterceptor(grpc.aio.ServerInterceptor):
+    '''
+    grpc.aio counterpart of AdmissionInterceptor
+    '''
+    def __init__(self, limits: Dict[str, int], queued: Callable):
+        self._limits = dict(limits)
+        self._queued = queued
+
+
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+        depth = _queued_motions(self._limits, self._queued, handler_call_details)
+        if depth is None:
+            return handler
+        return _async_rejected_handler(handler, _method_name(handler_call_details), depth)
@@ -0,0 +1,33 @@
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+
+def configure_logging(level: int, fmt: str, slow_log_path: Optional[str] = None) -> QueueListener:
+    '''
+    routes all records through a queue, handlers run on the listener thread,
+    so the receive thread and the motion path never block on log I/O
+    @param slow_log_path: file receiving records of the "slow_ops" logger
+    '''
+    formatter = logging.Formatter(fmt)
+    handlers = []
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+    handlers.append(stream_handler)
+    if slow_log_path:
+        slow_handler = logging.FileHandler(slow_log_path)
+        slow_handler.setFormatter(formatter)
+        slow_handler.addFilter(logging.Filter("slow_ops"))
+        handlers.append(slow_handler)
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
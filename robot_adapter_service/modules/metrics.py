@@ -0,0 +1,270 @@
+import math
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Sequence, Tuple
+from modules._utils import Singleton
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _CounterChild:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("_value", "_function")
+
+    def __init__(self):
+        self._value = 0.0
+        self._function = None
+
+
+    @property
+    def value(self) -> float:
+        return self._function() if self._function is not None else self._value
+
+
+    def set(self, value: float):
+        self._value = value
+
+
+    def set_function(self, function: Callable[[], float]):
+        '''
+        gauge value is read from function on every scrape
+        '''
+        self._function = function
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "_counts", "_sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._bounds = bounds
+        # the last slot counts observations above the largest bound
+        self._counts = [0] * (len(bounds) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+    def snapshot(self) -> Tuple[list, float]:
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+
+    def labels(self, *values: str):
+        '''
+        returns the child for label values given in labelnames order
+        '''
+        child = self._children.get(values)
+        if child is None:
+            assert len(values) == len(self.labelnames), f"{self.name} expects labels {self.labelnames}"
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+
+    def _new_child(self):
+        raise NotImplementedError
+
+
+    def _render_child(self, values: tuple, child) -> list:
+        raise NotImplementedError
+
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in list(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+
+    def set_function(self, function: Callable[[], float]):
+        self.labels().set_function(function)
+
+
+    def _new_child(self):
+        return _GaugeChild()
+
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self._bounds = tuple(sorted(buckets))
+
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+
+    def time(self):
+        return self.labels().time()
+
+
+    def _new_child(self):
+        return _HistogramChild(self._bounds)
+
+
+    def _render_child(self, values, child):
+        counts, total = child.snapshot()
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self._bounds + (math.inf,), counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry(metaclass=Singleton):
+    '''
+    process-wide metrics, rendered in Prometheus text exposition format
+    '''
+    def __init__(self):
+        self._logger = logging.getLogger("metrics")
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in list(self._metrics.values())) + "\n"
+
+
+    def serve(self, address: str) -> Optional[ThreadingHTTPServer]:
+        '''
+        serves GET /metrics on host:port in a background thread
+        '''
+        host, _, port = address.rpartition(":")
+        registry = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host.strip("[]") or "0.0.0.0", int(port)), _Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics_server", daemon=True).start()
+        self._logger.info(f"serving metrics on http://{address}/metrics")
+        return self._server
+
+
+    def _register(self, metric_cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_cls(name, documentation, labelnames, **kwargs)
+            assert isinstance(metric, metric_cls), f"metric {name} already registered as {metric.kind}"
+            return metric
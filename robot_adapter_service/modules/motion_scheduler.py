@@ -0,0 +1,348 @@
+import time
+import uuid
+import queue
+import logging
+import itertools
+import threading
+import contextvars
+from collections import deque, OrderedDict
+from concurrent import futures
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Callable, Dict, Optional
+from modules._utils import StandSingleton
+from modules.robot_adapter import RobotAdapter
+from modules.metrics import MetricsRegistry
+from modules.tracing import span, annotate
+from modules.retry import detached_context
+from modules._exceptions import (MotionPreemptedException,
+                                 MotionDeadlineException,
+                                 MotionCancelledException)
+
+
+class MotionPriority(IntEnum):
+    urgent = 0
+    high = 1
+    normal = 2
+    low = 3
+
+
+@dataclass(order=True)
+class _MotionRequest:
+    priority: int
+    seq: int
+    name: str = field(compare=False)
+    func: Callable = field(compare=False)
+    future: futures.Future = field(compare=False)
+    submitted: float = field(compare=False)
+    # monotonic time until which the motion has to be started, None means no deadline
+    deadline: Optional[float] = field(compare=False, default=None)
+    preempted_by: Optional[str] = field(compare=False, default=None)
+    # context of the submitting request, the motion runs in it so its phases land in the request trace
+    context: contextvars.Context = field(compare=False, default_factory=contextvars.copy_context)
+    started: Optional[float] = field(compare=False, default=None)
+    finished: Optional[float] = field(compare=False, default=None)
+
+
+class MotionState(IntEnum):
+    queued = 0
+    running = 1
+    succeeded = 2
+    failed = 3
+    cancelled = 4
+
+
+class MotionHandle:
+    '''
+    handle of a motion started without waiting for it,
+    its progress is estimated from robot reports while it runs
+    '''
+    def __init__(self, motion_id: str, request: _MotionRequest, scheduler: "MotionScheduler"):
+        self.id = motion_id
+        self._request = request
+        self._scheduler = scheduler
+        self._final_progress = 0.0
+        request.future.add_done_callback(self._on_done)
+
+
+    @property
+    def name(self) -> str:
+        return self._request.name
+
+
+    @property
+    def future(self) -> futures.Future:
+        return self._request.future
+
+
+    @property
+    def state(self) -> MotionState:
+        future = self._request.future
+        if future.cancelled():
+            return MotionState.cancelled
+        if not future.done():
+            return MotionState.running if future.running() else MotionState.queued
+        error = future.exception()
+        if error is None:
+            return MotionState.succeeded
+        # preempted, stopped or expired in the queue
+        if isinstance(error, MotionCancelledException):
+            return MotionState.cancelled
+        return MotionState.failed
+
+
+    @property
+    def error(self) -> Optional[str]:
+        future = self._request.future
+        if future.cancelled():
+            return "cancelled before start"
+        if future.done() and future.exception() is not None:
+            return str(future.exception())
+        return None
+
+
+    def progress(self) -> float:
+        future = self._request.future
+        if future.done():
+            return self._final_progress
+        return self._scheduler.robot_progress() if future.running() else 0.0
+
+
+    def timing(self) -> Dict[str, float]:
+        '''
+        seconds spent in the queue and running so far
+        '''
+        request = self._request
+        now = time.monotonic()
+        started = request.started if request.started is not None else (request.finished or now)
+        return {"queued_time": started - request.submitted,
+                "running_time": (request.finished or now) - started if request.started is not None else 0.0}
+
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        '''
+        blocks until the motion is done or timeout expires, returns True if it is done
+        '''
+        futures.wait([self._request.future], timeout)
+        return self._request.future.done()
+
+
+    def cancel(self) -> bool:
+        return self._scheduler.cancel(self._request.future)
+
+
+    def _on_done(self, future: futures.Future):
+        # called on the executor thread before the next motion starts, so the robot progress is still this motion's
+        if self._request.finished is None:
+            self._request.finished = time.monotonic()
+        if not future.cancelled() and future.exception() is None:
+            self._final_progress = 1.0
+        elif self._request.started is not None:
+            self._final_progress = self._scheduler.robot_progress()
+
+
+class MotionScheduler(metaclass=StandSingleton):
+    '''
+    runs motions of a stand one at a time on its own executor thread, ordered by priority and then by submission order
+    '''
+    # finished motion handles kept for polling
+    _handle_history = 256
+
+    def __init__(self, stand_name: str):
+        self._logger = logging.getLogger("motion_scheduler").getChild(stand_name)
+        self._robot = RobotAdapter(stand_name)
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._running = None
+        self._handles: "OrderedDict[str, MotionHandle]" = OrderedDict()
+        self._wait_times = deque(maxlen=100)
+        self._stats = {"completed": 0, "failed": 0, "cancelled": 0, "expired": 0, "preempted": 0}
+        self._wait_seconds = MetricsRegistry().histogram("cafebot_motion_wait_seconds", "time motions spend in the scheduler queue",
+                                                         ("stand",)).labels(stand_name)
+        MetricsRegistry().gauge("cafebot_motion_queue_depth", "motions waiting in the scheduler queue",
+                                ("stand",)).labels(stand_name).set_function(self._queue.qsize)
+        self._thread = threading.Thread(target=self._run, name=f"motion_executor.{stand_name}", daemon=True)
+        self._thread.start()
+
+
+    def submit(self, name: str, func: Callable,
+               priority: MotionPriority = MotionPriority.normal,
+               timeout: Optional[float] = None,
+               preempt: bool = False) -> futures.Future:
+        '''
+        queues func as a motion and returns its future
+        @param timeout: seconds the motion may wait in the queue before it fails with MotionDeadlineException
+        @param preempt: if True, stops the running motion when it has lower priority
+        '''
+        return self._submit(name, func, priority, timeout, preempt).future
+
+
+    def start(self, name: str, func: Callable,
+              priority: MotionPriority = MotionPriority.normal,
+              timeout: Optional[float] = None,
+              preempt: bool = False) -> MotionHandle:
+        '''
+        queues func as a motion like submit() and returns a handle that can be looked up by its id later
+        the motion outlives the starting request, so the request deadline does not apply to it, only timeout does
+        '''
+        handle = MotionHandle(uuid.uuid4().hex, self._submit(name, func, priority, timeout, preempt, detached_context()), self)
+        with self._lock:
+            self._handles[handle.id] = handle
+            if len(self._handles) > self._handle_history:
+                for motion_id in [motion_id for motion_id, old in self._handles.items() if old.future.done()]:
+                    del self._handles[motion_id]
+                    if len(self._handles) <= self._handle_history:
+                        break
+        return handle
+
+
+    def handle(self, motion_id: str) -> Optional[MotionHandle]:
+        with self._lock:
+            return self._handles.get(motion_id)
+
+
+    def queued(self) -> int:
+        '''
+        motions waiting for the robot, the running one is not counted
+        '''
+        return self._queue.qsize()
+
+
+    def robot_progress(self) -> float:
+        return self._robot.motion_progress()
+
+
+    def _submit(self, name: str, func: Callable, priority: MotionPriority,
+                timeout: Optional[float], preempt: bool,
+                context: Optional[contextvars.Context] = None) -> _MotionRequest:
+        now = time.monotonic()
+        request = _MotionRequest(priority=int(priority),
+                                 seq=next(self._seq),
+                                 name=name,
+                                 func=func,
+                                 future=futures.Future(),
+                                 submitted=now,
+                                 deadline=None if timeout is None else now + timeout,
+                                 context=context or contextvars.copy_context())
+        with self._lock:
+            running = self._running
+            self._queue.put(request)
+        self._logger.info(f'queued motion "{name}", priority: {MotionPriority(priority).name}, queue depth: {self._queue.qsize()}')
+        if preempt and running is not None and running.priority > request.priority:
+            self._preempt(running, name)
+        return request
+
+
+    def cancel(self, future: futures.Future) -> bool:
+        '''
+        cancels a queued motion or stops it if it is already running
+        '''
+        if future.cancel():
+            return True
+        with self._lock:
+            running = self._running
+        if running is not None and running.future is future:
+            return self._preempt(running, "cancel")
+        return False
+
+
+    def stop(self, emergency: bool = False) -> int:
+        '''
+        cancels every queued motion and stops the robot, returns number of cancelled queued motions
+        '''
+        cancelled = 0
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request.future.cancel():
+                cancelled += 1
+        with self._lock:
+            # the executor cannot move on to the next motion meanwhile, so only the running one is stopped
+            if self._running is not None:
+                self._running.preempted_by = "stop"
+            self._robot.stop_motion(emergency=emergency)
+            self._stats["cancelled"] += cancelled
+        self._logger.warning(f"stopped, cancelled {cancelled} queued motions")
+        return cancelled
+
+
+    def stats(self) -> dict:
+        wait_times = list(self._wait_times)
+        with self._lock:
+            stats = dict(self._stats)
+        return {"queue_depth": self._queue.qsize(),
+                "running": self._running is not None,
+                "last_wait_time": wait_times[-1] if wait_times else 0.0,
+                "mean_wait_time": sum(wait_times) / len(wait_times) if wait_times else 0.0,
+                "max_wait_time": max(wait_times, default=0.0),
+                **stats}
+
+
+    def _count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+
+
+    def _preempt(self, request: _MotionRequest, reason: str) -> bool:
+        '''
+        stops request if it is still the running motion, returns False if it has finished meanwhile
+        '''
+        with self._lock:
+            if self._running is not request:
+                return False
+            self._logger.warning(f'preempting motion "{request.name}": {reason}')
+            request.preempted_by = reason
+            self._robot.stop_motion()
+        return True
+
+
+    def _execute(self, request: _MotionRequest, started: float):
+        annotate(queue_wait_ms=round((started - request.submitted) * 1000, 3))
+        with span(request.name):
+            self._robot.begin_motion()
+            return request.func()
+
+
+    def _run(self):
+        while True:
+            request = self._queue.get()
+            if not request.future.set_running_or_notify_cancel():
+                self._count("cancelled")
+                continue
+            started = request.started = time.monotonic()
+            if request.deadline is not None and started > request.deadline:
+                self._count("expired")
+                self._logger.warning(f'motion "{request.name}" expired after {started - request.submitted:.3f}s in queue')
+                request.started = None
+                request.finished = started
+                request.future.set_exception(MotionDeadlineException(f'motion "{request.name}" was not started before its deadline'))
+                continue
+            self._wait_times.append(started - request.submitted)
+            self._wait_seconds.observe(started - request.submitted)
+            with self._lock:
+                self._running = request
+            error = None
+            try:
+                result = request.context.run(self._execute, request, started)
+            except Exception as e:
+                error = e
+            finally:
+                # preemption only stops the running motion, a finished one is never stopped afterwards
+                with self._lock:
+                    self._running = None
+            request.finished = time.monotonic()
+            if error is None:
+                self._count("completed")
+                request.future.set_result(result)
+            elif request.preempted_by is not None:
+                self._count("preempted")
+                if not isinstance(error, MotionPreemptedException):
+                    error = MotionPreemptedException(f'motion "{request.name}" preempted by {request.preempted_by}: {error}')
+                request.future.set_exception(error)
+            else:
+                self._count("failed")
+                request.future.set_exception(error)
+            self._logger.info(f'motion "{request.name}" finished in {time.monotonic() - started:.3f}s')
@@ -0,0 +1,128 @@
+import json
+import time
+import queue
+import types
+import atexit
+import logging
+import threading
+from functools import wraps
+from typing import Optional
+
+TRACE_VERSION = 1
+
+
+class TraceRecorder:
+    '''
+    appends timestamped traffic of the service to a JSON lines file, records are written by a background thread
+    every session starts with a header record {"k": "header", "v": version, "wall": unix time},
+    other records carry "t" (seconds since the header), "s" (stand) and "k" (kind):
+    - "call": SDK method call, "n" name, "a" args, "kw" kwargs, "r" result, "d" duration
+    - "cb": SDK callback, "n" callback type, "data" its argument
+    - "tx", "rx": websocket text frame "f" sent or received
+    - "rpc": unary gRPC request, "n" full method, "md" metadata, "req" base64 request, "d" duration, "ok" succeeded
+    '''
+    def __init__(self, path: str):
+        self._logger = logging.getLogger("trace_recorder")
+        self.path = path
+        self._file = open(path, "a")
+        self._start = time.monotonic()
+        self._queue = queue.SimpleQueue()
+        self._queue.put({"k": "header", "v": TRACE_VERSION, "wall": time.time()})
+        self._writer = threading.Thread(target=self._write_loop, name="trace_recorder", daemon=True)
+        self._writer.start()
+        self._logger.info(f"recording trace to {path}")
+
+
+    def record(self, stand: str, kind: str, **fields):
+        fields["t"] = round(time.monotonic() - self._start, 6)
+        fields["s"] = stand
+        fields["k"] = kind
+        self._queue.put(fields)
+
+
+    def close(self):
+        self._queue.put(None)
+        self._writer.join()
+
+
+    def _write_loop(self):
+        while True:
+            record = self._queue.get()
+            if record is None:
+                break
+            try:
+                self._file.write(json.dumps(record, separators=(",", ":"), default=repr) + "\n")
+            except (TypeError, ValueError) as e:
+                self._logger.warning(f"failed to record {record.get('k')}: {e}")
+            # flush once a burst of records is written
+            if self._queue.empty():
+                self._file.flush()
+        self._file.close()
+
+
+_recorder: Optional[TraceRecorder] = None
+
+
+def configure(path: Optional[str]):
+    '''
+    starts recording to path, recording stays off if path is None
+    '''
+    global _recorder
+    if path is None:
+        return
+    _recorder = TraceRecorder(path)
+    atexit.register(_recorder.close)
+
+
+def current_recorder() -> Optional[TraceRecorder]:
+    return _recorder
+
+
+class RecordingXArmAPI:
+    '''
+    proxy of an XArmAPI instance recording method calls with results and durations and registered callbacks,
+    attribute reads (report data) pass through unrecorded
+    '''
+    def __init__(self, api, recorder: TraceRecorder, stand_name: str):
+        self._api = api
+        self._recorder = recorder
+        self._stand_name = stand_name
+        self._methods = {}
+
+
+    def __getattr__(self, name: str):
+        value = getattr(self._api, name)
+        if name.startswith("_") or not callable(value):
+            return value
+        method = self._methods.get(name)
+        if method is None:
+            if name.startswith("register_") and name.endswith("_callback"):
+                method = self._recording_registration(name, value)
+            else:
+                method = self._recording_call(name, value)
+            self._methods[name] = method
+        return method
+
+
+    def _recording_call(self, name: str, func):
+        @wraps(func)
+        def call(proxy, *args, **kwargs):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            proxy._recorder.record(proxy._stand_name, "call", n=name, a=args, kw=kwargs, r=result,
+                                   d=round(time.perf_counter() - start, 6))
+            return result
+        # bound to the proxy, so ret_raise reads error_code through it
+        return types.MethodType(call, self)
+
+
+    def _recording_registration(self, name: str, register):
+        callback_type = name[len("register_"):-len("_callback")]
+
+        @wraps(register)
+        def registration(proxy, callback=None, *args, **kwargs):
+            def recorded_callback(data):
+                proxy._recorder.record(proxy._stand_name, "cb", n=callback_type, data=data)
+                return callback(data)
+            return register(recorded_callback, *args, **kwargs)
+        return types.MethodType(registration, self)
@@ -0,0 +1,165 @@
+import time
+import random
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+from modules.metrics import MetricsRegistry
+from modules.tracing import span
+from modules._exceptions import (RobotException,
+                                 ConfigException,
+                                 SDKCallException,
+                                 MotionCancelledException,
+                                 RetryBudgetExceededException)
+
+# xArm SDK return codes that fail the same way on every attempt
+FATAL_API_CODES = frozenset({
+    -3,     # API_EXCEPTION
+    -4,     # CMD_NOT_EXIST
+    -6,     # TCP_LIMIT
+    -7,     # JOINT_LIMIT
+    -8,     # OUT_OF_RANGE
+    -9,     # EMERGENCY_STOP, never cleared by retrying
+    12,     # PARAM_ERROR
+})
+# controller error codes of unreachable targets, clean_error() does not make the same motion succeed
+FATAL_CONTROLLER_ERRORS = frozenset({
+    21,     # kinematics error
+    22,     # self-collision
+    23,     # joint angle exceeds limit
+    25,     # planning error
+    35,     # safety boundary limit
+})
+FATAL_EXCEPTIONS = (ConfigException, MotionCancelledException, ValueError, AssertionError)
+
+_retries = MetricsRegistry().counter("cafebot_retries_total", "failed attempts that were retried", ("scope", "function"))
+_giveups = MetricsRegistry().counter("cafebot_retry_giveups_total", "calls failed without retrying further", ("scope", "reason"))
+_deadline: ContextVar[Optional[float]] = ContextVar("cafebot_deadline", default=None)
+
+
+@contextmanager
+def deadline(timeout: Optional[float]):
+    '''
+    limits retries inside the block to timeout seconds, e.g. to gRPC context.time_remaining()
+    a nested deadline never extends the outer one
+    '''
+    if timeout is None:
+        yield
+        return
+    value = time.monotonic() + timeout
+    outer = _deadline.get()
+    token = _deadline.set(value if outer is None else min(outer, value))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def detached_context() -> contextvars.Context:
+    '''
+    copy of the current context without its deadline, for work that outlives the request starting it
+    '''
+    context = contextvars.copy_context()
+    context.run(_deadline.set, None)
+    return context
+
+
+def time_remaining() -> Optional[float]:
+    '''
+    seconds left of the current deadline, None if there is no deadline
+    '''
+    value = _deadline.get()
+    return None if value is None else max(0.0, value - time.monotonic())
+
+
+def bounded_timeout(timeout: float) -> float:
+    '''
+    timeout shortened to the current deadline
+    '''
+    remaining = time_remaining()
+    return timeout if remaining is None else min(timeout, remaining)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, FATAL_EXCEPTIONS):
+        return False
+    if isinstance(exc, SDKCallException):
+        return exc.code not in FATAL_API_CODES and exc.error_code not in FATAL_CONTROLLER_ERRORS
+    return isinstance(exc, RobotException)
+
+
+class RetryPolicy:
+    '''
+    retries a call with exponential backoff and jitter while the error is retryable,
+    attempts remain and the current deadline leaves time for the next attempt
+    '''
+    def __init__(self, scope: str, attempts: int,
+                 base_delay: float = 0.05,
+                 max_delay: float = 1.0,
+                 multiplier: float = 2.0,
+                 jitter: float = 0.5,
+                 classify: Callable[[BaseException], bool] = is_retryable):
+        assert attempts >= 1, "attempts must be at least 1"
+        assert 0.0 <= jitter <= 1.0, "jitter must be in [0, 1]"
+        self._logger = logging.getLogger(f"retry.{scope}")
+        self.scope = scope
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.classify = classify
+
+
+    def delay(self, attempt: int) -> float:
+        '''
+        backoff before retry number attempt (starting at 1), the jitter part is drawn uniformly
+        '''
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        return delay * (1.0 - self.jitter + self.jitter * random.random())
+
+
+    def call(self, func: Callable, *args,
+             on_retry: Optional[Callable[[int, BaseException], None]] = None,
+             interrupt: Optional[threading.Event] = None,
+             **kwargs):
+        '''
+        calls func(*args, **kwargs) until it succeeds or retrying makes no sense
+        @param on_retry: called with attempt number and error after the backoff, before the next attempt, may raise
+        @param interrupt: event cutting the backoff short, the last error is raised (after on_retry) when it is set
+        '''
+        name = getattr(func, "__name__", repr(func))
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if not self.classify(e):
+                    _giveups.labels(self.scope, "fatal").inc()
+                    self._logger.error(f"{name} failed with non-retryable error: {e}")
+                    raise
+                if attempt >= self.attempts:
+                    _giveups.labels(self.scope, "attempts").inc()
+                    self._logger.error(f"{name} failed after {attempt} attempts: {e}")
+                    raise
+                delay = self.delay(attempt)
+                remaining = time_remaining()
+                if remaining is not None and remaining <= delay:
+                    _giveups.labels(self.scope, "deadline").inc()
+                    self._logger.error(f"{name} failed, no time left to retry: {e}")
+                    raise RetryBudgetExceededException(f"{name} failed and the deadline leaves no time to retry: {e}") from e
+                _retries.labels(self.scope, name).inc()
+                self._logger.warning(f"attempt {attempt} of {name} failed, retrying in {delay:.3f}s: {e}")
+                interrupted = False
+                with span("retry_backoff", attempt=attempt):
+                    if interrupt is not None:
+                        interrupted = interrupt.wait(delay)
+                    else:
+                        time.sleep(delay)
+                if on_retry is not None:
+                    on_retry(attempt, e)
+                if interrupted:
+                    raise
@@ -1,24 +1,47 @@
+from __future__ import annotations
 import logging
 from functools import wraps
-from time import sleep
+from time import perf_counter
 from typing import List, Tuple, Union, Optional
 from enum import IntEnum
 import json
-from xarm.wrapper import XArmAPI
+import time
+import itertools
+from dataclasses import dataclass
 import threading
-from modules._utils import Singleton
+from modules._utils import StandSingleton, LazyModule, wait_until
 from modules.config import SharedExtConfig
 from modules._dataclasses import (Velocity,
     JointPose, 
     CartesianPose,
+    Waypoint,
     TCPOffset,
     BaseOffset,
+    TFSnapshot,
+    ServoStats,
 )
 from modules._exceptions import (RobotException, 
                                  WrongModeException,
-                                 ConfigException)
-from modules.xarm_ws import XArmWebsocket as WS
-import numpy as np
+                                 ConfigException,
+                                 SDKCallException,
+                                 MotionPreemptedException,
+                                 ServoPathException)
+from modules.xarm_ws import XArmWebsocket
+from modules.telemetry import TelemetryHub
+from modules.metrics import MetricsRegistry
+from modules.tracing import span, traced
+from modules.retry import RetryPolicy, bounded_timeout
+from modules.transforms import OffsetComparator, FrameChain
+from modules.recorder import current_recorder, RecordingXArmAPI
+from modules.servo import ServoStreamer, interpolate_path, check_path
+
+np = LazyModule("numpy")
+# the SDK is only needed with a real robot, not in simulation or replay
+_xarm_wrapper = LazyModule("xarm.wrapper")
+
+_sdk_call_seconds = MetricsRegistry().histogram("cafebot_sdk_call_seconds", "duration of xArm SDK calls", ("call",))
+_robot_enables = MetricsRegistry().counter("cafebot_enable_robot_total", "enable_robot recoveries")
+
 
 class MotionType(IntEnum):
     linear = 0
@@ -26,51 +49,134 @@ class MotionType(IntEnum):
     joint = 2
 
 
+@dataclass
+class _ShadowState:
+    '''
+    last robot configuration verified by the adapter, None means unknown
+    '''
+    tcp_offset: Optional[TCPOffset] = None
+    world_offset: Optional[BaseOffset] = None
+    mode: Optional[int] = None
+
+
+@dataclass
+class _MotionProgress:
+    '''
+    progress of the running motion estimated from report data: segments finished by the controller
+    plus the fraction of the current segment covered, by joint angles or TCP position
+    '''
+    # (joint, start, target) per segment, start is None when unknown
+    segments: List[Tuple[bool, Optional[np.ndarray], np.ndarray]]
+    # segments sent to the controller so far
+    queued: int = 0
+    # estimate taken when the motion was stopped, the controller queue is cleared then
+    frozen: Optional[float] = None
+    # points of a streamed servo path and how many of them were sent, progress is their ratio
+    points: int = 0
+    sent: int = 0
+
+
 def retry_decorator(func):
     '''
-    decorator to retry function call on RobotException up to self._config.retry_attempts times
+    decorator to retry function call with the shared retry policy, recovering the robot before each new attempt
     '''
     @wraps(func)
     def wrapper(self, *args, **kwargs):
-        logger = self._logger.getChild("retry_decorator")
         assert isinstance(self, RobotAdapter), "retry_decorator can only be used with RobotAdapter methods"
-        for attempt in range(self._config.retry_attempts):
+
+        def attempt():
             try:
                 return func(self, *args, **kwargs)
             except RobotException as e:
-                exc = e
-                logger.error(f"attempt {attempt + 1} failed: {e}")
+                if self._stop_requested.is_set() and not isinstance(e, MotionPreemptedException):
+                    raise MotionPreemptedException(f"{func.__name__} stopped: {e}") from e
+                raise
+
+        def recover(attempt_number: int, error: Exception):
+            if self._stop_requested.is_set():
+                raise MotionPreemptedException(f"{func.__name__} stopped: {error}") from error
+            if self._is_ready() and not self._robot.has_err_warn:
+                return
+            with span("retry_recovery", attempt=attempt_number):
                 self.enable_robot()
-                sleep(1)
-                logger.info("retrying...")
-        else:
-            raise exc
+                self._wait_for(self._is_ready, timeout=bounded_timeout(1.0))
+        attempt.__name__ = func.__name__
+        return self._retry_policy.call(attempt, on_retry=recover, interrupt=self._stop_requested)
     return wrapper
 
 
 def ret_raise(func):
     '''
-    decorator to raise RobotException if function returns non-zero code
+    decorator to raise SDKCallException if function returns non-zero code
     '''
     @wraps(func)
     def wrapper(*args, **kwargs):
-        ret = func(*args, **kwargs)
+        with span(f"sdk.{func.__name__}") as attributes:
+            start = perf_counter()
+            ret = func(*args, **kwargs)
+            _sdk_call_seconds.labels(func.__name__).observe(perf_counter() - start)
+            attributes["ret"] = ret
         if ret != 0:
-            raise RobotException(f"{func.__name__} failed: {ret}")
+            # the controller error explains HAS_ERROR, e.g. an unreachable target
+            error_code = getattr(getattr(func, "__self__", None), "error_code", 0) or 0
+            raise SDKCallException(f"{func.__name__} failed: {ret}, error code: {error_code}", code=ret, error_code=error_code)
     return wrapper
 
 
-class RobotAdapter(metaclass=Singleton):
-    def __init__(self):
-        self._logger = logging.getLogger("robot_adapter")
-        self._config = SharedExtConfig()
+def _connect_xarm(port: str, **kwargs):
+    return _xarm_wrapper.XArmAPI(port, **kwargs)
+
+
+class RobotAdapter(metaclass=StandSingleton):
+    # callable creating the SDK connection, replaced by simulator.fake_xarm.FakeXArmAPI in simulation
+    api_factory = _connect_xarm
+
+    def __init__(self, stand_name: str):
+        self._logger = logging.getLogger("robot_adapter").getChild(stand_name)
+        self._stand_name = stand_name
+        self._config = SharedExtConfig(stand_name)
+        self._ws = XArmWebsocket(stand_name)
+        self._telemetry = TelemetryHub(stand_name)
         self._asked_mode = 0
         self._enable_lock = threading.Lock()
-        self._robot = XArmAPI(self._config.robot_ip,
-                              is_radian=False,
-                              do_not_open=False)
-        self._logger.info(f"Robot connection config:\n\tstream type: {self._robot._arm._stream_type}\n\tenable_report: {self._robot._arm._enable_report}")
-        self._set_mode()
+        self._stop_requested = threading.Event()
+        self._retry_policy = RetryPolicy("robot",
+                                         attempts=self._config.retry_attempts,
+                                         base_delay=self._config.retry_base_delay,
+                                         max_delay=self._config.retry_max_delay)
+        self._shadow = _ShadowState()
+        self._report_condition = threading.Condition()
+        # joint solutions of the configured cartesian poses keyed by position, orientation, TCP offset and world offset,
+        # filled by precompute_ik()
+        self._ik_cache = {}
+        # offsets are only compared on the motion executor thread
+        self._offset_comparator = OffsetComparator(tolerance=0.01)
+        # frames are recomputed on the report thread, readers only swap in the latest snapshot
+        self._frame_chain = FrameChain()
+        self._tf_seq = itertools.count()
+        self._tfs: Optional[TFSnapshot] = None
+        self._progress: Optional[_MotionProgress] = None
+        self._servo_streamer = ServoStreamer(stand_name)
+        self._robot = RobotAdapter.api_factory(self._config.robot_ip,
+                                               is_radian=False,
+                                               do_not_open=False)
+        recorder = current_recorder()
+        if recorder is not None:
+            self._robot = RecordingXArmAPI(self._robot, recorder, stand_name)
+        try:
+            self._robot.register_connect_changed_callback(self._on_connect_changed)
+            self._robot.register_error_warn_changed_callback(self._on_error_warn_changed)
+            self._robot.register_report_callback(self._on_report_data)
+            self._robot.register_state_changed_callback(self._on_report)
+            self._robot.register_mode_changed_callback(self._on_report)
+            self._logger.info(f"Robot connection config:\n\tstream type: {self._robot._arm._stream_type}\n\tenable_report: {self._robot._arm._enable_report}")
+            self._set_mode()
+        except BaseException:
+            # the adapter is created again on retry, the connection and SDK threads of this one must not outlive it
+            self._logger.warning("robot adapter setup failed, disconnecting")
+            self._robot.disconnect()
+            raise
+        self._ws.add_catalog_listener(self._on_catalog_changed)
         
     
     def park(self):
@@ -80,94 +186,467 @@ class RobotAdapter(metaclass=Singleton):
         self._logger.info("robot parked successfully")
 
 
-    def _set_tcp_config(self, name: str):
-        available_configs = WS().get_tcp_configs()
+    def _invalidate_shadow(self, reason: str):
+        self._logger.debug(f"invalidating shadow state: {reason}")
+        self._shadow = _ShadowState()
+
+
+    def _on_connect_changed(self, data: dict):
+        self._invalidate_shadow(f"connection changed: {data}")
+        self._on_report(data)
+
+
+    def _on_error_warn_changed(self, data: dict):
+        if data.get("error_code") or data.get("warn_code"):
+            self._invalidate_shadow(f"error/warn changed: {data}")
+        self._on_report(data)
+
+
+    def _on_report(self, data: dict):
+        with self._report_condition:
+            self._report_condition.notify_all()
+
+
+    def _on_report_data(self, data: dict):
+        self._telemetry.publish(joints=data["joints"],
+                                tcp_pose=data["cartesian"],
+                                mode=self._robot.mode,
+                                state=data["state"],
+                                error_code=data["error_code"],
+                                warn_code=data["warn_code"])
+        self._update_tfs(data["cartesian"])
+        self._on_report(data)
+
+
+    def _update_tfs(self, tcp_pose: List[float]):
+        poses = self._frame_chain.update(self._robot.world_offset, tcp_pose, self._robot.tcp_offset, degrees=True)
+        self._tfs = TFSnapshot(seq=next(self._tf_seq),
+                               timestamp=time.time(),
+                               frames=FrameChain.FRAMES,
+                               poses=poses)
+
+
+    def current_tfs(self) -> TFSnapshot:
+        '''
+        latest frames computed from the report stream, the controller is not queried
+        '''
+        tfs = self._tfs
+        if tfs is None:
+            raise RobotException("no robot report received yet")
+        return tfs
+
+
+    def _on_catalog_changed(self, name: str, catalog: dict):
+        self._logger.info(f"{name} catalog changed, dropping cached joint solutions")
+        self._ik_cache = {}
+        self._invalidate_shadow(f"{name} catalog changed")
+
+
+    def _wait_for(self, predicate, timeout: float) -> bool:
+        '''
+        waits until predicate over SDK report data holds, rechecking on every report and at least every 10 ms
+        '''
+        return wait_until(predicate, timeout, interval=0.01, condition=self._report_condition)
+
+
+    def _is_ready(self) -> bool:
+        return not self._robot.has_error and self._robot.state < 4
+
+
+    def _offset_matches(self, current_config: List[float], config: Union[TCPOffset, BaseOffset]) -> bool:
+        '''
+        compares offset reported by SDK (orientation in degrees) with config (orientation in radians)
+        '''
+        return self._offset_comparator.matches(current_config, config.as_array())
+
+
+    def _ik_key(self, pose: CartesianPose, tcp_config: TCPOffset) -> tuple:
+        world_offset = tuple(round(value, 3) for value in self._robot.world_offset)
+        return (pose.position, pose.orientation, tuple(tcp_config.as_array()), world_offset)
+
+
+    @traced("ik")
+    def _solve_ik(self, pose: CartesianPose, tcp_config: TCPOffset) -> Optional[List[float]]:
+        '''
+        solves IK of pose on the controller with tcp_config active and caches the joint angles
+        '''
+        code, angles = self._robot.get_inverse_kinematics(list(pose.position) + list(pose.orientation),
+                                                          input_is_radian=False, return_is_radian=False)
+        if code != 0:
+            self._logger.warning(f"inverse kinematics failed for pose {pose}: {code}")
+            return None
+        self._ik_cache[self._ik_key(pose, tcp_config)] = angles
+        return angles
+
+
+    def _joint_solution(self, pose: CartesianPose, tcp_config: TCPOffset) -> Optional[List[float]]:
+        '''
+        cached joint angles reaching pose with tcp_config active, None unless precompute_ik() solved it
+        '''
+        return self._ik_cache.get(self._ik_key(pose, tcp_config))
+
+
+    def _joint_speed(self, linear_speed: float) -> float:
+        '''
+        joint speed (deg/s) of a joint-planned cartesian move at linear_speed (mm/s),
+        the controller takes the same fraction of the max joint speed as linear_speed is of the max TCP speed
+        '''
+        return linear_speed / self._robot.tcp_speed_limit[1] * self._robot.joint_speed_limit[1]
+
+
+    def precompute_ik(self) -> None:
+        '''
+        solves and caches joint angles of every configured cartesian pose, switching TCP config as needed,
+        only these are cached: other targets are solved by the controller, so the cache stays as small as the config
+        '''
+        for name in self._config.poses.__annotations__:
+            pose = getattr(self._config.poses, name)
+            if not isinstance(pose, CartesianPose):
+                continue
+            self._set_mode(0)
+            tcp_config = self._set_tcp_config(pose.tcp)
+            if self._solve_ik(pose, tcp_config) is not None:
+                self._logger.info(f'cached joint solution of pose "{name}"')
+
+
+    @traced()
+    def _set_tcp_config(self, name: str) -> TCPOffset:
+        available_configs = self._ws.get_tcp_configs()
+        if name not in available_configs:
+            # catalog might be cached before the config was added, fetch it once more
+            self._ws.invalidate_catalogs()
+            available_configs = self._ws.get_tcp_configs()
         if name not in available_configs:
             available_configs_str = "\n".join(f"- {name}: {value}" for name, value in available_configs.items())
             self._logger.error(f'not found TCP config "{name}" from available:\n{available_configs_str}')
             raise ConfigException(f"TCP config '{name}' not available")
         config = available_configs[name]
         assert isinstance(config, TCPOffset), f"expected TCPOffset, got {type(config)}"
+        if self._shadow.tcp_offset == config and self._offset_matches(self._robot.tcp_offset, config):
+            self._logger.info(f'TCP config "{name}" already active')
+            return config
         self._logger.info(f'setting TCP config "{name}": {config}')
         ret_raise(self._robot.set_tcp_offset)(config.as_list(), is_radian=True)
         current_config = self._robot.tcp_offset
-        current_config[3:] = list(map(lambda x: round(x / 180 * 3.14159, 4), current_config[3:]))
-        if np.linalg.norm(np.array(current_config) - np.array(config.as_list())) > 0.01:
+        if not self._offset_matches(current_config, config):
             err_msg = f"failed to set TCP config '{name}': {current_config} vs {config}"
             self._logger.error(err_msg)
             raise RobotException(err_msg)
         self._logger.info(f'TCP config "{name}" set successfully')
-        self.enable_robot()
+        self._resume()
+        self._shadow.tcp_offset = config
+        return config
 
 
+    @traced()
     def _set_base_config(self, name: str):
-        available_configs = WS().get_base_configs()
+        available_configs = self._ws.get_base_configs()
+        if name not in available_configs:
+            # catalog might be cached before the config was added, fetch it once more
+            self._ws.invalidate_catalogs()
+            available_configs = self._ws.get_base_configs()
         if name not in available_configs:
             available_configs_str = "\n".join(f"- {name}: {value}" for name, value in available_configs.items())
             self._logger.error(f'not found base config "{name}" from available:\n{available_configs_str}')
             raise ConfigException(f"base config '{name}' not available")
         config = available_configs[name]
         assert isinstance(config, BaseOffset), f"expected BaseOffset, got {type(config)}"
+        if self._shadow.world_offset == config and self._offset_matches(self._robot.world_offset, config):
+            self._logger.info(f'base config "{name}" already active')
+            return
         self._logger.info(f'current base config: {self._robot.world_offset}')
         self._logger.info(f'setting base config "{name}": {config}')
         ret_raise(self._robot.set_world_offset)(config.as_list(), is_radian=True)
         # get and check if config was set
-        sleep(0.5)
+        with span("verify"):
+            self._wait_for(lambda: self._offset_matches(self._robot.world_offset, config), timeout=0.5)
         current_config = self._robot.world_offset
-        current_config[3:] = list(map(lambda x: round(x / 180 * 3.14159, 4), current_config[3:]))
-        if np.linalg.norm(np.array(current_config) - np.array(config.as_list())) > 0.01:
+        if not self._offset_matches(current_config, config):
             err_msg = f"failed to set base config '{name}': {current_config} vs {config}"
             self._logger.error(err_msg)
             raise RobotException(err_msg)
         self._logger.info(f'base config "{name}" set successfully')
-        self.enable_robot()
+        self._resume()
+        self._shadow.world_offset = config
         
 
     @retry_decorator
+    @traced()
     def move_to(self, pose: Union[JointPose, CartesianPose],
                 velocity: Velocity, 
                 linear: Optional[bool] = False) -> None:
         '''
         moves robot to specified pose
-        @param linear: if True and pose is CartesianPose, robot will move linearly
+        @param linear: if True and pose is CartesianPose, robot will move linearly,
+            otherwise along a joint-planned path at the joint speed the controller derives from velocity.linear
         '''
         self._set_mode(0)
         if isinstance(pose, JointPose):
+            self._track_move(pose.values, joint=True)
             ret_raise(self._robot.set_servo_angle)(angle=pose.values, speed=velocity.joint, wait=True)
         elif isinstance(pose, CartesianPose):
-            self._set_tcp_config(pose.tcp)
+            tcp_config = self._set_tcp_config(pose.tcp)
             self._logger.info(f"moving to pose: {pose}, current mode: {self._robot.mode}, state: {self._robot.state}")
             if linear:
+                self._track_move(pose.position, joint=False)
                 ret_raise(self._robot.set_position)(*pose.position, *pose.orientation, speed=velocity.linear, wait=True, motion_type=MotionType.linear)
+            elif (angles := self._joint_solution(pose, tcp_config)) is not None:
+                # the same path as set_position with MotionType.joint, without solving IK on the controller again
+                self._track_move(angles, joint=True)
+                ret_raise(self._robot.set_servo_angle)(angle=angles, speed=self._joint_speed(velocity.linear), wait=True)
             else:
+                self._track_move(pose.position, joint=False)
                 ret_raise(self._robot.set_position)(*pose.position, *pose.orientation, speed=velocity.linear, wait=True, motion_type=MotionType.joint)
         else:
             raise ValueError("pose must be JointPose or CartesianPose")
+        if self._stop_requested.is_set():
+            raise MotionPreemptedException("motion stopped before reaching target pose")
+
+
+    @traced()
+    def execute_trajectory(self, waypoints: List[Waypoint], linear: Optional[bool] = True,
+                           timeout: Optional[float] = None) -> None:
+        '''
+        queues all waypoints to the controller without waiting in between, blending corners with blend_radius,
+        and blocks until the whole path is done
+        the trajectory is not retried as a whole, because the robot may stop anywhere along the path
+        @param linear: if True, cartesian segments move linearly
+        @param timeout: seconds to wait for the path to finish
+        '''
+        if not waypoints:
+            return
+        tcps = {waypoint.pose.tcp for waypoint in waypoints if isinstance(waypoint.pose, CartesianPose)}
+        if len(tcps) > 1:
+            raise ConfigException(f"all cartesian waypoints of a trajectory must use the same TCP, got: {tcps}")
+        self._set_mode(0)
+        if tcps:
+            self._set_tcp_config(tcps.pop())
+        motion_type = MotionType.linear if linear else MotionType.joint
+        self._logger.info(f"executing trajectory of {len(waypoints)} waypoints")
+        last = len(waypoints) - 1
+        self._track([self._progress_target(waypoint.pose) for waypoint in waypoints])
+        progress = self._progress
+        for i, waypoint in enumerate(waypoints):
+            pose = waypoint.pose
+            progress.queued = i + 1
+            # the last waypoint stops exactly and waits until every queued segment is done
+            radius = waypoint.blend_radius if i < last and waypoint.blend_radius > 0 else None
+            wait = i == last
+            if isinstance(pose, JointPose):
+                ret_raise(self._robot.set_servo_angle)(angle=pose.values, speed=waypoint.velocity, radius=radius,
+                                                       wait=wait, timeout=timeout)
+            elif isinstance(pose, CartesianPose):
+                ret_raise(self._robot.set_position)(*pose.position, *pose.orientation, speed=waypoint.velocity, radius=radius,
+                                                    wait=wait, timeout=timeout, motion_type=motion_type)
+            else:
+                raise ValueError("pose must be JointPose or CartesianPose")
+        if self._stop_requested.is_set():
+            raise MotionPreemptedException("trajectory stopped before reaching its last waypoint")
+        self._logger.info("trajectory executed successfully")
+
+
+    @traced()
+    def stream_servo(self, points: np.ndarray, cartesian: bool,
+                     rate: Optional[float] = None,
+                     tcp: Optional[str] = None) -> ServoStats:
+        '''
+        switches the arm to servo mode, sends points one per tick with set_servo_cartesian or set_servo_angle_j
+        and switches back to position mode, the path must stay within the servo speed limits of the stand
+        the path is not retried, because the robot may stop anywhere along it
+        @param points: (N, 6) joint angles in degrees or x, y, z (mm), roll, pitch, yaw (degrees) of the TCP in the base frame
+        @param rate: points per second, servo_rate of the stand if not set
+        @param tcp: TCP config of cartesian points, the current one if not set
+        '''
+        rate = rate or self._config.servo_rate
+        points = np.asarray(points, dtype=float)
+        self._set_mode(0)
+        if cartesian and tcp:
+            self._set_tcp_config(tcp)
+        start = self._robot.position if cartesian else self._robot.angles
+        check_path(start, points, rate, cartesian,
+                   max_joint_speed=self._config.servo_max_joint_speed,
+                   max_linear_speed=self._config.servo_max_linear_speed)
+        progress = self._progress = _MotionProgress(segments=[], points=len(points))
+        send = self._robot.set_servo_cartesian if cartesian else self._robot.set_servo_angle_j
+        self._logger.info(f"streaming {len(points)} servo points at {rate} Hz, cartesian: {cartesian}")
+        self._set_mode(1)
+        try:
+            stats = self._servo_streamer.run(points, rate, send,
+                                             stop=self._stop_requested,
+                                             on_tick=lambda sent: setattr(progress, "sent", sent))
+        finally:
+            self._leave_servo_mode()
+        self._logger.info(f"servo path streamed: {stats}")
+        return stats
+
+
+    def servo_trajectory(self, waypoints: List[Waypoint], rate: Optional[float] = None) -> ServoStats:
+        '''
+        streams straight segments from the current pose through waypoints at their velocities, limited by the servo speed limits,
+        unlike execute_trajectory the path passes every waypoint without stopping and blend radii are ignored
+        @param waypoints: all joint or all cartesian poses with the same TCP
+        '''
+        if not waypoints:
+            raise ServoPathException("servo trajectory has no waypoints")
+        kinds = {type(waypoint.pose) for waypoint in waypoints}
+        if len(kinds) > 1:
+            raise ServoPathException("servo trajectory waypoints must be all joint or all cartesian poses")
+        cartesian = kinds.pop() is CartesianPose
+        tcp = None
+        if cartesian:
+            tcps = {waypoint.pose.tcp for waypoint in waypoints}
+            if len(tcps) > 1:
+                raise ConfigException(f"all cartesian waypoints of a trajectory must use the same TCP, got: {tcps}")
+            tcp = tcps.pop()
+            self._set_mode(0)
+            if tcp:
+                self._set_tcp_config(tcp)
+        rate = rate or self._config.servo_rate
+        limit = self._config.servo_max_linear_speed if cartesian else self._config.servo_max_joint_speed
+        targets = [list(waypoint.pose.position) + list(waypoint.pose.orientation) if cartesian else list(waypoint.pose.values)
+                   for waypoint in waypoints]
+        points = interpolate_path(self._robot.position if cartesian else self._robot.angles, targets,
+                                  [min(waypoint.velocity, limit) for waypoint in waypoints], rate, cartesian,
+                                  angular_speed=self._config.servo_max_joint_speed)
+        return self.stream_servo(points, cartesian, rate=rate, tcp=tcp)
+
+
+    def _leave_servo_mode(self):
+        # recoveries re-apply the asked mode, they must not put the arm back into servo mode
+        self._asked_mode = 0
+        try:
+            self._set_mode(0)
+        except RobotException as e:
+            self._logger.warning(f"failed to leave servo mode, the next motion switches modes: {e}")
+
+
+    def begin_motion(self) -> None:
+        '''
+        clears a stop request left from the previous motion, called by the motion scheduler before each motion
+        '''
+        self._stop_requested.clear()
+        self._progress = None
+
+
+    def _progress_target(self, pose: Union[JointPose, CartesianPose]) -> Tuple[bool, np.ndarray]:
+        if isinstance(pose, JointPose):
+            return True, np.array(pose.values, dtype=float)
+        return False, np.array(pose.position, dtype=float)
+
+
+    def _track(self, targets: List[Tuple[bool, np.ndarray]]):
+        '''
+        starts tracking the progress of segments to targets, each starting where the previous one ends
+        '''
+        frame = self._telemetry.latest()
+        # last known joint angles and TCP position, a segment of one kind leaves the other one unknown
+        last = {True: None, False: None}
+        if frame is not None:
+            last = {True: np.array(frame.joints, dtype=float), False: np.array(frame.tcp_pose[:3], dtype=float)}
+        segments = []
+        for joint, target in targets:
+            start = last[joint]
+            segments.append((joint, None if start is None else start[:len(target)], target))
+            last = {joint: target, not joint: None}
+        self._progress = _MotionProgress(segments=segments)
+
+
+    def _track_move(self, target: List[float], joint: bool):
+        self._track([(joint, np.array(target[:6] if joint else target[:3], dtype=float))])
+        self._progress.queued = 1
+
+
+    def motion_progress(self) -> float:
+        '''
+        progress of the running motion from 0 to 1 estimated from the latest report, 0 if it is unknown
+        '''
+        progress = self._progress
+        if progress is None:
+            return 0.0
+        if progress.frozen is not None:
+            return progress.frozen
+        if progress.points:
+            return progress.sent / progress.points
+        total = len(progress.segments)
+        # the last segment is done only when the motion returns
+        done = min(total - 1, max(0, progress.queued - self._robot.cmd_num))
+        joint, start, target = progress.segments[done]
+        frame = self._telemetry.latest()
+        fraction = 0.0
+        if frame is not None and start is not None:
+            current = np.array(frame.joints[:len(target)] if joint else frame.tcp_pose[:3], dtype=float)
+            length = np.linalg.norm(target - start)
+            if length > 1e-6:
+                fraction = min(1.0, max(0.0, 1.0 - np.linalg.norm(target - current) / length))
+        return (done + fraction) / total
+
+
+    def stop_motion(self, emergency: bool = False) -> None:
+        '''
+        stops current motion, the interrupted move_to raises MotionPreemptedException instead of retrying
+        '''
+        self._logger.warning(f"stopping motion, emergency: {emergency}")
+        progress = self._progress
+        if progress is not None and progress.frozen is None:
+            progress.frozen = self.motion_progress()
+        self._stop_requested.set()
+        if emergency:
+            self._robot.emergency_stop()
+        else:
+            self._robot.set_state(4)
+        self._invalidate_shadow("motion stopped")
+        with self._report_condition:
+            self._report_condition.notify_all()
         
 
     @retry_decorator
+    @traced()
     def _set_mode(self, mode: int=None) -> None:
         if mode is None:
             mode = self._asked_mode
+        if self._shadow.mode == mode and self._robot.mode == mode and self._robot.state < 4:
+            # verified since the last stop, error or reconnect, each of them invalidates the shadow
+            return
         if self._robot.has_err_warn:
+            self._invalidate_shadow("robot has error or warning")
+            # left from an earlier failure, retryable since enable_robot() clears it
             raise RobotException(f"robot has error or warning: {self._robot.error_code}, {self._robot.warn_code}")
+        if self._robot.state >= 4:
+            # stopped (e.g. after stop_motion) or not ready, motion commands would be rejected
+            self.enable_robot()
         if self._robot.mode == mode:
+            self._shadow.mode = mode
             return
-        if self._robot.state == 5:
-            self.enable_robot()
         self._logger.info(f"setting mode {self._robot.mode} -> {mode}")
         self._asked_mode = mode
         ret_raise(self._robot.set_mode)(mode)
         ret_raise(self._robot.set_state)(0)
-        sleep(0.1)
+        with span("verify"):
+            self._wait_for(lambda: self._robot.mode == mode and self._robot.state == 0, timeout=0.5)
         # check if mode was set
         if self._robot.mode != mode:
             raise WrongModeException(f"current mode: {self._robot.mode}, asked mode: {mode}")
         if self._robot.state != 0:
             raise WrongModeException(f"failed to set state 0: {self._robot.state}")
+        self._shadow.mode = mode
 
 
+    @traced()
     def enable_robot(self) -> None:
+        _robot_enables.inc()
+        self._invalidate_shadow("enabling robot")
+        self._enable()
+
+
+    @traced("resume")
+    def _resume(self) -> None:
+        '''
+        re-enables the robot after an offset change, which only stops it, so mode and offsets in the shadow stay valid
+        '''
+        self._enable()
+
+
+    def _enable(self) -> None:
         self._logger.info("enabling robot")
         with self._enable_lock:
             self._robot.clean_error()
@@ -0,0 +1,142 @@
+from __future__ import annotations
+import time
+import logging
+import threading
+from time import perf_counter
+from typing import Callable, Optional, Sequence
+from modules.metrics import MetricsRegistry
+from modules.transforms import wrap_angle
+from modules._dataclasses import ServoStats
+from modules._exceptions import MotionPreemptedException, SDKCallException, ServoPathException
+from modules._utils import LazyModule
+
+np = LazyModule("numpy")
+
+_servo_lateness = MetricsRegistry().histogram("cafebot_servo_tick_lateness_seconds", "lateness of streamed servo points",
+                                              ("stand",))
+_servo_missed_ticks = MetricsRegistry().counter("cafebot_servo_missed_ticks_total", "servo points sent more than one period late",
+                                                ("stand",))
+
+
+def _steps(points: np.ndarray, cartesian: bool) -> np.ndarray:
+    '''
+    difference between consecutive points, orientation differences of cartesian points are wrapped to [-180, 180)
+    '''
+    steps = np.diff(points, axis=0)
+    if cartesian:
+        steps[:, 3:] = np.rad2deg(wrap_angle(np.deg2rad(steps[:, 3:])))
+    return steps
+
+
+def interpolate_path(start: Sequence[float], targets: Sequence[Sequence[float]], speeds: Sequence[float],
+                     rate: float, cartesian: bool, angular_speed: Optional[float] = None) -> np.ndarray:
+    '''
+    samples straight segments from start through targets at rate points per second, excluding start
+    each segment is covered at its speed (deg/s of the largest joint move, mm/s of the TCP), without blending at targets
+    @param start, targets: joint angles in degrees or x, y, z (mm), roll, pitch, yaw (degrees)
+    @param angular_speed: deg/s limit of cartesian orientation changes, slows down segments that mostly rotate the TCP
+    @return: (N, 6) points, the last one is the last target
+    '''
+    nodes = np.vstack([np.asarray(start, dtype=float)[:6], np.asarray(targets, dtype=float)[:, :6]])
+    steps = _steps(nodes, cartesian)
+    speeds = np.asarray(speeds, dtype=float)
+    if cartesian:
+        durations = np.linalg.norm(steps[:, :3], axis=1) / speeds
+        if angular_speed is not None:
+            durations = np.maximum(durations, np.abs(steps[:, 3:]).max(axis=1) / angular_speed)
+    else:
+        durations = np.abs(steps).max(axis=1) / speeds
+    counts = np.maximum(1, np.ceil(durations * rate)).astype(int)
+    fractions = np.concatenate([np.arange(1, count + 1) / count for count in counts])
+    segments = np.repeat(np.arange(len(counts)), counts)
+    points = nodes[segments] + steps[segments] * fractions[:, None]
+    if cartesian:
+        points[:, 3:] = np.rad2deg(wrap_angle(np.deg2rad(points[:, 3:])))
+    return points
+
+
+def check_path(start: Sequence[float], points: np.ndarray, rate: float, cartesian: bool,
+               max_joint_speed: float, max_linear_speed: float) -> None:
+    '''
+    raises ServoPathException if a step of the path, the first one from start included, is faster than the limits at rate
+    '''
+    if points.ndim != 2 or points.shape[1] != 6 or not len(points):
+        raise ServoPathException(f"servo path must be a non-empty list of 6 values per point, got shape {points.shape}")
+    if not np.isfinite(points).all():
+        raise ServoPathException("servo path has non-finite values")
+    steps = _steps(np.vstack([np.asarray(start, dtype=float)[:6], points]), cartesian)
+    if cartesian:
+        linear = np.linalg.norm(steps[:, :3], axis=1).max() * rate
+        angular = np.abs(steps[:, 3:]).max() * rate
+        if linear > max_linear_speed * 1.01 or angular > max_joint_speed * 1.01:
+            raise ServoPathException(f"servo path is too fast: {linear:.1f} mm/s, {angular:.1f} deg/s, "
+                                     f"limits: {max_linear_speed} mm/s, {max_joint_speed} deg/s")
+    else:
+        angular = np.abs(steps).max() * rate
+        if angular > max_joint_speed * 1.01:
+            raise ServoPathException(f"servo path is too fast: {angular:.1f} deg/s, limit: {max_joint_speed} deg/s")
+
+
+class ServoStreamer:
+    '''
+    sends points to the controller one per tick at a fixed rate,
+    a tick more than one period late counts as missed and shifts the rest of the schedule instead of bursting to catch up
+    '''
+    def __init__(self, stand_name: str):
+        self._logger = logging.getLogger("servo_streamer").getChild(stand_name)
+        self._lateness = _servo_lateness.labels(stand_name)
+        self._missed_ticks = _servo_missed_ticks.labels(stand_name)
+
+
+    def run(self, points: np.ndarray, rate: float, send: Callable[[list], int],
+            stop: Optional[threading.Event] = None,
+            on_tick: Optional[Callable[[int], None]] = None) -> ServoStats:
+        '''
+        @param send: send(point) -> SDK return code, e.g. set_servo_angle_j
+        @param stop: raises MotionPreemptedException once set
+        @param on_tick: on_tick(sent points) after every sent point
+        '''
+        period = 1.0 / rate
+        rows = points.tolist()
+        missed = 0
+        shift = 0.0
+        lateness_sum = 0.0
+        max_lateness = 0.0
+        max_send_time = 0.0
+        start = perf_counter()
+        for i, point in enumerate(rows):
+            if stop is not None and stop.is_set():
+                raise MotionPreemptedException(f"servo path stopped after {i} of {len(rows)} points")
+            due = start + shift + i * period
+            now = perf_counter()
+            if now < due:
+                time.sleep(due - now)
+                now = perf_counter()
+            lateness = now - due
+            if lateness > period:
+                missed += 1
+                shift += lateness
+            lateness_sum += lateness
+            max_lateness = max(max_lateness, lateness)
+            self._lateness.observe(lateness)
+            code = send(point)
+            sent = perf_counter()
+            max_send_time = max(max_send_time, sent - now)
+            if code != 0:
+                if stop is not None and stop.is_set():
+                    raise MotionPreemptedException(f"servo path stopped after {i} of {len(rows)} points")
+                raise SDKCallException(f"servo point {i} failed: {code}", code=code)
+            if on_tick is not None:
+                on_tick(i + 1)
+        duration = perf_counter() - start
+        if missed:
+            self._missed_ticks.inc(missed)
+            self._logger.warning(f"{missed} of {len(rows)} servo ticks missed, drift: {shift * 1000:.1f} ms")
+        return ServoStats(points=len(rows),
+                          rate=rate,
+                          duration=duration,
+                          missed_ticks=missed,
+                          mean_lateness=lateness_sum / len(rows) if rows else 0.0,
+                          max_lateness=max_lateness,
+                          drift=shift,
+                          max_send_time=max_send_time)
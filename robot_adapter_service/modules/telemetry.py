@@ -0,0 +1,173 @@
+import time
+import asyncio
+import logging
+import itertools
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Optional
+from modules._utils import StandSingleton
+
+
+@dataclass
+class TelemetryFrame:
+    seq: int
+    timestamp: float
+    joints: List[float]
+    tcp_pose: List[float]
+    mode: int
+    state: int
+    error_code: int
+    warn_code: int
+
+
+class TelemetrySubscription:
+    '''
+    bounded frame queue of a single subscriber
+    frames are decimated to max_rate, the oldest frames are dropped when the subscriber falls behind
+    '''
+    def __init__(self, hub: "TelemetryHub", max_rate: float, queue_size: int):
+        self._hub = hub
+        self._min_interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self._last_offered = 0.0
+        self._frames = deque(maxlen=queue_size)
+        self._condition = threading.Condition()
+        self._loop = None
+        self._event = None
+        self._closed = False
+        self.dropped = 0
+
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+
+    def poll(self) -> Optional[TelemetryFrame]:
+        with self._condition:
+            return self._frames.popleft() if self._frames else None
+
+
+    def get(self, timeout: Optional[float] = None) -> Optional[TelemetryFrame]:
+        '''
+        blocks until a frame is available, returns None on timeout or when closed
+        '''
+        with self._condition:
+            if not self._frames and not self._closed:
+                self._condition.wait(timeout)
+            return self._frames.popleft() if self._frames else None
+
+
+    async def get_async(self, timeout: Optional[float] = None) -> Optional[TelemetryFrame]:
+        '''
+        asyncio counterpart of get(), must be awaited from a single event loop
+        '''
+        if self._event is None:
+            self._loop = asyncio.get_running_loop()
+            self._event = asyncio.Event()
+        while True:
+            frame = self.poll()
+            if frame is not None or self._closed:
+                return frame
+            self._event.clear()
+            # a frame could have been offered between poll() and clear()
+            frame = self.poll()
+            if frame is not None:
+                return frame
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+
+
+    def close(self):
+        self._hub._unsubscribe(self)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._wake_loop()
+
+
+    def _offer(self, frame: TelemetryFrame, now: float):
+        if now - self._last_offered < self._min_interval:
+            return
+        self._last_offered = now
+        with self._condition:
+            if len(self._frames) == self._frames.maxlen:
+                self.dropped += 1
+            self._frames.append(frame)
+            self._condition.notify()
+        self._wake_loop()
+
+
+    def _wake_loop(self):
+        if self._event is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._event.set)
+            except RuntimeError:
+                # event loop is already closed
+                pass
+
+
+class TelemetryHub(metaclass=StandSingleton):
+    '''
+    keeps the latest robot states of a stand in a ring buffer and fans them out to subscribers
+    '''
+    def __init__(self, stand_name: str, history: int = 256):
+        self._logger = logging.getLogger("telemetry_hub").getChild(stand_name)
+        self._frames = deque(maxlen=history)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+    def latest(self) -> Optional[TelemetryFrame]:
+        try:
+            return self._frames[-1]
+        except IndexError:
+            return None
+
+
+    def history(self) -> List[TelemetryFrame]:
+        return list(self._frames)
+
+
+    def publish(self, joints: List[float], tcp_pose: List[float],
+                mode: int, state: int, error_code: int, warn_code: int) -> TelemetryFrame:
+        with self._lock:
+            frame = TelemetryFrame(seq=next(self._seq),
+                                   timestamp=time.time(),
+                                   joints=joints,
+                                   tcp_pose=tcp_pose,
+                                   mode=mode,
+                                   state=state,
+                                   error_code=error_code,
+                                   warn_code=warn_code)
+            self._frames.append(frame)
+            subscribers = tuple(self._subscribers)
+        now = time.monotonic()
+        for subscription in subscribers:
+            subscription._offer(frame, now)
+        return frame
+
+
+    def subscribe(self, max_rate: float = 0.0, queue_size: int = 16) -> TelemetrySubscription:
+        '''
+        @param max_rate: maximum frames per second delivered to the subscriber, 0 means every frame
+        @param queue_size: frames kept for the subscriber before the oldest ones are dropped
+        '''
+        subscription = TelemetrySubscription(self, max_rate, max(1, queue_size))
+        with self._lock:
+            self._subscribers.add(subscription)
+        self._logger.info(f"new subscriber, max rate: {max_rate}, subscribers: {len(self._subscribers)}")
+        return subscription
+
+
+    def _unsubscribe(self, subscription: TelemetrySubscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
@@ -0,0 +1,147 @@
+import json
+import uuid
+import logging
+import threading
+from time import perf_counter
+from functools import wraps
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+# phases kept per trace, protects memory of long requests
+_MAX_PHASES = 256
+
+_trace_logger = logging.getLogger("trace")
+_slow_logger = logging.getLogger("slow_ops")
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("cafebot_trace", default=None)
+_current_path: ContextVar[str] = ContextVar("cafebot_span_path", default="")
+_slow_threshold = 5.0
+
+
+def configure(slow_threshold: float):
+    '''
+    requests slower than slow_threshold seconds are also written to the "slow_ops" logger
+    '''
+    global _slow_threshold
+    _slow_threshold = slow_threshold
+
+
+class Trace:
+    '''
+    timing of a single request, phases are recorded by span() from any thread running in the request context
+    '''
+    def __init__(self, name: str):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.started = perf_counter()
+        self.duration = None
+        self.status = None
+        self.attributes = {}
+        self.phases = []
+        self._lock = threading.Lock()
+
+
+    def add_phase(self, name: str, start: float, duration: float, attributes: dict):
+        with self._lock:
+            if len(self.phases) < _MAX_PHASES:
+                self.phases.append((name, start - self.started, duration, attributes))
+
+
+    def annotate(self, **attributes):
+        with self._lock:
+            self.attributes.update(attributes)
+
+
+    def summary(self) -> dict:
+        with self._lock:
+            phases = [{"name": name, "start_ms": round(start * 1000, 3), "duration_ms": round(duration * 1000, 3), **attributes}
+                      for name, start, duration, attributes in self.phases]
+        return {"trace_id": self.trace_id,
+                "request": self.name,
+                "status": self.status,
+                "duration_ms": round((self.duration or 0.0) * 1000, 3),
+                **self.attributes,
+                "phases": phases}
+
+
+    def finish(self, status: str):
+        self.duration = perf_counter() - self.started
+        self.status = status
+        summary = json.dumps(self.summary())
+        _trace_logger.info(summary)
+        if self.duration > _slow_threshold:
+            _slow_logger.warning(summary)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def trace_request(name: str):
+    '''
+    starts a trace for a request, its summary is logged when the block exits
+    '''
+    trace = Trace(name)
+    token = _current_trace.set(trace)
+    path_token = _current_path.set("")
+    status = "ok"
+    try:
+        yield trace
+    except BaseException as e:
+        status = type(e).__name__
+        raise
+    finally:
+        _current_path.reset(path_token)
+        _current_trace.reset(token)
+        trace.finish(status)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    '''
+    times a phase of the current request, does nothing outside of trace_request()
+    yields the attribute dict of the phase, so values known only inside the block (e.g. cmd_id) can be added
+    '''
+    trace = _current_trace.get()
+    if trace is None:
+        yield attributes
+        return
+    parent = _current_path.get()
+    path = f"{parent}/{name}" if parent else name
+    token = _current_path.set(path)
+    start = perf_counter()
+    try:
+        yield attributes
+    except BaseException as e:
+        attributes["error"] = type(e).__name__
+        raise
+    finally:
+        _current_path.reset(token)
+        trace.add_phase(path, start, perf_counter() - start, attributes)
+
+
+def annotate(**attributes):
+    '''
+    adds attributes to the phase summary of the current request
+    '''
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.annotate(**attributes)
+
+
+def traced(name: Optional[str] = None):
+    '''
+    decorator recording each call of the function as a phase of the current request
+    '''
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_trace.get() is None:
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
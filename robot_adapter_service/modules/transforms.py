@@ -0,0 +1,205 @@
+from __future__ import annotations
+import math
+from typing import Optional, Sequence
+from modules._utils import LazyModule
+
+np = LazyModule("numpy")
+
+# poses are [x, y, z, roll, pitch, yaw] in mm, orientation as xArm RPY:
+# fixed axes X, Y, Z, i.e. R = Rz(yaw) @ Ry(pitch) @ Rx(roll)
+DEG2RAD = math.pi / 180.0
+RAD2DEG = 180.0 / math.pi
+# below this cos(pitch) roll and yaw share one rotation axis
+_GIMBAL_EPS = 1e-9
+
+
+def deg2rad(values) -> np.ndarray:
+    return np.multiply(values, DEG2RAD)
+
+
+def rad2deg(values) -> np.ndarray:
+    return np.multiply(values, RAD2DEG)
+
+
+def offsets_from_degrees(offsets) -> np.ndarray:
+    '''
+    offsets (N, 6) with orientation converted from degrees (as stored by the controller UI) to radians
+    '''
+    offsets = np.array(offsets, dtype=float).reshape(-1, 6)
+    offsets[:, 3:] *= DEG2RAD
+    return offsets
+
+
+def wrap_angle(values, out: Optional[np.ndarray] = None) -> np.ndarray:
+    '''
+    wraps angles in radians to [-pi, pi)
+    '''
+    out = np.add(values, np.pi, out=out)
+    np.mod(out, 2 * np.pi, out=out)
+    return np.subtract(out, np.pi, out=out)
+
+
+def rpy_to_matrix(rpy, degrees: bool = False, out: Optional[np.ndarray] = None) -> np.ndarray:
+    '''
+    rotation matrices (..., 3, 3) of roll, pitch, yaw angles (..., 3)
+    '''
+    rpy = np.asarray(rpy, dtype=float)
+    if degrees:
+        rpy = rpy * DEG2RAD
+    cr, cp, cy = np.cos(rpy[..., 0]), np.cos(rpy[..., 1]), np.cos(rpy[..., 2])
+    sr, sp, sy = np.sin(rpy[..., 0]), np.sin(rpy[..., 1]), np.sin(rpy[..., 2])
+    if out is None:
+        out = np.empty(rpy.shape[:-1] + (3, 3))
+    out[..., 0, 0] = cy * cp
+    out[..., 0, 1] = cy * sp * sr - sy * cr
+    out[..., 0, 2] = cy * sp * cr + sy * sr
+    out[..., 1, 0] = sy * cp
+    out[..., 1, 1] = sy * sp * sr + cy * cr
+    out[..., 1, 2] = sy * sp * cr - cy * sr
+    out[..., 2, 0] = -sp
+    out[..., 2, 1] = cp * sr
+    out[..., 2, 2] = cp * cr
+    return out
+
+
+def matrix_to_rpy(matrix, degrees: bool = False) -> np.ndarray:
+    '''
+    roll, pitch, yaw angles (..., 3) of rotation matrices (..., 3, 3), roll is 0 at gimbal lock
+    '''
+    matrix = np.asarray(matrix, dtype=float)
+    cp = np.hypot(matrix[..., 0, 0], matrix[..., 1, 0])
+    locked = cp < _GIMBAL_EPS
+    rpy = np.empty(matrix.shape[:-2] + (3,))
+    rpy[..., 1] = np.arctan2(-matrix[..., 2, 0], cp)
+    rpy[..., 0] = np.where(locked, 0.0, np.arctan2(matrix[..., 2, 1], matrix[..., 2, 2]))
+    rpy[..., 2] = np.where(locked,
+                           np.arctan2(-matrix[..., 0, 1], matrix[..., 1, 1]),
+                           np.arctan2(matrix[..., 1, 0], matrix[..., 0, 0]))
+    if degrees:
+        rpy *= RAD2DEG
+    return rpy
+
+
+def pose_to_matrix(poses, degrees: bool = False, out: Optional[np.ndarray] = None) -> np.ndarray:
+    '''
+    homogeneous transforms (..., 4, 4) of poses (..., 6)
+    '''
+    poses = np.asarray(poses, dtype=float)
+    if out is None:
+        out = np.empty(poses.shape[:-1] + (4, 4))
+    rpy_to_matrix(poses[..., 3:], degrees=degrees, out=out[..., :3, :3])
+    out[..., :3, 3] = poses[..., :3]
+    out[..., 3, :3] = 0.0
+    out[..., 3, 3] = 1.0
+    return out
+
+
+def matrix_to_pose(matrix, degrees: bool = False) -> np.ndarray:
+    '''
+    poses (..., 6) of homogeneous transforms (..., 4, 4)
+    '''
+    matrix = np.asarray(matrix, dtype=float)
+    pose = np.empty(matrix.shape[:-2] + (6,))
+    pose[..., :3] = matrix[..., :3, 3]
+    pose[..., 3:] = matrix_to_rpy(matrix[..., :3, :3], degrees=degrees)
+    return pose
+
+
+def matrix_to_quaternion(matrix) -> np.ndarray:
+    '''
+    unit quaternions (..., 4) as x, y, z, w of rotation matrices (..., 3, 3), w is never negative
+    '''
+    matrix = np.asarray(matrix, dtype=float)
+    m00, m11, m22 = matrix[..., 0, 0], matrix[..., 1, 1], matrix[..., 2, 2]
+    quaternion = np.empty(matrix.shape[:-2] + (4,))
+    quaternion[..., 0] = np.sqrt(np.maximum(0.0, 1.0 + m00 - m11 - m22))
+    quaternion[..., 1] = np.sqrt(np.maximum(0.0, 1.0 - m00 + m11 - m22))
+    quaternion[..., 2] = np.sqrt(np.maximum(0.0, 1.0 - m00 - m11 + m22))
+    quaternion[..., 3] = np.sqrt(np.maximum(0.0, 1.0 + m00 + m11 + m22))
+    quaternion[..., 0] = np.copysign(quaternion[..., 0], matrix[..., 2, 1] - matrix[..., 1, 2])
+    quaternion[..., 1] = np.copysign(quaternion[..., 1], matrix[..., 0, 2] - matrix[..., 2, 0])
+    quaternion[..., 2] = np.copysign(quaternion[..., 2], matrix[..., 1, 0] - matrix[..., 0, 1])
+    quaternion *= 0.5
+    return quaternion
+
+
+def invert(matrix) -> np.ndarray:
+    '''
+    inverse of rigid transforms (..., 4, 4), cheaper than np.linalg.inv
+    '''
+    matrix = np.asarray(matrix, dtype=float)
+    rotation_t = np.swapaxes(matrix[..., :3, :3], -1, -2)
+    out = np.zeros_like(matrix)
+    out[..., :3, :3] = rotation_t
+    out[..., :3, 3] = -np.einsum("...ij,...j->...i", rotation_t, matrix[..., :3, 3])
+    out[..., 3, 3] = 1.0
+    return out
+
+
+def compose(*transforms) -> np.ndarray:
+    '''
+    chains transforms left to right, e.g. compose(base_T_world, world_T_tcp, tcp_T_flange), broadcasting over batches
+    '''
+    result = np.asarray(transforms[0], dtype=float)
+    for transform in transforms[1:]:
+        result = np.matmul(result, transform)
+    return result
+
+
+class OffsetComparator:
+    '''
+    compares offsets reported by the SDK (orientation in degrees) with configured ones (orientation in radians)
+    on a preallocated buffer, angle differences are wrapped so that -180 and 180 degrees match
+    one comparator must not be shared between threads
+    @param tolerance: bound of the norm of the difference, mm and rad mixed as in the controller
+    '''
+    def __init__(self, tolerance: float = 0.01):
+        self._tolerance_sq = tolerance * tolerance
+        self._difference = np.empty(6)
+
+
+    def matches(self, reported: Sequence[float], expected: np.ndarray) -> bool:
+        difference = self._difference
+        difference[:] = reported
+        difference[3:] *= DEG2RAD
+        difference -= expected
+        wrap_angle(difference[3:], out=difference[3:])
+        return float(np.dot(difference, difference)) <= self._tolerance_sq
+
+
+class FrameChain:
+    '''
+    frames of the arm expressed in the robot base, computed in one batch per report:
+    world_offset (base coordinate offset), tcp (reported pose, given in the world offset frame)
+    and flange (tcp without the TCP offset)
+    buffers are reused, one chain must be updated from a single thread
+    '''
+    FRAMES = ("world_offset", "flange", "tcp")
+
+
+    def __init__(self):
+        self._poses = np.empty((3, 6))
+        self._matrices = np.empty((3, 4, 4))
+        self._frames = np.empty((3, 4, 4))
+
+
+    def update(self, world_offset: Sequence[float], tcp_pose: Sequence[float], tcp_offset: Sequence[float],
+               degrees: bool = True) -> np.ndarray:
+        '''
+        returns a new array (3, 7) of x, y, z (mm) and quaternion x, y, z, w per frame, in FRAMES order
+        '''
+        poses = self._poses
+        poses[0] = world_offset
+        poses[1] = tcp_pose
+        poses[2] = tcp_offset
+        if degrees:
+            poses[:, 3:] *= DEG2RAD
+        base_world, world_tcp, flange_tcp = pose_to_matrix(poses, out=self._matrices)
+        frames = self._frames
+        frames[0] = base_world
+        np.matmul(base_world, world_tcp, out=frames[2])
+        np.matmul(frames[2], invert(flange_tcp), out=frames[1])
+        result = np.empty((3, 7))
+        result[:, :3] = frames[:, :3, 3]
+        result[:, 3:] = matrix_to_quaternion(frames[:, :3, :3])
+        return result
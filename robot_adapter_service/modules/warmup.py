@@ -0,0 +1,121 @@
+import time
+import logging
+import threading
+from concurrent import futures
+from typing import Callable, Dict, List, Optional
+from modules.robot_adapter import RobotAdapter
+from modules.motion_scheduler import MotionScheduler
+from modules.xarm_ws import XArmWebsocket, WSSessionProvider
+from modules.retry import RetryPolicy
+from modules.metrics import MetricsRegistry
+from modules._exceptions import RobotException, WebsocketException
+
+_warmup_seconds = MetricsRegistry().histogram("cafebot_warmup_seconds", "duration of stand warm-up stages", ("stand", "stage"))
+
+
+class StandWarmup:
+    '''
+    brings stands up in the background, one thread per stand:
+    robot connection, websocket link and TCP/base catalogs are started in parallel,
+    then joint solutions are precomputed and the motion executor is started
+    a failed warm-up is repeated with backoff until it succeeds
+    @param on_ready: on_ready(stand_name) is called from the warm-up thread once the stand is ready
+    '''
+    def __init__(self, stands: List[str],
+                 on_ready: Optional[Callable[[str], None]] = None,
+                 max_retry_delay: float = 30.0):
+        self._logger = logging.getLogger("stand_warmup")
+        self._stands = list(stands)
+        self._on_ready = on_ready
+        self._backoff = RetryPolicy("warmup", attempts=1, base_delay=1.0, max_delay=max_retry_delay)
+        self._ready = {stand: threading.Event() for stand in self._stands}
+        self._errors: Dict[str, Optional[str]] = {stand: None for stand in self._stands}
+        ready_gauge = MetricsRegistry().gauge("cafebot_stand_ready", "1 once the stand finished warm-up", ("stand",))
+        for stand in self._stands:
+            ready_gauge.labels(stand).set_function(lambda stand=stand: float(self._ready[stand].is_set()))
+
+
+    @property
+    def stands(self) -> List[str]:
+        return list(self._stands)
+
+
+    def start(self) -> "StandWarmup":
+        for stand in self._stands:
+            threading.Thread(target=self._run, args=(stand,), name=f"warmup.{stand}", daemon=True).start()
+        return self
+
+
+    def is_ready(self, stand_name: str) -> bool:
+        event = self._ready.get(stand_name)
+        return event is not None and event.is_set()
+
+
+    def wait(self, stand_name: str, timeout: Optional[float] = None) -> bool:
+        return self._ready[stand_name].wait(timeout)
+
+
+    def status(self) -> Dict[str, Optional[str]]:
+        '''
+        stand name -> None if ready or warming up without errors, otherwise the last warm-up error
+        '''
+        return dict(self._errors)
+
+
+    def _stage(self, stand: str, stage: str, func: Callable):
+        start = time.monotonic()
+        result = func()
+        _warmup_seconds.labels(stand, stage).observe(time.monotonic() - start)
+        self._logger.info(f'stand "{stand}": {stage} ready in {time.monotonic() - start:.3f}s')
+        return result
+
+
+    def _wait_websocket(self, stand: str):
+        session = WSSessionProvider(stand)
+        if not session.wait_connected(session.connect_timeout):
+            raise WebsocketException(f"websocket not connected, state: {session.state.name}")
+
+
+    def _fetch_catalogs(self, stand: str):
+        ws = XArmWebsocket(stand)
+        ws.get_tcp_configs()
+        ws.get_base_configs()
+
+
+    def _precompute_ik(self, stand: str):
+        try:
+            RobotAdapter(stand).precompute_ik()
+        except RobotException as e:
+            # motions still work, solving IK on first use
+            self._logger.warning(f'failed to precompute joint solutions of stand "{stand}": {e}')
+
+
+    def _warm_up(self, stand: str):
+        with futures.ThreadPoolExecutor(max_workers=3, thread_name_prefix=f"warmup.{stand}") as executor:
+            stages = [executor.submit(self._stage, stand, "robot", lambda: RobotAdapter(stand)),
+                      executor.submit(self._stage, stand, "websocket", lambda: self._wait_websocket(stand)),
+                      executor.submit(self._stage, stand, "catalogs", lambda: self._fetch_catalogs(stand))]
+            for stage in stages:
+                stage.result()
+        self._stage(stand, "joint_solutions", lambda: self._precompute_ik(stand))
+        self._stage(stand, "motion_executor", lambda: MotionScheduler(stand))
+
+
+    def _run(self, stand: str):
+        started = time.monotonic()
+        failures = 0
+        while True:
+            try:
+                self._warm_up(stand)
+                break
+            except Exception as e:
+                failures += 1
+                self._errors[stand] = str(e)
+                delay = self._backoff.delay(failures)
+                self._logger.error(f'warm-up of stand "{stand}" failed, retrying in {delay:.1f}s: {e}')
+                time.sleep(delay)
+        self._errors[stand] = None
+        self._ready[stand].set()
+        self._logger.info(f'stand "{stand}" ready in {time.monotonic() - started:.3f}s')
+        if self._on_ready is not None:
+            self._on_ready(stand)
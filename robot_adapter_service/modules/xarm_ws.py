@@ -1,147 +1,594 @@
+import os
+import re
 import json
 import time
+import itertools
 import threading
-import websocket
 import logging
+from enum import IntEnum
 from functools import wraps
+from time import perf_counter
+from typing import Callable, Dict, Optional
 from dataclasses import dataclass
-from modules._utils import Singleton
+from modules._utils import StandSingleton, LazyModule
 from modules.config import SharedExtConfig
-from modules._exceptions import WebsocketException
+from modules._exceptions import (WebsocketException,
+                                 WebsocketTimeoutException)
+from modules.metrics import MetricsRegistry
+from modules.tracing import span
+from modules.retry import RetryPolicy, bounded_timeout
+from modules.transforms import offsets_from_degrees
+from modules.recorder import current_recorder
 from modules._dataclasses import (TCPOffset,
                                   BaseOffset)
 
 
+# websocket-client is imported by the first connection attempt
+websocket = LazyModule("websocket")
+
+_ws_command_seconds = MetricsRegistry().histogram("cafebot_ws_command_seconds", "websocket command round trip", ("cmd",))
+_ws_timeouts = MetricsRegistry().counter("cafebot_ws_timeouts_total", "websocket commands without response in time", ("cmd",))
+_ws_connect_failures = MetricsRegistry().counter("cafebot_ws_connect_failures_total", "failed websocket connection attempts")
+_ws_frames = MetricsRegistry().counter("cafebot_ws_frames_total", "received websocket text frames by dispatch outcome",
+                                       ("stand", "outcome"))
+
+# top-level keys of xArm UI messages are matched on the raw frame, so frames nobody waits for are never parsed
+_ID_PATTERN = re.compile(rb'"id"\s*:\s*"?(\d+)')
+_CMD_PATTERN = re.compile(rb'"cmd"\s*:\s*"([^"]+)"')
+# response: completed a pending command, push: delivered to subscribers,
+# unmatched: id of no pending command, dropped: push without subscribers, malformed: failed to parse
+FRAME_OUTCOMES = ("response", "push", "unmatched", "dropped", "malformed")
+
+
+class ConnectionState(IntEnum):
+    disconnected = 0
+    connecting = 1
+    connected = 2
+    closed = 3
+
+
 def connection_handler_wrapper(func):
+    '''
+    waits for the supervised connection before func is called and drops the connection when func fails on it,
+    retrying is left to the caller's retry policy
+    '''
     @wraps(func)
-    def wrapper(*args, **kwargs):
-        logger = logging.getLogger("connection_handler")
-        SP = WSSessionProvider
-        for i in range(5):
-            if SP().connection is None:
-                SP().establish_connection()
-            if SP().connection is not None:
-                try:
-                    return func(*args, **kwargs)
-                except Exception as e:
-                    SP().close_connection()
-            logger.warning(f"connection failed, retrying {i+1}/5")
-            time.sleep(1)
-        else:
-            logger.warning(f"connection failed")
-            return None
+    def wrapper(self, *args, **kwargs):
+        assert isinstance(self, XArmWebsocket), "connection_handler_wrapper can only be used with XArmWebsocket methods"
+        session = self._session
+        if not session.wait_connected(bounded_timeout(session.connect_timeout)):
+            raise WebsocketException(f"connection is not available, state: {session.state.name}")
+        try:
+            return func(self, *args, **kwargs)
+        except (OSError, websocket.WebSocketException) as e:
+            session.close_connection()
+            raise WebsocketException(f"connection failed: {e}") from e
     return wrapper
 
 
 def ws_retry_decorator(func):
     '''
-    decorator to retry function call on RobotException up to self._config.retry_attempts times
+    decorator to retry function call with the shared retry policy
     '''
     @wraps(func)
     def wrapper(self, *args, **kwargs):
-        logger = self._logger.getChild("ws_retry_decorator")
         assert isinstance(self, XArmWebsocket), "ws_retry_decorator can only be used with XArmWebsocket methods"
-        for attempt in range(SharedExtConfig().retry_attempts):
-            try:
-                return func(self, *args, **kwargs)
-            except WebsocketException as e:
-                exc = e
-                logger.error(f"attempt {attempt + 1} failed")
-                time.sleep(1)
-                logger.info("retrying...")
-        else:
-            raise exc
+        return self._retry_policy.call(func, self, *args, **kwargs)
     return wrapper
 
 
-class WSSessionProvider(metaclass=Singleton):
+class _PendingCommand:
+    '''
+    waiter for a single websocket command, completed by the receive thread
+    '''
+    __slots__ = ("created", "event", "response", "error")
+
     def __init__(self):
-        self._logger = logging.getLogger("ws_session")
+        self.created = time.monotonic()
+        self.event = threading.Event()
+        self.response = None
+        self.error = None
+
+
+    def complete(self, response: dict):
+        self.response = response
+        self.event.set()
+
+
+    def fail(self, error: Exception):
+        self.error = error
+        self.event.set()
+
+
+class WSSessionProvider(metaclass=StandSingleton):
+    '''
+    keeps a supervised connection to the xArm UI websocket:
+    the supervisor thread connects with a timeout, reconnects with backoff after the link is lost
+    and sends pings, the receive thread drops the link when nothing (not even a pong) arrives within the heartbeat timeout
+    '''
+    # pending entries older than this are dropped even if nobody waits for them
+    _orphan_ttl = 30.0
+
+    def __init__(self, stand_name: str):
+        self._logger = logging.getLogger("ws_session").getChild(stand_name)
+        config = SharedExtConfig(stand_name)
+        self._uri = f"ws://{config.robot_ip}:18333/ws?channel=prod&lang=en&v=1"
+        self.connect_timeout = config.ws_connect_timeout
+        self._heartbeat_interval = config.ws_heartbeat_interval
+        self._heartbeat_timeout = config.ws_heartbeat_timeout
+        self._reconnect_backoff = RetryPolicy("websocket_reconnect", attempts=1,
+                                              base_delay=0.1, max_delay=config.ws_reconnect_max_delay)
         self._connection = None
-        self._receive_thread = None
-        self._cmd_id = 100
+        self._connection_lock = threading.RLock()
+        self._state = ConnectionState.disconnected
+        self._state_condition = threading.Condition()
+        self._state_listeners = []
+        self._wakeup = threading.Event()
+        self._cmd_ids = itertools.count(100)
+        self._pending_lock = threading.Lock()
         self._pending_cmds = {}
-        self.establish_connection()
+        # cmd -> handlers, replaced on every change so the receive thread reads it without locking
+        self._push_handlers = {}
+        self._subscribe_lock = threading.Lock()
+        self._frame_counters = {outcome: _ws_frames.labels(stand_name, outcome) for outcome in FRAME_OUTCOMES}
+        self._stand_name = stand_name
+        self._recorder = current_recorder()
+        MetricsRegistry().gauge("cafebot_ws_pending_commands", "websocket commands waiting for response",
+                                ("stand",)).labels(stand_name).set_function(lambda: self.pending_count)
+        MetricsRegistry().gauge("cafebot_ws_connection_state", "0 disconnected, 1 connecting, 2 connected, 3 closed",
+                                ("stand",)).labels(stand_name).set_function(lambda: int(self._state))
+        self._supervisor = threading.Thread(target=self._supervise, name=f"ws_supervisor.{stand_name}", daemon=True)
+        self._supervisor.start()
 
 
     @property
     def connection(self):
         return self._connection
-    
+
 
     @property
-    def cmd_id(self):
-        cmd_id_temp = self._cmd_id
-        self._cmd_id += 1
-        self._pending_cmds[cmd_id_temp] = None
-        return cmd_id_temp
-    
+    def state(self) -> ConnectionState:
+        return self._state
+
+
+    @property
+    def connected(self) -> bool:
+        return self._state == ConnectionState.connected
+
+
+    def wait_connected(self, timeout: float) -> bool:
+        '''
+        blocks until the link is up or timeout expires, returns True if connected
+        '''
+        with self._state_condition:
+            return self._state_condition.wait_for(lambda: self._state in (ConnectionState.connected, ConnectionState.closed),
+                                                  timeout) and self._state == ConnectionState.connected
+
+
+    def add_state_listener(self, callback):
+        '''
+        callback(state) is called from the supervisor or receive thread on every state change
+        '''
+        self._state_listeners.append(callback)
+
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending_cmds)
+
 
     @property
-    def pending_cmds(self):
-        return self._pending_cmds
+    def frame_stats(self) -> Dict[str, int]:
+        '''
+        received text frames per dispatch outcome, see FRAME_OUTCOMES
+        '''
+        return {outcome: int(counter.value) for outcome, counter in self._frame_counters.items()}
+
+
+    def subscribe(self, cmd: str, handler: Callable[[dict], None]):
+        '''
+        handler(message) is called from the receive thread for every pushed message (one without a pending id) of type cmd,
+        handlers must return quickly, the receive thread does not read further frames meanwhile
+        '''
+        with self._subscribe_lock:
+            handlers = dict(self._push_handlers)
+            handlers[cmd] = handlers.get(cmd, ()) + (handler,)
+            self._push_handlers = handlers
+
+
+    def unsubscribe(self, cmd: str, handler: Callable[[dict], None]):
+        with self._subscribe_lock:
+            handlers = dict(self._push_handlers)
+            remaining = tuple(h for h in handlers.get(cmd, ()) if h != handler)
+            if remaining:
+                handlers[cmd] = remaining
+            else:
+                handlers.pop(cmd, None)
+            self._push_handlers = handlers
+
+
+    def register_command(self) -> int:
+        '''
+        allocates a new command id and registers a waiter for its response
+        '''
+        with self._pending_lock:
+            self._expire_orphans()
+            cmd_id = next(self._cmd_ids)
+            self._pending_cmds[cmd_id] = _PendingCommand()
+        return cmd_id
+
+
+    def wait_response(self, cmd_id: int, timeout: float) -> dict:
+        '''
+        blocks until the response for cmd_id arrives, the connection is lost or timeout expires
+        '''
+        with self._pending_lock:
+            pending = self._pending_cmds.get(cmd_id)
+        if pending is None:
+            raise WebsocketException(f"cmd_id {cmd_id} not found in pending commands, connection might be lost during command execution")
+        completed = pending.event.wait(timeout)
+        with self._pending_lock:
+            self._pending_cmds.pop(cmd_id, None)
+        if not completed:
+            raise WebsocketTimeoutException(f"cmd_id {cmd_id} timed out")
+        if pending.error is not None:
+            raise pending.error
+        return pending.response
+
+
+    def discard_command(self, cmd_id: int):
+        with self._pending_lock:
+            self._pending_cmds.pop(cmd_id, None)
+
+
+    def _complete_command(self, cmd_id: int, response: dict) -> bool:
+        with self._pending_lock:
+            pending = self._pending_cmds.get(cmd_id)
+        if pending is None:
+            return False
+        pending.complete(response)
+        return True
+
+
+    def _fail_pending(self, reason: str):
+        with self._pending_lock:
+            pending_cmds, self._pending_cmds = self._pending_cmds, {}
+        for cmd_id, pending in pending_cmds.items():
+            pending.fail(WebsocketException(f"cmd_id {cmd_id} failed: {reason}"))
+        if pending_cmds:
+            self._logger.warning(f"failed {len(pending_cmds)} pending commands: {reason}")
+
+
+    def _expire_orphans(self):
+        # called with self._pending_lock held
+        expire_before = time.monotonic() - self._orphan_ttl
+        orphans = [cmd_id for cmd_id, pending in self._pending_cmds.items() if pending.created < expire_before]
+        for cmd_id in orphans:
+            self._pending_cmds.pop(cmd_id).fail(WebsocketException(f"cmd_id {cmd_id} expired"))
+        if orphans:
+            self._logger.warning(f"expired orphaned commands: {orphans}")
     
 
     def close_connection(self):
-        self._logger.info("closing connection")
-        try:
-            self._connection and self._connection.close() 
-        except Exception as e:
-            self._logger.exception(f"failed to close connection: {e}")
-        self._connection = None
-    
+        '''
+        drops the current link, the supervisor reconnects right away
+        '''
+        connection = self._connection
+        if connection is not None:
+            self._drop(connection, "connection closed")
+
 
     def update_connection(self):
         self._logger.info("updating connection")
         self.close_connection()
-        self.establish_connection()
+        self.wait_connected(self.connect_timeout)
 
 
-    def establish_connection(self):
-        if self._connection is not None:
-            self._logger.info("connection already established")
-            return
-        self._connection = websocket.WebSocket()
-        uri = f"ws://{SharedExtConfig().robot_ip}:18333/ws?channel=prod&lang=en&v=1"
-        try:
-            self._connection.connect(uri, timeout=None)
-        except ConnectionRefusedError as e:
-            self._logger.warning(f"connection refused by: {uri}")
+    def close(self):
+        '''
+        stops supervising and closes the link for good
+        '''
+        self._set_state(ConnectionState.closed)
+        self._wakeup.set()
+        self.close_connection()
+
+
+    def _set_state(self, state: ConnectionState):
+        with self._state_condition:
+            if self._state == state or self._state == ConnectionState.closed:
+                return
+            self._state = state
+            self._state_condition.notify_all()
+        self._logger.info(f"connection state: {state.name}")
+        for callback in list(self._state_listeners):
+            try:
+                callback(state)
+            except Exception:
+                self._logger.exception("connection state listener failed")
+
+
+    def _drop(self, connection, reason: str):
+        with self._connection_lock:
+            if connection is not self._connection:
+                return
             self._connection = None
-        else:
-            self._logger.info(f"connection established with: {uri}")
-            self._pending_cmds = {}
-            self._receive_thread = threading.Thread(target=self._receive, daemon=True)
-            self._receive_thread.start()
+        self._logger.warning(f"dropping connection: {reason}")
+        try:
+            # no closing handshake, the peer may be gone
+            connection.shutdown()
+        except Exception as e:
+            self._logger.warning(f"failed to close connection: {e}")
+        self._fail_pending(reason)
+        self._set_state(ConnectionState.disconnected)
+        self._wakeup.set()
+
+
+    def _connect(self) -> bool:
+        self._set_state(ConnectionState.connecting)
+        connection = websocket.WebSocket()
+        try:
+            connection.connect(self._uri, timeout=self.connect_timeout)
+        except (OSError, websocket.WebSocketException) as e:
+            self._logger.warning(f"failed to connect to {self._uri}: {e}")
+            self._set_state(ConnectionState.disconnected)
+            return False
+        # a pong arrives at least every heartbeat interval, longer silence means the link is dead
+        connection.settimeout(self._heartbeat_timeout)
+        with self._connection_lock:
+            if self._state == ConnectionState.closed:
+                connection.shutdown()
+                return False
+            self._fail_pending("connection reestablished")
+            self._connection = connection
+        threading.Thread(target=self._receive, args=(connection,), name=f"{self._supervisor.name}.receive", daemon=True).start()
+        self._logger.info(f"connection established with: {self._uri}")
+        self._set_state(ConnectionState.connected)
+        return True
+
+
+    def _supervise(self):
+        failures = 0
+        while self._state != ConnectionState.closed:
+            connection = self._connection
+            if connection is None:
+                if self._connect():
+                    failures = 0
+                    continue
+                failures += 1
+                _ws_connect_failures.inc()
+                delay = self._reconnect_backoff.delay(failures)
+                self._logger.info(f"reconnecting in {delay:.2f}s")
+                self._wakeup.wait(delay)
+                self._wakeup.clear()
+                continue
+            self._wakeup.wait(self._heartbeat_interval)
+            self._wakeup.clear()
+            if connection is not self._connection:
+                continue
+            try:
+                connection.ping()
+            except (OSError, websocket.WebSocketException) as e:
+                self._drop(connection, f"ping failed: {e}")
+        self._logger.info("supervisor stopped")
 
 
-    def _receive(self):
+    def _receive(self, connection):
         while True:
             try:
-                response = self._connection.recv()
-                response = json.loads(response)
-                # self._logger.info(f"received response: {response}")
-                cmd_id = response.get("id")
-                if cmd_id is not None and int(cmd_id) in self._pending_cmds.keys():
-                    self._logger.info(f"received response for command: {cmd_id}")
-                    self._pending_cmds[int(cmd_id)] = response
-            except Exception:
-                self._logger.exception(f"failed to receive response")
+                opcode, frame = connection.recv_data_frame(control_frame=True)
+            except websocket.WebSocketTimeoutException:
+                reason = f"nothing received for {self._heartbeat_timeout}s"
+                break
+            except Exception as e:
+                reason = f"failed to receive: {e}"
                 break
+            if opcode == websocket.ABNF.OPCODE_CLOSE:
+                reason = "closed by peer"
+                break
+            if opcode != websocket.ABNF.OPCODE_TEXT:
+                continue
+            self._dispatch(frame.data)
+        self._drop(connection, reason)
         self._logger.info("receive thread stopped")
 
 
-deg2rad = lambda x: x * 3.141592653589793 / 180
+    def send(self, connection, text: str):
+        connection.send(text)
+        if self._recorder is not None:
+            self._recorder.record(self._stand_name, "tx", f=text)
 
 
-class XArmWebsocket(metaclass=Singleton):
-    def __init__(self):
-        self._logger = logging.getLogger("xarm_ws")
+    def _dispatch(self, data: bytes):
+        if self._recorder is not None:
+            self._recorder.record(self._stand_name, "rx", f=data.decode("utf-8", "replace"))
+        match = _ID_PATTERN.search(data)
+        cmd_id = int(match.group(1)) if match else None
+        pending = self._pending_cmds.get(cmd_id) if cmd_id is not None else None
+        match = _CMD_PATTERN.search(data)
+        handlers = self._push_handlers.get(match.group(1).decode()) if match else None
+        # the pre-check may have matched a nested id ahead of the top-level one, frames are parsed while commands wait
+        if pending is None and not handlers and not self._pending_cmds:
+            self._frame_counters["unmatched" if cmd_id is not None else "dropped"].inc()
+            return
+        try:
+            message = json.loads(data)
+            message_id = message.get("id")
+            message_id = int(message_id) if message_id is not None else None
+        except (ValueError, TypeError, AttributeError):
+            self._frame_counters["malformed"].inc()
+            self._logger.warning(f"failed to parse message: {data[:200]!r}")
+            return
+        # only the top-level id completes a command
+        if message_id is not None and self._complete_command(message_id, message):
+            self._frame_counters["response"].inc()
+            self._logger.info(f"received response for command: {message_id}")
+            return
+        if not handlers:
+            self._frame_counters["unmatched" if message_id is not None else "dropped"].inc()
+            return
+        self._frame_counters["push"].inc()
+        for handler in handlers:
+            try:
+                handler(message)
+            except Exception:
+                self._logger.exception(f"push handler of {message.get('cmd')} failed")
+
+
+class ConfigCatalogCache:
+    '''
+    caches a config catalog fetched over websocket for ttl seconds
+    if snapshot_dir is set, the last fetched catalog is kept on disk and served after restart while a background refresh runs
+    '''
+    def __init__(self, name: str, fetch, parse, ttl: float, snapshot_dir: Optional[str] = None):
+        self._logger = logging.getLogger("catalog_cache").getChild(name)
+        self._name = name
+        self._fetch = fetch
+        self._parse = parse
+        self._ttl = ttl
+        self._snapshot_path = os.path.join(snapshot_dir, f"{name}.json") if snapshot_dir else None
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread = None
+        self._catalog = None
+        # last catalog fetched from the robot, kept across invalidation to detect changes
+        self._last_fetched = None
+        # monotonic time of the last successful fetch, None if the catalog came from the snapshot
+        self._fetched_at = None
+        # counted from every caller thread
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_failures": 0}
+        self._listeners = []
+        self._load_snapshot()
+
+
+    @property
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return dict(self._stats)
+
+
+    def get(self) -> dict:
+        with span(f"catalog.{self._name}") as attributes:
+            catalog, fetched_at = self._catalog, self._fetched_at
+            if catalog is not None:
+                if fetched_at is None:
+                    self._count("stale_hits")
+                    attributes["cache"] = "stale"
+                    self._refresh_in_background()
+                    return dict(catalog)
+                if time.monotonic() - fetched_at < self._ttl:
+                    self._count("hits")
+                    attributes["cache"] = "hit"
+                    return dict(catalog)
+            self._count("misses")
+            attributes["cache"] = "miss"
+            return dict(self._refresh(fetched_at))
+
+
+    def _count(self, stat: str):
+        with self._stats_lock:
+            self._stats[stat] += 1
+
+
+    def add_listener(self, callback):
+        '''
+        callback(name, catalog) is called after a refresh returns a catalog different from the previous one
+        '''
+        self._listeners.append(callback)
+
+
+    def invalidate(self):
+        self._logger.info("invalidating catalog")
+        self._catalog = None
+        self._fetched_at = None
+
+
+    def _refresh(self, seen_fetched_at: Optional[float] = None) -> dict:
+        with self._refresh_lock:
+            # another thread might have refreshed the catalog while this one was waiting for the lock
+            if self._catalog is not None and self._fetched_at is not None and self._fetched_at != seen_fetched_at \
+                    and time.monotonic() - self._fetched_at < self._ttl:
+                return self._catalog
+            try:
+                response = self._fetch()
+                snapshot = json.dumps(response)
+                catalog = self._parse(response)
+            except Exception:
+                self._count("refresh_failures")
+                raise
+            self._count("refreshes")
+            changed = catalog != self._last_fetched
+            self._catalog = self._last_fetched = catalog
+            self._fetched_at = time.monotonic()
+        self._save_snapshot(snapshot)
+        if changed:
+            self._logger.info("catalog changed")
+            for callback in self._listeners:
+                callback(self._name, catalog)
+        return catalog
+
+
+    def _refresh_in_background(self):
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        self._refresh_thread = threading.Thread(target=self._background_refresh, daemon=True)
+        self._refresh_thread.start()
+
+
+    def _background_refresh(self):
+        try:
+            self._refresh()
+        except Exception as e:
+            self._logger.warning(f"background refresh failed, serving snapshot: {e}")
+        else:
+            self._logger.info("catalog refreshed in background")
+
+
+    def _load_snapshot(self):
+        if self._snapshot_path is None or not os.path.exists(self._snapshot_path):
+            return
+        try:
+            with open(self._snapshot_path, "r") as f:
+                self._catalog = self._last_fetched = self._parse(json.load(f))
+        except Exception as e:
+            self._logger.warning(f"failed to load snapshot from {self._snapshot_path}: {e}")
+        else:
+            self._logger.info(f"loaded snapshot from {self._snapshot_path}")
+
+
+    def _save_snapshot(self, snapshot: str):
+        if self._snapshot_path is None:
+            return
+        tmp_path = f"{self._snapshot_path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self._snapshot_path), exist_ok=True)
+            with open(tmp_path, "w") as f:
+                f.write(snapshot)
+            os.replace(tmp_path, self._snapshot_path)
+        except OSError as e:
+            self._logger.warning(f"failed to save snapshot to {self._snapshot_path}: {e}")
+
+
+class XArmWebsocket(metaclass=StandSingleton):
+    def __init__(self, stand_name: str):
+        self._logger = logging.getLogger("xarm_ws").getChild(stand_name)
+        config = SharedExtConfig(stand_name)
+        self._session = WSSessionProvider(stand_name)
+        # catalogs differ between robots, so does their snapshot
+        snapshot_dir = os.path.join(config.catalog_snapshot_dir, stand_name) if config.catalog_snapshot_dir else None
+        self._retry_policy = RetryPolicy("websocket",
+                                         attempts=config.retry_attempts,
+                                         base_delay=config.retry_base_delay,
+                                         max_delay=config.retry_max_delay)
+        self._tcp_catalog = ConfigCatalogCache("tcp_configs", self._fetch_tcp_configs, self._parse_tcp_configs,
+                                               ttl=config.catalog_ttl, snapshot_dir=snapshot_dir)
+        self._base_catalog = ConfigCatalogCache("base_configs", self._fetch_base_configs, self._parse_base_configs,
+                                                ttl=config.catalog_ttl, snapshot_dir=snapshot_dir)
 
     
     @connection_handler_wrapper
     def _send_command(self, cmd:str, data:dict):
-        cmd_id = WSSessionProvider().cmd_id
+        session = self._session
+        cmd_id = session.register_command()
         command = {
             "data": data,
             "cmd": cmd,
@@ -149,68 +596,108 @@ class XArmWebsocket(metaclass=Singleton):
         }
         self._logger.info(f"sending command: {cmd}")
         self._logger.debug(f"command data: {data}")
-        WSSessionProvider().connection.send(json.dumps(command))
+        connection = session.connection
+        if connection is None:
+            session.discard_command(cmd_id)
+            raise WebsocketException("connection is not available")
+        try:
+            session.send(connection, json.dumps(command))
+        except Exception:
+            session.discard_command(cmd_id)
+            raise
         return cmd_id
     
 
     def _run_blocking_command(self, cmd:str, data:dict, timeout:int=2) -> None:
-        cmd_id = self._send_command(cmd, data)
-        start_time = time.time()
-        while True:
-            if cmd_id not in WSSessionProvider().pending_cmds.keys():
-                err_msg = f"cmd_id {cmd_id} not found in pending commands, connection might be lost during command execution"
-                self._logger.warning(err_msg)
-                raise WebsocketException(err_msg)
-            response = WSSessionProvider().pending_cmds[cmd_id]
-            if response is not None:
-                response = WSSessionProvider().pending_cmds.pop(cmd_id)
-                self._logger.info(f"cmd_id {cmd_id} executed successfully")
-                return response['data']
-            if time.time() - start_time > timeout:
-                try:
-                    WSSessionProvider().pending_cmds.pop(cmd_id)
-                except KeyError:
-                    pass
-                self._logger.warning(f"cmd_id {cmd_id} timed out")
-                raise WebsocketException(f"cmd_id {cmd_id} timed out")
-            time.sleep(0.1)
+        with span(f"ws.{cmd}") as attributes:
+            start = perf_counter()
+            cmd_id = self._send_command(cmd, data)
+            attributes["cmd_id"] = cmd_id
+            try:
+                response = self._session.wait_response(cmd_id, bounded_timeout(timeout))
+            except WebsocketException as e:
+                if isinstance(e, WebsocketTimeoutException):
+                    _ws_timeouts.labels(cmd).inc()
+                self._logger.warning(str(e))
+                raise
+            _ws_command_seconds.labels(cmd).observe(perf_counter() - start)
+            self._logger.info(f"cmd_id {cmd_id} executed successfully")
+            return response['data']
             
 
+    def get_tcp_configs(self) -> Dict[str, TCPOffset]:
+        return self._tcp_catalog.get()
+
+
+    def get_base_configs(self) -> Dict[str, BaseOffset]:
+        return self._base_catalog.get()
+
+
+    def invalidate_catalogs(self):
+        self._tcp_catalog.invalidate()
+        self._base_catalog.invalidate()
+
+
+    def add_catalog_listener(self, callback):
+        '''
+        callback(name, catalog) is called whenever a refreshed TCP or base catalog differs from the previous one
+        '''
+        self._tcp_catalog.add_listener(callback)
+        self._base_catalog.add_listener(callback)
+
+
+    def subscribe(self, cmd: str, handler):
+        '''
+        handler(message) is called from the receive thread for every message of type cmd pushed by the xArm UI
+        '''
+        self._session.subscribe(cmd, handler)
+
+
+    def unsubscribe(self, cmd: str, handler):
+        self._session.unsubscribe(cmd, handler)
+
+
+    def catalog_stats(self) -> dict:
+        return {"tcp_configs": self._tcp_catalog.stats,
+                "base_configs": self._base_catalog.stats}
+
+
     @ws_retry_decorator
-    def get_tcp_configs(self):
+    def _fetch_tcp_configs(self) -> dict:
         cmd = "get_tcp_offset_load_config"
         data = {"userId": "test", "version": "xarm6"}
-        response = self._run_blocking_command(cmd, data)
+        return self._run_blocking_command(cmd, data)
+
+
+    @ws_retry_decorator
+    def _fetch_base_configs(self) -> dict:
+        cmd = "get_world_offset_config"
+        data = {"userId": "test", "version": "xarm6"}
+        return self._run_blocking_command(cmd, data)
+
+
+    def _parse_tcp_configs(self, response: dict) -> Dict[str, TCPOffset]:
         items = response['tcp_load_offset'].values()
         items = list(filter(lambda x: 'tcp_offset' in x, items))
-        items_dict = {}
+        names, values = [], []
         for item in items:
             name = item['tcp_offset']['name']
             if isinstance(name, dict):
                 name = name['en']
-            values = item['tcp_offset']['values']
-            values[3:] = list(map(deg2rad, values[3:]))
-            values = list(map(lambda x: round(x, 4), values))
-            items_dict[name] = TCPOffset(*values)
-        return items_dict
+            names.append(name)
+            values.append(item['tcp_offset']['values'])
+        return {name: TCPOffset(*row) for name, row in zip(names, offsets_from_degrees(values).tolist())}
     
 
-    @ws_retry_decorator
-    def get_base_configs(self):
-        cmd = "get_world_offset_config"
-        data = {"userId": "test", "version": "xarm6"}
-        response = self._run_blocking_command(cmd, data)
+    def _parse_base_configs(self, response: dict) -> Dict[str, BaseOffset]:
         _current_config = BaseOffset(*response['currentConfig'])
         self._logger.info(f"current base config: {_current_config}")
         items = response['configs']
-        items_dict = {}
+        names, values = [], []
         for item in items:
             name = item['name']
             if isinstance(name, dict):
                 name = name['en']
-            values = item['values']
-            values[3:] = list(map(deg2rad, values[3:]))
-            values = list(map(lambda x: round(x, 4), values))
-            items_dict[name] = BaseOffset(*values)
-        return items_dict
-    
\ No newline at end of file
+            names.append(name)
+            values.append(item['values'])
+        return {name: BaseOffset(*row) for name, row in zip(names, offsets_from_degrees(values).tolist())}
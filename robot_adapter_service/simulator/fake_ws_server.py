@@ -0,0 +1,257 @@
+import json
+import time
+import socket
+import base64
+import struct
+import random
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+_OPCODE_TEXT = 0x1
+_OPCODE_CLOSE = 0x8
+_OPCODE_PING = 0x9
+_OPCODE_PONG = 0xA
+
+DEFAULT_TCP_CONFIGS = {"marker": [0.0, 0.0, 100.0, 0.0, 0.0, 0.0]}
+DEFAULT_BASE_CONFIGS = {"base": [0.0, 0.0, 0.0, 0.0, 0.0, 0.0]}
+# type of the simulated status pushes
+PUSH_CMD = "robot_status"
+
+
+class _Client:
+    def __init__(self, sock: socket.socket, address):
+        self.sock = sock
+        self.address = address
+        self.send_lock = threading.Lock()
+
+
+    def send(self, opcode: int, payload: bytes = b""):
+        header = bytes([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header += bytes([length])
+        elif length < 1 << 16:
+            header += bytes([126]) + struct.pack("!H", length)
+        else:
+            header += bytes([127]) + struct.pack("!Q", length)
+        with self.send_lock:
+            self.sock.sendall(header + payload)
+
+
+    def recv_frame(self):
+        first, second = self._recv_exactly(2)
+        opcode = first & 0x0F
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", self._recv_exactly(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", self._recv_exactly(8))[0]
+        mask = self._recv_exactly(4) if second & 0x80 else None
+        payload = self._recv_exactly(length)
+        if mask is not None:
+            payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+        return opcode, payload
+
+
+    def _recv_exactly(self, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("client disconnected")
+            data += chunk
+        return data
+
+
+class FakeWebsocketServer:
+    '''
+    minimal stand-in for the xArm UI websocket on port 18333
+    answers get_tcp_offset_load_config and get_world_offset_config in the controller format,
+    every response is delayed by latency +- jitter seconds and dropped with probability drop_rate,
+    while frozen is set, incoming frames (pings included) are ignored like on a half-open link,
+    with push_rate set, unsolicited status messages are pushed to every client push_rate times per second
+    @param tcp_configs, base_configs: name -> [x, y, z, roll, pitch, yaw], orientation in degrees
+    '''
+    def __init__(self, host: str = "127.0.0.1", port: int = 18333,
+                 latency: float = 0.005, jitter: float = 0.0, drop_rate: float = 0.0, push_rate: float = 0.0,
+                 tcp_configs: Optional[Dict[str, List[float]]] = None,
+                 base_configs: Optional[Dict[str, List[float]]] = None,
+                 seed: Optional[int] = None):
+        self._logger = logging.getLogger("fake_ws_server")
+        self._host = host
+        self._port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.push_rate = push_rate
+        self.frozen = False
+        self.tcp_configs = dict(DEFAULT_TCP_CONFIGS if tcp_configs is None else tcp_configs)
+        self.base_configs = dict(DEFAULT_BASE_CONFIGS if base_configs is None else base_configs)
+        self.current_base = [0.0] * 6
+        self._random = random.Random(seed)
+        self._server_socket = None
+        self._clients = set()
+        self._stats = {"received": 0, "answered": 0, "dropped": 0}
+        self._handlers = {"get_tcp_offset_load_config": self._tcp_offset_load_config,
+                          "get_world_offset_config": self._world_offset_config}
+
+
+    @property
+    def address(self):
+        return self._server_socket.getsockname() if self._server_socket else (self._host, self._port)
+
+
+    @property
+    def stats(self) -> dict:
+        return dict(self._stats)
+
+
+    def start(self) -> "FakeWebsocketServer":
+        self._server_socket = socket.create_server((self._host, self._port))
+        threading.Thread(target=self._accept_loop, name="fake_ws_accept", daemon=True).start()
+        if self.push_rate > 0:
+            threading.Thread(target=self._push_loop, name="fake_ws_push", daemon=True).start()
+        self._logger.info(f"simulated xArm websocket listening on {self.address}")
+        return self
+
+
+    def stop(self):
+        if self._server_socket is not None:
+            self._server_socket.close()
+            self._server_socket = None
+        for client in list(self._clients):
+            self.disconnect(client)
+
+
+    def disconnect(self, client: Optional[_Client] = None):
+        '''
+        drops a client connection (all of them if client is None) to simulate a lost link
+        '''
+        for client in ([client] if client is not None else list(self._clients)):
+            self._clients.discard(client)
+            try:
+                client.sock.shutdown(socket.SHUT_RDWR)
+                client.sock.close()
+            except OSError:
+                pass
+
+
+    def push(self, cmd: str, data: dict):
+        '''
+        sends an unsolicited message without id to every client, like the status pushes of the xArm UI
+        '''
+        message = json.dumps({"cmd": cmd, "data": data}).encode()
+        for client in list(self._clients):
+            try:
+                client.send(_OPCODE_TEXT, message)
+            except OSError:
+                self._clients.discard(client)
+
+
+    def _push_loop(self):
+        seq = 0
+        while self._server_socket is not None:
+            time.sleep(1.0 / self.push_rate)
+            seq += 1
+            self.push(PUSH_CMD, {"seq": seq, "currentConfig": list(self.current_base)})
+
+
+    def _accept_loop(self):
+        while self._server_socket is not None:
+            try:
+                sock, address = self._server_socket.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._serve_client, args=(_Client(sock, address),), daemon=True).start()
+
+
+    def _serve_client(self, client: _Client):
+        try:
+            self._handshake(client)
+        except (OSError, ValueError) as e:
+            self._logger.warning(f"handshake with {client.address} failed: {e}")
+            client.sock.close()
+            return
+        self._clients.add(client)
+        self._logger.info(f"client connected: {client.address}")
+        try:
+            while True:
+                opcode, payload = client.recv_frame()
+                if self.frozen:
+                    continue
+                if opcode == _OPCODE_CLOSE:
+                    client.send(_OPCODE_CLOSE, payload[:2])
+                    break
+                if opcode == _OPCODE_PING:
+                    client.send(_OPCODE_PONG, payload)
+                elif opcode == _OPCODE_TEXT:
+                    self._on_message(client, payload)
+        except (OSError, ConnectionError):
+            pass
+        self._clients.discard(client)
+        client.sock.close()
+        self._logger.info(f"client disconnected: {client.address}")
+
+
+    def _handshake(self, client: _Client):
+        request = b""
+        while b"\r\n\r\n" not in request:
+            chunk = client.sock.recv(4096)
+            if not chunk:
+                raise ValueError("connection closed during handshake")
+            request += chunk
+        headers = {}
+        for line in request.decode("latin-1").split("\r\n")[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        key = headers.get("sec-websocket-key")
+        if key is None:
+            raise ValueError("missing Sec-WebSocket-Key")
+        accept = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+        client.sock.sendall(("HTTP/1.1 101 Switching Protocols\r\n"
+                             "Upgrade: websocket\r\n"
+                             "Connection: Upgrade\r\n"
+                             f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+
+
+    def _on_message(self, client: _Client, payload: bytes):
+        self._stats["received"] += 1
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            self._logger.warning(f"malformed message: {payload!r}")
+            return
+        if self._random.random() < self.drop_rate:
+            self._stats["dropped"] += 1
+            return
+        handler = self._handlers.get(message.get("cmd"))
+        response = {"id": message.get("id"),
+                    "cmd": message.get("cmd"),
+                    "code": 0 if handler else 1,
+                    "data": handler(message.get("data")) if handler else {}}
+        delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+        threading.Timer(delay, self._send_response, args=(client, response)).start()
+
+
+    def _send_response(self, client: _Client, response: dict):
+        try:
+            client.send(_OPCODE_TEXT, json.dumps(response).encode())
+        except OSError:
+            return
+        self._stats["answered"] += 1
+
+
+    def _tcp_offset_load_config(self, data: dict) -> dict:
+        return {"tcp_load_offset": {str(i): {"tcp_offset": {"name": {"en": name}, "values": list(values)},
+                                             "tcp_load": {"weight": 0, "center": [0, 0, 0]}}
+                                    for i, (name, values) in enumerate(self.tcp_configs.items())}}
+
+
+    def _world_offset_config(self, data: dict) -> dict:
+        return {"currentConfig": list(self.current_base),
+                "configs": [{"name": {"en": name}, "values": list(values)} for name, values in self.base_configs.items()]}
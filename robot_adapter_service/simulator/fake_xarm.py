@@ -0,0 +1,555 @@
+import math
+import time
+import logging
+import threading
+from collections import deque
+from typing import List, Optional
+
+# return codes of xArm SDK used by the simulator
+_OK = 0
+_HAS_ERROR = 1
+_HAS_WARN = 2
+_STATE_NOT_READY = 9
+_MODE_IS_NOT_CORRECT = 51
+_OUT_OF_RANGE = -8
+_EMERGENCY_STOP = -9
+_WAIT_FINISH_TIMEOUT = 100
+
+# robot states reported by xArm
+_STATE_READY = 0
+_STATE_MOVING = 1
+_STATE_SLEEPING = 2
+_STATE_STOPPED = 4
+
+# xArm6 reach in mm, poses further from the base are reported as unreachable
+_REACH = 700.0
+# speed limits reported by the SDK, mm/s and rad/s
+_TCP_SPEED_LIMIT = (0.1, 1000.0)
+_JOINT_SPEED_LIMIT = (0.0001, 4.0)
+
+
+class _FakeArm:
+    '''
+    stand-in for XArmAPI._arm, only the attributes read by RobotAdapter
+    '''
+    def __init__(self):
+        self._stream_type = "socket"
+        self._enable_report = True
+
+
+class _Segment:
+    __slots__ = ("angles", "position", "duration")
+
+    def __init__(self, angles: Optional[List[float]], position: Optional[List[float]], duration: float):
+        self.angles = angles
+        self.position = position
+        self.duration = duration
+
+
+class FakeXArmAPI:
+    '''
+    in-process stand-in for xarm.wrapper.XArmAPI
+    models mode/state transitions, error/warn codes, TCP/world offsets and motion duration from speed,
+    report callbacks are called from a report thread at report_rate
+    @param time_scale: multiplier of motion durations, 0.1 runs motions 10 times faster than the real arm
+    '''
+    def __init__(self, port: Optional[str] = None, is_radian: bool = False, do_not_open: bool = False,
+                 report_rate: float = 30.0, time_scale: float = 1.0, **kwargs):
+        self._logger = logging.getLogger("fake_xarm")
+        self._arm = _FakeArm()
+        self._default_is_radian = is_radian
+        self._report_interval = 1.0 / report_rate
+        self._time_scale = time_scale
+        self._lock = threading.RLock()
+        self._motion_condition = threading.Condition(self._lock)
+        self._mode = 0
+        self._requested_mode = 0
+        self._state = _STATE_STOPPED
+        self._error_code = 0
+        self._warn_code = 0
+        self._motion_enabled = False
+        self._angles = [0.0] * 6
+        self._position = [207.0, 0.0, 112.0, 180.0, 0.0, 0.0]
+        # offsets keep orientation in radians like the controller
+        self._tcp_offset = [0.0] * 6
+        self._world_offset = [0.0] * 6
+        self._pending_world_offset = None
+        self._segments = deque()
+        self._ik_solutions = {}
+        self._callbacks = {"report": [], "connect": [], "state": [], "mode": [], "error_warn": []}
+        self._connected = not do_not_open
+        self._alive = True
+        self._logger.info(f"simulated xArm at {port}")
+        threading.Thread(target=self._motion_loop, name="fake_xarm_motion", daemon=True).start()
+        threading.Thread(target=self._report_loop, name="fake_xarm_report", daemon=True).start()
+
+
+    # properties read from report data by the real SDK
+
+    @property
+    def connected(self) -> bool:
+        return self._connected
+
+
+    @property
+    def axis(self) -> int:
+        return 6
+
+
+    @property
+    def default_is_radian(self) -> bool:
+        return self._default_is_radian
+
+
+    @property
+    def mode(self) -> int:
+        return self._mode
+
+
+    @property
+    def state(self) -> int:
+        return self._state
+
+
+    @property
+    def error_code(self) -> int:
+        return self._error_code
+
+
+    @property
+    def warn_code(self) -> int:
+        return self._warn_code
+
+
+    @property
+    def has_error(self) -> bool:
+        return self._error_code != 0
+
+
+    @property
+    def has_warn(self) -> bool:
+        return self._warn_code != 0
+
+
+    @property
+    def has_err_warn(self) -> bool:
+        return self.has_error or self.has_warn
+
+
+    @property
+    def cmd_num(self) -> int:
+        return len(self._segments)
+
+
+    @property
+    def angles(self) -> List[float]:
+        return self._to_user(self._angles, first_angle=0)
+
+
+    @property
+    def position(self) -> List[float]:
+        return self._to_user(self._position, first_angle=3)
+
+
+    @property
+    def tcp_offset(self) -> List[float]:
+        return self._from_radians(self._tcp_offset)
+
+
+    @property
+    def world_offset(self) -> List[float]:
+        return self._from_radians(self._world_offset)
+
+
+    @property
+    def tcp_speed_limit(self) -> List[float]:
+        return list(_TCP_SPEED_LIMIT)
+
+
+    @property
+    def joint_speed_limit(self) -> List[float]:
+        return list(_JOINT_SPEED_LIMIT) if self._default_is_radian else [math.degrees(value) for value in _JOINT_SPEED_LIMIT]
+
+
+    def get_state(self):
+        return _OK, self._state
+
+
+    def get_is_moving(self) -> bool:
+        return self._state == _STATE_MOVING
+
+
+    # callbacks
+
+    def register_report_callback(self, callback=None, **kwargs) -> bool:
+        self._callbacks["report"].append(callback)
+        return True
+
+
+    def register_connect_changed_callback(self, callback=None) -> bool:
+        self._callbacks["connect"].append(callback)
+        return True
+
+
+    def register_state_changed_callback(self, callback=None) -> bool:
+        self._callbacks["state"].append(callback)
+        return True
+
+
+    def register_mode_changed_callback(self, callback=None) -> bool:
+        self._callbacks["mode"].append(callback)
+        return True
+
+
+    def register_error_warn_changed_callback(self, callback=None) -> bool:
+        self._callbacks["error_warn"].append(callback)
+        return True
+
+
+    def release_report_callback(self, callback=None) -> bool:
+        return self._release("report", callback)
+
+
+    def release_connect_changed_callback(self, callback=None) -> bool:
+        return self._release("connect", callback)
+
+
+    def release_state_changed_callback(self, callback=None) -> bool:
+        return self._release("state", callback)
+
+
+    def release_mode_changed_callback(self, callback=None) -> bool:
+        return self._release("mode", callback)
+
+
+    def release_error_warn_changed_callback(self, callback=None) -> bool:
+        return self._release("error_warn", callback)
+
+
+    # state control
+
+    def set_mode(self, mode: int = 0) -> int:
+        # like the controller, the new mode takes effect on the next set_state(0)
+        self._requested_mode = mode
+        return _OK
+
+
+    def set_state(self, state: int = 0) -> int:
+        with self._lock:
+            if state == _STATE_READY:
+                if self._error_code:
+                    return _HAS_ERROR
+                if not self._motion_enabled:
+                    return _STATE_NOT_READY
+                if self._mode != self._requested_mode:
+                    self._mode = self._requested_mode
+                    self._notify("mode", {"mode": self._mode})
+                self._set_state(_STATE_READY)
+            elif state == _STATE_STOPPED:
+                self._abort_motion()
+            else:
+                self._set_state(state)
+        return _OK
+
+
+    def motion_enable(self, enable: bool = True, servo_id: Optional[int] = None) -> int:
+        with self._lock:
+            self._motion_enabled = enable
+            if not enable:
+                self._abort_motion()
+        return _OK
+
+
+    def clean_error(self) -> int:
+        with self._lock:
+            if self._error_code:
+                self._error_code = 0
+                self._notify("error_warn", {"error_code": 0, "warn_code": self._warn_code})
+        return _OK
+
+
+    def clean_warn(self) -> int:
+        with self._lock:
+            if self._warn_code:
+                self._warn_code = 0
+                self._notify("error_warn", {"error_code": self._error_code, "warn_code": 0})
+        return _OK
+
+
+    def emergency_stop(self) -> int:
+        self._logger.warning("emergency stop")
+        with self._lock:
+            self._abort_motion()
+        return _OK
+
+
+    def disconnect(self):
+        self._alive = False
+        self._connected = False
+        with self._motion_condition:
+            self._motion_condition.notify_all()
+
+
+    # offsets
+
+    def set_tcp_offset(self, offset: List[float], is_radian: Optional[bool] = None, wait: bool = True, **kwargs) -> int:
+        if wait:
+            self._wait_motion(None)
+        self._tcp_offset = self._to_radians(offset, is_radian)
+        return _OK
+
+
+    def set_world_offset(self, offset: List[float], is_radian: Optional[bool] = None, wait: bool = True) -> int:
+        if wait:
+            self._wait_motion(None)
+        # the real SDK only learns the new offset from the next report
+        self._pending_world_offset = self._to_radians(offset, is_radian)
+        return _OK
+
+
+    # motion
+
+    def set_position(self, x=None, y=None, z=None, roll=None, pitch=None, yaw=None, radius=None,
+                     speed=None, mvacc=None, mvtime=None, relative=False, is_radian=None,
+                     wait=False, timeout=None, **kwargs) -> int:
+        code = self._check_motion_allowed(servo=False)
+        if code != _OK:
+            return code
+        is_radian = self._default_is_radian if is_radian is None else is_radian
+        start = self._segments[-1].position if self._segments and self._segments[-1].position else self._position
+        target = list(start)
+        for i, value in enumerate((x, y, z, roll, pitch, yaw)):
+            if value is None:
+                continue
+            if i >= 3 and is_radian:
+                value = math.degrees(value)
+            target[i] = target[i] + value if relative else value
+        if math.dist(target[:3], (0.0, 0.0, 0.0)) > _REACH:
+            return _OUT_OF_RANGE
+        speed = speed or 100.0
+        duration = math.dist(start[:3], target[:3]) / speed
+        self._queue_segment(_Segment(angles=None, position=target, duration=duration))
+        return self._wait_motion(timeout) if wait else _OK
+
+
+    def set_servo_angle(self, servo_id=None, angle=None, speed=None, mvacc=None, mvtime=None,
+                        relative=False, is_radian=None, wait=False, timeout=None, radius=None, **kwargs) -> int:
+        code = self._check_motion_allowed(servo=False)
+        if code != _OK:
+            return code
+        is_radian = self._default_is_radian if is_radian is None else is_radian
+        start = self._segments[-1].angles if self._segments and self._segments[-1].angles else self._angles
+        target = [math.degrees(value) if is_radian else float(value) for value in angle[:6]]
+        if relative:
+            target = [a + b for a, b in zip(start, target)]
+        speed = speed or 20.0
+        duration = max(abs(a - b) for a, b in zip(start, target)) / speed
+        position = self._ik_solutions.get(self._ik_key(target))
+        self._queue_segment(_Segment(angles=target, position=position, duration=duration))
+        return self._wait_motion(timeout) if wait else _OK
+
+
+    def set_servo_angle_j(self, angles, speed=None, mvacc=None, mvtime=None, is_radian=None, **kwargs) -> int:
+        code = self._check_motion_allowed(servo=True)
+        if code != _OK:
+            return code
+        is_radian = self._default_is_radian if is_radian is None else is_radian
+        self._angles = [math.degrees(value) if is_radian else float(value) for value in angles[:6]]
+        return _OK
+
+
+    def set_servo_cartesian(self, mvpose, speed=None, mvacc=None, mvtime=0, is_radian=None, is_tool_coord=False, **kwargs) -> int:
+        code = self._check_motion_allowed(servo=True)
+        if code != _OK:
+            return code
+        is_radian = self._default_is_radian if is_radian is None else is_radian
+        self._position = [math.degrees(value) if is_radian and i >= 3 else float(value) for i, value in enumerate(mvpose[:6])]
+        return _OK
+
+
+    def get_inverse_kinematics(self, pose, input_is_radian=None, return_is_radian=None, **kwargs):
+        '''
+        returns a deterministic fake joint solution, moving to it with set_servo_angle reaches pose
+        '''
+        input_is_radian = self._default_is_radian if input_is_radian is None else input_is_radian
+        pose = [math.degrees(value) if input_is_radian and i >= 3 else float(value) for i, value in enumerate(pose[:6])]
+        if math.dist(pose[:3], (0.0, 0.0, 0.0)) > _REACH:
+            return _OUT_OF_RANGE, []
+        x, y, z, roll, pitch, yaw = pose
+        angles = [round(value, 4) for value in (math.degrees(math.atan2(y, x)), (z - 250.0) / 5.0, math.hypot(x, y) / 10.0,
+                                                roll / 2.0, pitch / 2.0, yaw / 2.0)]
+        self._ik_solutions[self._ik_key(angles)] = pose
+        if return_is_radian:
+            angles = [math.radians(value) for value in angles]
+        return _OK, angles
+
+
+    # fault injection
+
+    def inject_error(self, error_code: int):
+        self._logger.warning(f"injecting error {error_code}")
+        with self._lock:
+            self._error_code = error_code
+            self._abort_motion()
+            self._notify("error_warn", {"error_code": error_code, "warn_code": self._warn_code})
+
+
+    def inject_warn(self, warn_code: int):
+        self._logger.warning(f"injecting warning {warn_code}")
+        with self._lock:
+            self._warn_code = warn_code
+            self._notify("error_warn", {"error_code": self._error_code, "warn_code": warn_code})
+
+
+    def simulate_reconnect(self):
+        self._logger.warning("simulating reconnect")
+        self._notify("connect", {"connected": False, "reported": False})
+        self._notify("connect", {"connected": True, "reported": True})
+
+
+    # internals
+
+    def _release(self, name: str, callback) -> bool:
+        if callback is None:
+            self._callbacks[name].clear()
+        elif callback in self._callbacks[name]:
+            self._callbacks[name].remove(callback)
+        return True
+
+
+    def _notify(self, name: str, data: dict):
+        for callback in list(self._callbacks[name]):
+            try:
+                callback(data)
+            except Exception:
+                self._logger.exception(f"{name} callback failed")
+
+
+    def _set_state(self, state: int):
+        # called with self._lock held
+        if state != self._state:
+            self._state = state
+            self._notify("state", {"state": state})
+        self._motion_condition.notify_all()
+
+
+    def _abort_motion(self):
+        # called with self._lock held
+        self._segments.clear()
+        self._set_state(_STATE_STOPPED)
+
+
+    def _check_motion_allowed(self, servo: bool) -> int:
+        if self._error_code:
+            return _HAS_ERROR
+        if not self._motion_enabled or self._state >= _STATE_STOPPED:
+            return _STATE_NOT_READY
+        if (self._mode == 1) != servo:
+            return _MODE_IS_NOT_CORRECT
+        return _OK
+
+
+    def _queue_segment(self, segment: _Segment):
+        segment.duration = max(segment.duration * self._time_scale, 0.01)
+        with self._motion_condition:
+            self._segments.append(segment)
+            self._motion_condition.notify_all()
+
+
+    def _finish_motion(self):
+        '''
+        completes queued segments at once, for motions timed by something else, e.g. a replayed trace
+        '''
+        with self._motion_condition:
+            if not self._segments:
+                return
+            for segment in self._segments:
+                if segment.angles is not None:
+                    self._angles = list(segment.angles)
+                if segment.position is not None:
+                    self._position = list(segment.position)
+            self._segments.clear()
+            self._set_state(_STATE_SLEEPING)
+
+
+    def _wait_motion(self, timeout: Optional[float]) -> int:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._motion_condition:
+            while self._segments and self._state < _STATE_STOPPED:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return _WAIT_FINISH_TIMEOUT
+                self._motion_condition.wait(remaining)
+        if self._error_code:
+            return _HAS_ERROR
+        if self._state >= _STATE_STOPPED:
+            return _EMERGENCY_STOP
+        return _OK
+
+
+    def _motion_loop(self):
+        while self._alive:
+            with self._motion_condition:
+                while self._alive and not self._segments:
+                    self._motion_condition.wait()
+                if not self._alive:
+                    return
+                segment = self._segments[0]
+                start_angles, start_position = list(self._angles), list(self._position)
+                self._set_state(_STATE_MOVING)
+            started = time.monotonic()
+            while True:
+                with self._motion_condition:
+                    if not self._segments or self._segments[0] is not segment:
+                        # aborted by stop, error or emergency stop
+                        break
+                    progress = min(1.0, (time.monotonic() - started) / segment.duration)
+                    if segment.angles is not None:
+                        self._angles = [a + (b - a) * progress for a, b in zip(start_angles, segment.angles)]
+                    if segment.position is not None:
+                        self._position = [a + (b - a) * progress for a, b in zip(start_position, segment.position)]
+                    if progress >= 1.0:
+                        self._segments.popleft()
+                        if not self._segments:
+                            self._set_state(_STATE_SLEEPING)
+                        self._motion_condition.notify_all()
+                        break
+                    self._motion_condition.wait(min(0.01, segment.duration * (1.0 - progress)))
+
+
+    def _report_loop(self):
+        while self._alive:
+            time.sleep(self._report_interval)
+            if self._pending_world_offset is not None:
+                self._world_offset, self._pending_world_offset = self._pending_world_offset, None
+            report = {"cartesian": self.position,
+                      "joints": self.angles,
+                      "error_code": self._error_code,
+                      "warn_code": self._warn_code,
+                      "state": self._state,
+                      "mtable": [self._motion_enabled] * 7,
+                      "mtbrake": [self._motion_enabled] * 7,
+                      "cmdnum": self.cmd_num}
+            self._notify("report", report)
+
+
+    @staticmethod
+    def _ik_key(angles: List[float]) -> tuple:
+        return tuple(round(value, 2) for value in angles)
+
+
+    def _to_user(self, values: List[float], first_angle: int) -> List[float]:
+        if not self._default_is_radian:
+            return list(values)
+        return [math.radians(value) if i >= first_angle else value for i, value in enumerate(values)]
+
+
+    def _to_radians(self, offset: List[float], is_radian: Optional[bool]) -> List[float]:
+        is_radian = self._default_is_radian if is_radian is None else is_radian
+        return [float(value) if i < 3 or is_radian else math.radians(value) for i, value in enumerate(offset[:6])]
+
+
+    def _from_radians(self, offset: List[float]) -> List[float]:
+        if self._default_is_radian:
+            return list(offset)
+        return [value if i < 3 else math.degrees(value) for i, value in enumerate(offset)]
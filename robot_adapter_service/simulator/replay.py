@@ -0,0 +1,263 @@
+import sys
+import json
+import time
+import types
+import base64
+import inspect
+import logging
+import argparse
+import threading
+from collections import defaultdict, deque
+from concurrent import futures
+from functools import wraps
+from typing import Dict, List, Optional
+from simulator.fake_xarm import FakeXArmAPI
+from simulator.fake_ws_server import FakeWebsocketServer, _Client, _OPCODE_TEXT
+
+
+class TraceReader:
+    '''
+    reads a trace written by modules.recorder.TraceRecorder
+    @param session: index of the recorded session, the file is appended to, so -1 is the latest one
+    '''
+    def __init__(self, path: str, session: int = -1):
+        sessions = []
+        with open(path) as file:
+            for line in file:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if record.get("k") == "header":
+                    sessions.append([])
+                elif sessions:
+                    sessions[-1].append(record)
+        if not sessions:
+            raise ValueError(f"no recorded session in {path}")
+        self._records = sorted(sessions[session], key=lambda record: record["t"])
+
+
+    @property
+    def stands(self) -> List[str]:
+        return sorted({record["s"] for record in self._records if record["s"]})
+
+
+    def records(self, stand: Optional[str] = None, *kinds: str) -> List[dict]:
+        return [record for record in self._records
+                if (stand is None or record["s"] == stand) and (not kinds or record["k"] in kinds)]
+
+
+def _recorded_result(value):
+    # SDK methods return a code or a tuple, JSON turned tuples into lists
+    return tuple(value) if isinstance(value, list) else value
+
+
+class ReplayXArmAPI(FakeXArmAPI):
+    '''
+    simulated xArm answering recorded SDK calls with their recorded results after their recorded duration divided by speed,
+    the simulator only applies their effect (mode, offsets, target pose) without waiting for simulated motion,
+    calls missing from the trace are answered by the simulator
+    reports are sent at the recorded report rate
+    @param records: "call" and "cb" records of one stand
+    '''
+    def __init__(self, records: List[dict], speed: float = 1.0, **kwargs):
+        self._replay_logger = logging.getLogger("replay_xarm")
+        self._speed = speed
+        self._replayed_calls = defaultdict(deque)
+        for record in records:
+            if record["k"] == "call":
+                self._replayed_calls[record["n"]].append((_recorded_result(record["r"]), record["d"]))
+        report_times = [record["t"] for record in records if record["k"] == "cb" and record["n"] == "report"]
+        if len(report_times) > 1 and "report_rate" not in kwargs:
+            kwargs["report_rate"] = speed * (len(report_times) - 1) / max(report_times[-1] - report_times[0], 1e-3)
+        super().__init__(**kwargs)
+        for name in self._replayed_calls:
+            method = getattr(self, name, None)
+            if callable(method):
+                setattr(self, name, types.MethodType(self._replayed(name, method), self))
+            else:
+                self._replay_logger.warning(f"recorded call {name} is not simulated, skipping it")
+
+
+    def _replayed(self, name: str, method):
+        wait_parameter = inspect.signature(method).parameters.get("wait")
+
+        @wraps(method)
+        def call(api, *args, **kwargs):
+            try:
+                recorded, duration = api._replayed_calls[name].popleft()
+            except IndexError:
+                return method(*args, **kwargs)
+            start = time.monotonic()
+            wait = False
+            if wait_parameter is not None:
+                # the recorded duration already covers the motion, the simulated one must not add to it
+                wait = kwargs.get("wait", wait_parameter.default)
+                kwargs["wait"] = False
+            method(*args, **kwargs)
+            remaining = duration / api._speed - (time.monotonic() - start)
+            if remaining > 0:
+                time.sleep(remaining)
+            if wait:
+                api._finish_motion()
+            return recorded
+        return call
+
+
+class ReplayWebsocketServer(FakeWebsocketServer):
+    '''
+    simulated xArm websocket answering commands with the recorded responses after the recorded latency divided by speed,
+    commands answered by nobody in the trace are dropped, commands missing from the trace are answered by the simulator
+    recorded pushes are sent again at their recorded offsets from the first client connection
+    @param records: "tx" and "rx" records of one stand
+    '''
+    def __init__(self, records: List[dict], speed: float = 1.0, **kwargs):
+        super().__init__(**kwargs)
+        self._speed = speed
+        self._pushes = []
+        sent = {}
+        exchanges = defaultdict(list)
+        for record in records:
+            message = json.loads(record["f"])
+            if record["k"] == "tx":
+                sent[str(message.get("id"))] = (message.get("cmd"), record["t"])
+            elif message.get("id") is None:
+                self._pushes.append((record["t"], record["f"]))
+            elif str(message["id"]) in sent:
+                cmd, sent_at = sent.pop(str(message["id"]))
+                exchanges[cmd].append((sent_at, record["t"] - sent_at, message))
+        # commands without a recorded response were dropped
+        for cmd, sent_at in sent.values():
+            exchanges[cmd].append((sent_at, None, None))
+        self._responses = {cmd: deque((latency, response) for _, latency, response in sorted(items, key=lambda item: item[0]))
+                           for cmd, items in exchanges.items()}
+        self._push_started = threading.Event()
+
+
+    def _serve_client(self, client: _Client):
+        if self._pushes and not self._push_started.is_set():
+            self._push_started.set()
+            threading.Thread(target=self._replay_pushes, name="replay_ws_push", daemon=True).start()
+        super()._serve_client(client)
+
+
+    def _replay_pushes(self):
+        started = time.monotonic()
+        first = self._pushes[0][0]
+        for recorded_at, frame in self._pushes:
+            delay = (recorded_at - first) / self._speed - (time.monotonic() - started)
+            if delay > 0:
+                time.sleep(delay)
+            for client in list(self._clients):
+                try:
+                    client.send(_OPCODE_TEXT, frame.encode())
+                except OSError:
+                    self._clients.discard(client)
+
+
+    def _on_message(self, client: _Client, payload: bytes):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return super()._on_message(client, payload)
+        recorded = self._responses.get(message.get("cmd"))
+        if not recorded:
+            return super()._on_message(client, payload)
+        self._stats["received"] += 1
+        latency, response = recorded.popleft()
+        if response is None:
+            self._stats["dropped"] += 1
+            return
+        response = dict(response, id=message.get("id"))
+        threading.Timer(latency / self._speed, self._send_response, args=(client, response)).start()
+
+
+def install(trace: TraceReader, stands: List[str], robot_ips: Dict[str, str],
+            speed: float = 1.0, time_scale: float = 1.0):
+    '''
+    replaces the SDK and websocket of every served stand with replayed ones and returns the API factory for RobotAdapter,
+    trace stands are matched by name, or in order when the names differ (e.g. a production trace replayed on sim_stand)
+    @param robot_ips: stand name -> robot IP from the stand config
+    '''
+    recorded = trace.stands
+    mapping = {stand: stand if stand in recorded else (recorded[i] if i < len(recorded) else None)
+               for i, stand in enumerate(stands)}
+    stand_by_ip = {robot_ips[stand]: stand for stand in stands}
+    for stand in stands:
+        source = mapping[stand]
+        records = trace.records(source, "tx", "rx") if source else []
+        ReplayWebsocketServer(records, speed=speed, host=robot_ips[stand]).start()
+
+    def api_factory(port: str, **kwargs):
+        source = mapping[stand_by_ip[port]]
+        records = trace.records(source, "call", "cb") if source else []
+        return ReplayXArmAPI(records, speed=speed, port=port, time_scale=time_scale, **kwargs)
+    return api_factory
+
+
+def _percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def _summary(durations: List[float]) -> dict:
+    return {"count": len(durations),
+            "mean_ms": round(1000 * sum(durations) / len(durations), 3) if durations else 0.0,
+            "p50_ms": round(1000 * _percentile(durations, 0.5), 3),
+            "p95_ms": round(1000 * _percentile(durations, 0.95), 3)}
+
+
+def replay_requests(trace: TraceReader, address: str, speed: float = 1.0, timeout: float = 30.0) -> dict:
+    '''
+    issues the recorded unary requests against a running service at their recorded start offsets divided by speed,
+    returns recorded and replayed latencies per method, recorded ones were measured in the service
+    and replayed ones at this client, so they include the client side of gRPC
+    '''
+    import grpc
+    requests = [(record["t"] - record["d"], record) for record in trace.records(None, "rpc")]
+    requests.sort(key=lambda item: item[0])
+    results = defaultdict(lambda: {"recorded": [], "replayed": [], "errors": 0})
+    lock = threading.Lock()
+    channel = grpc.insecure_channel(address)
+    grpc.channel_ready_future(channel).result(timeout=timeout)
+
+    def issue(record: dict):
+        call = channel.unary_unary(record["n"])
+        start = time.perf_counter()
+        try:
+            call(base64.b64decode(record["req"]), metadata=[tuple(item) for item in record["md"]], timeout=timeout)
+            ok = True
+        except grpc.RpcError:
+            ok = False
+        duration = time.perf_counter() - start
+        with lock:
+            result = results[record["n"]]
+            result["recorded"].append(record["d"])
+            result["replayed"].append(duration)
+            result["errors"] += int(ok != record["ok"])
+
+    started = time.monotonic()
+    first = requests[0][0] if requests else 0.0
+    with futures.ThreadPoolExecutor(max_workers=32) as executor:
+        for start_offset, record in requests:
+            delay = (start_offset - first) / speed - (time.monotonic() - started)
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(issue, record)
+    channel.close()
+    return {method: {"recorded": _summary(result["recorded"]),
+                     "replayed": _summary(result["replayed"]),
+                     # requests whose outcome differs from the recorded one
+                     "mismatches": result["errors"]}
+            for method, result in sorted(results.items())}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="issue recorded requests against a service started with --replay and compare latencies")
+    parser.add_argument("trace", type=str, help="trace file written with main.py --record")
+    parser.add_argument("-a", "--address", type=str, default="127.0.0.1:50051")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed, 2 issues requests twice as fast as recorded")
+    parser.add_argument("--session", type=int, default=-1, help="index of the recorded session in the trace")
+    args = parser.parse_args()
+    json.dump(replay_requests(TraceReader(args.trace, args.session), args.address, args.speed), sys.stdout, indent=2)
+    print()
@@ -0,0 +1,150 @@
+import os
+import sys
+import time
+import socket
+import asyncio
+import functools
+import threading
+from typing import Optional
+import grpc
+import pytest
+from grpc_health.v1 import health_pb2, health_pb2_grpc
+
+# tests import modules and simulator like main.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+os.environ.setdefault("STAND_NAME", "sim_stand")
+
+from modules.config import SharedExtConfig
+from simulator.fake_ws_server import FakeWebsocketServer, DEFAULT_TCP_CONFIGS, DEFAULT_BASE_CONFIGS
+
+TEST_STAND = "sim_stand"
+# simulated motions take 2% of their real duration
+TIME_SCALE = 0.02
+
+
+@pytest.fixture(scope="session")
+def ws_server():
+    '''
+    simulated xArm websocket of the test stand answering without latency
+    '''
+    server = FakeWebsocketServer(host=SharedExtConfig(TEST_STAND).robot_ip, latency=0.0,
+                                 tcp_configs=dict(DEFAULT_TCP_CONFIGS, gripper=[0.0, 0.0, 150.0, 0.0, 0.0, 0.0]),
+                                 base_configs=dict(DEFAULT_BASE_CONFIGS, table=[0.0, 0.0, 20.0, 0.0, 0.0, 0.0])).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(scope="session")
+def xarm_ws(ws_server):
+    from modules.xarm_ws import XArmWebsocket
+    return XArmWebsocket(TEST_STAND)
+
+
+@pytest.fixture
+def ws_session(xarm_ws):
+    '''
+    websocket session of the test stand, connected
+    '''
+    from modules.xarm_ws import WSSessionProvider
+    session = WSSessionProvider(TEST_STAND)
+    assert session.wait_connected(5.0)
+    return session
+
+
+@pytest.fixture(scope="session")
+def robot(ws_server):
+    '''
+    robot adapter of the test stand driving the simulated xArm
+    '''
+    from modules.robot_adapter import RobotAdapter
+    from simulator.fake_xarm import FakeXArmAPI
+    RobotAdapter.api_factory = functools.partial(FakeXArmAPI, time_scale=TIME_SCALE)
+    return RobotAdapter(TEST_STAND)
+
+
+class SDKCalls(list):
+    '''
+    (method, args, kwargs) of every call of the watched methods of the simulated SDK
+    '''
+    def __init__(self, api, monkeypatch):
+        super().__init__()
+        self._api = api
+        self._monkeypatch = monkeypatch
+
+
+    def watch(self, *names: str) -> "SDKCalls":
+        for name in names:
+            method = getattr(self._api, name)
+
+            def call(*args, _name=name, _method=method, **kwargs):
+                self.append((_name, args, kwargs))
+                return _method(*args, **kwargs)
+            self._monkeypatch.setattr(self._api, name, call)
+        return self
+
+
+@pytest.fixture
+def sdk_calls(robot, monkeypatch):
+    return SDKCalls(robot._robot, monkeypatch)
+
+
+@pytest.fixture(scope="session")
+def scheduler(robot):
+    from modules.motion_scheduler import MotionScheduler
+    return MotionScheduler(TEST_STAND)
+
+
+@pytest.fixture
+def blocked(scheduler):
+    '''
+    holds the executor with a running motion until the event is set
+    '''
+    from modules.motion_scheduler import MotionPriority
+    from modules._utils import wait_until
+    release = threading.Event()
+    future = scheduler.submit("block", lambda: release.wait(5.0), priority=MotionPriority.urgent)
+    assert wait_until(future.running, timeout=5.0)
+    yield release
+    release.set()
+    future.result(timeout=5.0)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(kind: str, stands: list, tuning=None, address: Optional[str] = None) -> grpc.Channel:
+    '''
+    runs main.serve_threaded or main.serve_aio on a daemon thread until the tests end,
+    returns a channel to it once every stand is ready
+    @param address: a free local port if not set
+    '''
+    import main
+    address = address or f"127.0.0.1:{free_port()}"
+    if kind == "aio":
+        target = lambda: asyncio.run(main.serve_aio(address, stands, tuning))
+    else:
+        target = lambda: main.serve_threaded(address, stands, tuning)
+    threading.Thread(target=target, name=f"{kind}_server", daemon=True).start()
+    channel = grpc.insecure_channel(address)
+    health_stub = health_pb2_grpc.HealthStub(channel)
+    deadline = time.monotonic() + 10.0
+    for stand in stands:
+        request = health_pb2.HealthCheckRequest(service=f"{main.MOVEMENTS_SERVICE}/{stand}")
+        while health_stub.Check(request, wait_for_ready=True, timeout=10.0).status != health_pb2.HealthCheckResponse.SERVING:
+            assert time.monotonic() < deadline, f"stand {stand} not ready"
+            time.sleep(0.05)
+    return channel
+
+
+@pytest.fixture(scope="session", params=["threaded", "aio"])
+def movements(request, robot):
+    '''
+    Movements stub of a server of the test stand, once per server kind
+    '''
+    from cafebot_proto import pb2_grpc
+    channel = start_server(request.param, [TEST_STAND])
+    yield pb2_grpc.MovementsStub(channel)
+    channel.close()
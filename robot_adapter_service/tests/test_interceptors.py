@@ -0,0 +1,93 @@
+import collections
+import grpc
+import pytest
+from cafebot_proto import pb2, pb2_grpc
+from conftest import TEST_STAND, start_server
+from main import DEFAULT_ADMISSION_LIMITS, _admission_limits, _server_options
+from modules.interceptors import AdmissionInterceptor, DeadlineInterceptor
+from modules.retry import time_remaining
+from modules._dataclasses import ServerTuning
+
+_CallDetails = collections.namedtuple("_CallDetails", ("method", "invocation_metadata"))
+
+
+class _AbortedContext:
+    def abort(self, code, details):
+        raise grpc.RpcError(code, details)
+
+
+def _intercept(handler, method: str, queued: int):
+    interceptor = AdmissionInterceptor({"park": 1, "stream_servo": 1}, lambda details: queued)
+    return interceptor.intercept_service(lambda details: handler, _CallDetails(f"/cafebot.Movements/{method}", ()))
+
+
+@pytest.mark.parametrize("method, handler", [
+    ("park", grpc.unary_unary_rpc_method_handler(lambda request, context: "parked")),
+    ("stream_servo", grpc.stream_unary_rpc_method_handler(lambda requests, context: list(requests))),
+])
+def test_admission_rejects_when_queue_is_full(method, handler):
+    admitted = _intercept(handler, method, queued=0)
+    assert admitted is handler
+    rejected = _intercept(handler, method, queued=1)
+    behavior = rejected.unary_unary or rejected.stream_unary
+    with pytest.raises(grpc.RpcError) as error:
+        behavior(iter(()), _AbortedContext())
+    assert error.value.args[0] == grpc.StatusCode.RESOURCE_EXHAUSTED
+
+
+def test_admission_ignores_unlimited_methods():
+    handler = grpc.unary_unary_rpc_method_handler(lambda request, context: "tfs")
+    assert _intercept(handler, "current_tfs", queued=100) is handler
+
+
+def test_admission_limits_are_parsed():
+    assert _admission_limits(DEFAULT_ADMISSION_LIMITS)["stream_servo"] == 1
+    assert _admission_limits(" park=2 , ") == {"park": 2}
+    assert _admission_limits("") == {}
+    with pytest.raises(ValueError, match="unknown method"):
+        _admission_limits("fly=1")
+    with pytest.raises(ValueError, match="streams responses"):
+        _admission_limits("telemetry=1")
+
+
+def test_server_options_follow_tuning():
+    assert _server_options(ServerTuning()) == []
+    options = dict(_server_options(ServerTuning(keepalive_time=10.0, keepalive_timeout=2.0, max_message_size=8.0)))
+    assert options == {"grpc.keepalive_time_ms": 10000,
+                       "grpc.http2.min_ping_interval_without_data_ms": 10000,
+                       "grpc.keepalive_timeout_ms": 2000,
+                       "grpc.max_receive_message_length": 8 * 1024 * 1024,
+                       "grpc.max_send_message_length": 8 * 1024 * 1024}
+
+
+@pytest.mark.parametrize("kind", ["threaded", "aio"])
+def test_server_rejects_motions_over_limit(scheduler, blocked, kind):
+    channel = start_server(kind, [TEST_STAND], ServerTuning(admission_limits={"park": 1}, compression="gzip"))
+    movements = pb2_grpc.MovementsStub(channel)
+    queued = scheduler.submit("queued", lambda: None)
+    try:
+        with pytest.raises(grpc.RpcError) as error:
+            movements.park(pb2.Empty(), timeout=5.0)
+        assert error.value.code() == grpc.StatusCode.RESOURCE_EXHAUSTED
+        # queries are always admitted
+        assert movements.motion_stats(pb2.Empty(), timeout=5.0).queue_depth == 1
+    finally:
+        blocked.set()
+        queued.result(timeout=5.0)
+        channel.close()
+
+
+class _DeadlineContext:
+    def time_remaining(self):
+        return 2.0
+
+
+@pytest.mark.parametrize("handler", [
+    grpc.unary_unary_rpc_method_handler(lambda request, context: time_remaining()),
+    grpc.stream_unary_rpc_method_handler(lambda requests, context: time_remaining()),
+])
+def test_deadline_bounds_single_response_requests(handler):
+    bounded = DeadlineInterceptor().intercept_service(lambda details: handler, _CallDetails("/cafebot.Movements/park", ()))
+    behavior = bounded.unary_unary or bounded.stream_unary
+    assert 0.0 < behavior(iter(()), _DeadlineContext()) <= 2.0
+    assert time_remaining() is None
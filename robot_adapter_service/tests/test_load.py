@@ -0,0 +1,36 @@
+import pytest
+from conftest import TEST_STAND, free_port, start_server
+from benchmarks.load import LoadGenerator, parse_mix, compare
+
+
+def test_mix_is_parsed_into_weights():
+    assert parse_mix("current_tfs=8, park") == {"current_tfs": 8.0, "park": 1.0}
+    with pytest.raises(ValueError, match="unknown method"):
+        parse_mix("fly=1")
+    for streaming in ("telemetry", "stream_servo"):
+        with pytest.raises(ValueError, match="streaming"):
+            parse_mix(streaming)
+
+
+def _report(p50: float, rps: float) -> dict:
+    summary = {"p50_ms": p50, "p95_ms": p50 * 2, "p99_ms": p50 * 3, "rps": rps}
+    return {"total": summary, "methods": {"current_tfs": summary}}
+
+
+def test_compare_flags_regressions_beyond_tolerance():
+    baseline = _report(p50=10.0, rps=100.0)
+    ratios, regressed = compare(_report(p50=10.5, rps=95.0), baseline, tolerance=0.1)
+    assert ratios["current_tfs"] == {"p50_ms": 1.05, "p95_ms": 1.05, "p99_ms": 1.05, "rps": 0.95}
+    assert not regressed
+    assert compare(_report(p50=12.0, rps=100.0), baseline, tolerance=0.1)[1]
+    assert compare(_report(p50=10.0, rps=80.0), baseline, tolerance=0.1)[1]
+
+
+def test_load_against_simulated_stand(robot):
+    address = f"127.0.0.1:{free_port()}"
+    start_server("threaded", [TEST_STAND], address=address).close()
+    report = LoadGenerator(address, parse_mix("current_tfs=3,motion_stats=1"), concurrency=2,
+                           duration=0.3, warmup=0.1, timeout=5.0, stand=TEST_STAND, seed=1).run()
+    assert report["total"]["count"] > 0 and report["total"]["errors"] == 0
+    assert set(report["methods"]) == {"current_tfs", "motion_stats"}
+    assert report["error_codes"] == {}
@@ -0,0 +1,123 @@
+import grpc
+import pytest
+from cafebot_proto import pb2, pb2_grpc
+from conftest import TEST_STAND, start_server
+from main import STAND_METADATA_KEY
+from modules.config import SharedExtConfig
+from modules._utils import wait_until
+from simulator.fake_ws_server import FakeWebsocketServer
+
+
+def test_server_serves_motions_and_queries(movements):
+    stats = movements.motion_stats(pb2.Empty(), timeout=5.0)
+    response = movements.park(pb2.Empty(), timeout=10.0)
+    assert response.success
+    assert movements.motion_stats(pb2.Empty(), timeout=5.0).completed == stats.completed + 1
+    assert len(movements.current_tfs(pb2.Empty(), timeout=5.0).tfs) == 3
+
+
+def test_trajectory_rpc(movements):
+    waypoints = [pb2.Waypoint(joint=pb2.JointTarget(values=[float(i * 5), 0, 0, 0, 0, 0]), velocity=90.0, blend_radius=5.0)
+                 for i in range(1, 4)]
+    assert movements.execute_trajectory(pb2.TrajectoryRequest(waypoints=waypoints), timeout=10.0).success
+    with pytest.raises(grpc.RpcError) as error:
+        movements.execute_trajectory(pb2.TrajectoryRequest(waypoints=[pb2.Waypoint(velocity=90.0)]), timeout=10.0)
+    assert error.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+
+
+SECOND_STAND = "sim_stand_2"
+
+
+@pytest.fixture(scope="session")
+def second_ws_server():
+    server = FakeWebsocketServer(host=SharedExtConfig(SECOND_STAND).robot_ip, latency=0.0).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(scope="session", params=["threaded", "aio"])
+def two_stands(request, robot, second_ws_server):
+    '''
+    Movements stub of a server of the test stand and a second simulated stand
+    '''
+    channel = start_server(request.param, [TEST_STAND, SECOND_STAND])
+    yield pb2_grpc.MovementsStub(channel)
+    channel.close()
+
+
+def _on(stand: str):
+    return [(STAND_METADATA_KEY, stand)]
+
+
+def test_requests_are_routed_by_stand_metadata(two_stands):
+    before = {stand: two_stands.motion_stats(pb2.Empty(), metadata=_on(stand), timeout=5.0).completed
+              for stand in (TEST_STAND, SECOND_STAND)}
+    assert two_stands.park(pb2.Empty(), metadata=_on(SECOND_STAND), timeout=10.0).success
+    assert two_stands.motion_stats(pb2.Empty(), metadata=_on(SECOND_STAND), timeout=5.0).completed == before[SECOND_STAND] + 1
+    assert two_stands.motion_stats(pb2.Empty(), metadata=_on(TEST_STAND), timeout=5.0).completed == before[TEST_STAND]
+    # without metadata requests go to the default stand
+    assert two_stands.motion_stats(pb2.Empty(), timeout=5.0).completed == before[TEST_STAND]
+
+
+def test_unknown_stand_is_not_found(two_stands):
+    with pytest.raises(grpc.RpcError) as error:
+        two_stands.park(pb2.Empty(), metadata=_on("no_such_stand"), timeout=5.0)
+    assert error.value.code() == grpc.StatusCode.NOT_FOUND
+
+
+def _slow_trajectory():
+    # 90 degrees at 1 deg/s, about 2 s on the simulated arm
+    waypoints = [pb2.Waypoint(joint=pb2.JointTarget(values=[float(sign * 45), 0, 0, 0, 0, 0]), velocity=1.0)
+                 for sign in (1, -1)]
+    return pb2.MotionRequest(trajectory=pb2.TrajectoryRequest(waypoints=waypoints))
+
+
+def test_started_motion_is_polled_and_awaited(movements):
+    status = movements.start_motion(pb2.MotionRequest(park=pb2.Empty()), timeout=5.0)
+    assert status.id and status.name == "park"
+    assert status.state in (pb2.MotionStatus.QUEUED, pb2.MotionStatus.RUNNING, pb2.MotionStatus.SUCCEEDED)
+    done = movements.wait_motion(pb2.WaitMotionRequest(id=status.id), timeout=10.0)
+    assert done.state == pb2.MotionStatus.SUCCEEDED and done.progress == 1.0
+    polled = movements.poll_motion(pb2.MotionId(id=status.id), timeout=5.0)
+    assert polled.state == pb2.MotionStatus.SUCCEEDED and polled.running_time > 0.0
+
+
+def test_started_motion_is_cancelled(movements):
+    status = movements.start_motion(_slow_trajectory(), timeout=5.0)
+    # waiting with a timeout returns the motion still unfinished
+    assert movements.wait_motion(pb2.WaitMotionRequest(id=status.id, timeout=0.05), timeout=5.0).state in \
+        (pb2.MotionStatus.QUEUED, pb2.MotionStatus.RUNNING)
+    movements.cancel_motion(pb2.MotionId(id=status.id), timeout=5.0)
+    done = movements.wait_motion(pb2.WaitMotionRequest(id=status.id), timeout=10.0)
+    assert done.state == pb2.MotionStatus.CANCELLED and done.message
+
+
+def test_unknown_motion_is_not_found(movements):
+    with pytest.raises(grpc.RpcError) as error:
+        movements.poll_motion(pb2.MotionId(id="no_such_motion"), timeout=5.0)
+    assert error.value.code() == grpc.StatusCode.NOT_FOUND
+
+
+def test_park_gets_ahead_of_queued_motions(movements):
+    running = movements.start_motion(_slow_trajectory(), timeout=5.0)
+    queued = movements.start_motion(_slow_trajectory(), timeout=5.0)
+    assert wait_until(lambda: movements.poll_motion(pb2.MotionId(id=running.id), timeout=5.0).state == pb2.MotionStatus.RUNNING,
+                      timeout=5.0)
+    assert movements.park(pb2.Empty(), timeout=10.0).success
+    preempted = movements.poll_motion(pb2.MotionId(id=running.id), timeout=5.0)
+    assert preempted.state == pb2.MotionStatus.CANCELLED and "park" in preempted.message
+    assert movements.poll_motion(pb2.MotionId(id=queued.id), timeout=5.0).state in \
+        (pb2.MotionStatus.QUEUED, pb2.MotionStatus.RUNNING)
+    movements.cancel_motion(pb2.MotionId(id=queued.id), timeout=5.0)
+    movements.wait_motion(pb2.WaitMotionRequest(id=queued.id), timeout=10.0)
+
+
+def test_emergency_stop_rpc(movements, robot, sdk_calls):
+    sdk_calls.watch("emergency_stop", "set_state")
+    assert movements.stop(pb2.StopRequest(), timeout=5.0).success
+    assert [name for name, _, _ in sdk_calls] == ["set_state"]
+    sdk_calls.clear()
+    assert movements.stop(pb2.StopRequest(emergency=True), timeout=5.0).success
+    assert [name for name, _, _ in sdk_calls] == ["emergency_stop"]
+    # the next motion enables the arm again
+    assert movements.park(pb2.Empty(), timeout=10.0).success
@@ -0,0 +1,61 @@
+import urllib.request
+import pytest
+from cafebot_proto import pb2
+from modules.robot_adapter import _robot_enables
+from modules.metrics import MetricsRegistry
+
+
+def _sample(text: str, line_prefix: str) -> float:
+    values = [float(line.rsplit(" ", 1)[1]) for line in text.splitlines() if line.startswith(line_prefix + " ")]
+    return values[0] if values else 0.0
+
+
+def test_metrics_render_in_exposition_format():
+    registry = MetricsRegistry()
+    counter = registry.counter("test_requests_total", "test requests", ("method",))
+    counter.labels("park").inc()
+    counter.labels("park").inc(2)
+    registry.gauge("test_depth", "test depth").set_function(lambda: 4)
+    histogram = registry.histogram("test_seconds", "test durations", buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    text = registry.render()
+    assert "# TYPE test_requests_total counter" in text
+    assert _sample(text, 'test_requests_total{method="park"}') == 3.0
+    assert _sample(text, "test_depth") == 4.0
+    assert _sample(text, 'test_seconds_bucket{le="0.1"}') == 1.0
+    assert _sample(text, 'test_seconds_bucket{le="+Inf"}') == 2.0
+    assert _sample(text, "test_seconds_sum") == pytest.approx(0.55)
+
+
+def test_registering_a_name_twice_returns_the_same_metric():
+    registry = MetricsRegistry()
+    assert registry.counter("test_shared_total", "shared") is registry.counter("test_shared_total", "shared")
+    with pytest.raises(AssertionError):
+        registry.gauge("test_shared_total", "shared")
+
+
+def test_rpcs_are_counted_and_scraped(movements):
+    server = MetricsRegistry().serve("127.0.0.1:0")
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        prefix = 'cafebot_rpc_seconds_count{method="motion_stats",status="ok"}'
+        before = _sample(urllib.request.urlopen(url, timeout=5.0).read().decode(), prefix)
+        movements.motion_stats(pb2.Empty(), timeout=5.0)
+        after = _sample(urllib.request.urlopen(url, timeout=5.0).read().decode(), prefix)
+        assert after == before + 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_only_recoveries_count_as_robot_enables(robot):
+    robot._set_mode(0)
+    robot._set_tcp_config("marker")
+    before = _robot_enables.labels().value
+    robot._set_tcp_config("gripper")
+    robot._set_base_config("table")
+    robot._set_base_config("base")
+    assert _robot_enables.labels().value == before
+    robot.enable_robot()
+    assert _robot_enables.labels().value == before + 1
@@ -0,0 +1,80 @@
+import time
+import threading
+import pytest
+from modules.retry import deadline, time_remaining
+from modules.motion_scheduler import MotionState, MotionPriority
+from modules._dataclasses import JointPose, Velocity
+from modules._exceptions import MotionDeadlineException, MotionPreemptedException
+from modules._utils import wait_until
+
+
+def test_started_motion_outlives_request_deadline(scheduler):
+    remaining = []
+
+    def motion():
+        # still running after the starting request timed out
+        time.sleep(0.2)
+        remaining.append(time_remaining())
+        scheduler._robot.park()
+
+    with deadline(0.05):
+        handle = scheduler.start("park", motion)
+    assert handle.wait(timeout=10)
+    assert handle.state == MotionState.succeeded, handle.error
+    assert remaining == [None]
+
+
+def test_submitted_motion_keeps_request_deadline(scheduler):
+    with deadline(5.0):
+        future = scheduler.submit("remaining", time_remaining)
+    assert 0 < future.result(timeout=10) <= 5.0
+
+
+def test_motions_run_by_priority_then_submission(scheduler, blocked):
+    order = []
+    futures = [scheduler.submit(name, lambda name=name: order.append(name), priority=priority)
+               for name, priority in (("low", MotionPriority.low), ("normal_1", MotionPriority.normal),
+                                      ("urgent", MotionPriority.urgent), ("normal_2", MotionPriority.normal))]
+    assert scheduler.queued() == 4
+    blocked.set()
+    for future in futures:
+        future.result(timeout=5.0)
+    assert order == ["urgent", "normal_1", "normal_2", "low"]
+
+
+def test_motion_expires_in_queue(scheduler, blocked):
+    future = scheduler.submit("late", lambda: None, timeout=0.05)
+    time.sleep(0.1)
+    blocked.set()
+    with pytest.raises(MotionDeadlineException):
+        future.result(timeout=5.0)
+
+
+def test_queued_motion_is_cancelled(scheduler, blocked):
+    cancelled = scheduler.stats()["cancelled"]
+    future = scheduler.submit("cancelled", lambda: None)
+    assert scheduler.cancel(future)
+    blocked.set()
+    assert future.cancelled()
+    assert wait_until(lambda: scheduler.stats()["cancelled"] == cancelled + 1, timeout=5.0)
+
+
+def test_urgent_motion_preempts_running_one(scheduler, robot):
+    # 90 deg at 1 deg/s takes 1.8 s in the simulator
+    slow = scheduler.submit("slow", lambda: robot.move_to(JointPose(values=[90.0, 0, 0, 0, 0, 0]), Velocity(joint=1.0, linear=1.0)),
+                            priority=MotionPriority.low)
+    assert wait_until(lambda: robot.motion_progress() > 0.0, timeout=5.0)
+    park = scheduler.submit("park", robot.park, priority=MotionPriority.urgent, preempt=True)
+    with pytest.raises(MotionPreemptedException):
+        slow.result(timeout=5.0)
+    park.result(timeout=10.0)
+
+
+def test_finished_motion_is_never_stopped(scheduler, robot, monkeypatch):
+    stops = []
+    monkeypatch.setattr(robot, "stop_motion", lambda emergency=False: stops.append(emergency))
+    handle = scheduler.start("quick", lambda: None)
+    handle.future.result(timeout=5.0)
+    assert not scheduler._preempt(handle._request, "late")
+    assert not handle.cancel()
+    assert stops == [] and handle._request.preempted_by is None
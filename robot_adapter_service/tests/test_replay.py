@@ -0,0 +1,106 @@
+import json
+import time
+import pytest
+import websocket
+from modules.recorder import TraceRecorder, RecordingXArmAPI
+from simulator.fake_xarm import FakeXArmAPI
+from simulator.replay import TraceReader, ReplayXArmAPI, ReplayWebsocketServer
+
+WORLD_OFFSET_CMD = "get_world_offset_config"
+
+
+@pytest.fixture
+def api():
+    records = [{"k": "call", "n": "set_position", "r": 0, "d": 0.4, "t": 1.0, "s": "sim_stand"}]
+    api = ReplayXArmAPI(records, speed=4.0, time_scale=1.0)
+    api.motion_enable(True)
+    api.set_mode(0)
+    api.set_state(0)
+    yield api
+    api.disconnect()
+
+
+def test_recorded_motion_takes_recorded_duration_over_speed(api):
+    # the simulated move would take 100 s at 1 mm/s
+    started = time.monotonic()
+    assert api.set_position(307.0, 0.0, 112.0, 180.0, 0.0, 0.0, speed=1.0, wait=True) == 0
+    elapsed = time.monotonic() - started
+    assert 0.09 <= elapsed < 0.3
+    assert api.position[:3] == pytest.approx([307.0, 0.0, 112.0])
+    assert not api.get_is_moving()
+
+
+def test_call_missing_from_trace_is_simulated(api):
+    api.set_position(307.0, 0.0, 112.0, 180.0, 0.0, 0.0, speed=1.0, wait=True)
+    started = time.monotonic()
+    assert api.set_position(317.0, 0.0, 112.0, 180.0, 0.0, 0.0, speed=100.0, wait=True) == 0
+    assert time.monotonic() - started >= 0.09
+    assert api.position[:3] == pytest.approx([317.0, 0.0, 112.0])
+
+
+@pytest.fixture
+def trace_path(tmp_path):
+    '''
+    trace of two sessions, the latest one recorded from a simulated arm and a websocket exchange
+    '''
+    path = str(tmp_path / "trace.jsonl")
+    earlier = TraceRecorder(path)
+    earlier.record("old_stand", "call", n="set_mode", a=[0], kw={}, r=0, d=0.0)
+    earlier.close()
+    recorder = TraceRecorder(path)
+    arm = FakeXArmAPI(time_scale=0.0)
+    api = RecordingXArmAPI(arm, recorder, "prod_stand")
+    api.register_state_changed_callback(lambda data: None)
+    api.motion_enable(True)
+    api.set_mode(0)
+    api.set_state(0)
+    # the arm is in error, the controller rejects the motion
+    arm.inject_error(21)
+    api.set_position(307.0, 0.0, 112.0, 180.0, 0.0, 0.0, speed=100.0, wait=True)
+    arm.disconnect()
+    recorder.record("prod_stand", "tx", f=json.dumps({"id": 5, "cmd": WORLD_OFFSET_CMD, "data": {}}))
+    recorder.record("prod_stand", "rx", f=json.dumps({"id": 5, "cmd": WORLD_OFFSET_CMD, "code": 0, "data": {"configs": []}}))
+    recorder.record("prod_stand", "tx", f=json.dumps({"id": 6, "cmd": WORLD_OFFSET_CMD, "data": {}}))
+    recorder.close()
+    return path
+
+
+def test_reader_returns_latest_session(trace_path):
+    assert TraceReader(trace_path).stands == ["prod_stand"]
+    assert TraceReader(trace_path, session=0).stands == ["old_stand"]
+    trace = TraceReader(trace_path)
+    assert [record["n"] for record in trace.records("prod_stand", "call")] == \
+        ["motion_enable", "set_mode", "set_state", "set_position"]
+    assert {record["n"] for record in trace.records("prod_stand", "cb")} == {"state_changed"}
+
+
+def test_replayed_sdk_returns_recorded_results(trace_path):
+    trace = TraceReader(trace_path)
+    api = ReplayXArmAPI(trace.records("prod_stand", "call", "cb"), speed=10.0, time_scale=0.0)
+    try:
+        assert api.motion_enable(True) == 0 and api.set_mode(0) == 0 and api.set_state(0) == 0
+        # the simulated arm is fine, the recorded rejection is replayed
+        recorded = trace.records("prod_stand", "call")[-1]["r"]
+        assert recorded != 0
+        assert api.set_position(307.0, 0.0, 112.0, 180.0, 0.0, 0.0, speed=100.0, wait=True) == recorded
+    finally:
+        api.disconnect()
+
+
+def test_replayed_websocket_answers_recorded_responses(trace_path):
+    records = TraceReader(trace_path).records("prod_stand", "tx", "rx")
+    server = ReplayWebsocketServer(records, host="127.0.0.1", port=0).start()
+    host, port = server.address
+    connection = websocket.create_connection(f"ws://{host}:{port}/ws", timeout=2.0)
+    try:
+        connection.send(json.dumps({"id": 40, "cmd": WORLD_OFFSET_CMD, "data": {}}))
+        assert json.loads(connection.recv()) == {"id": 40, "cmd": WORLD_OFFSET_CMD, "code": 0, "data": {"configs": []}}
+        # the second recorded command was never answered
+        connection.send(json.dumps({"id": 41, "cmd": WORLD_OFFSET_CMD, "data": {}}))
+        # commands missing from the trace are answered by the simulator
+        connection.send(json.dumps({"id": 42, "cmd": "get_tcp_offset_load_config", "data": {}}))
+        assert json.loads(connection.recv())["id"] == 42
+        assert server.stats["dropped"] == 1
+    finally:
+        connection.close()
+        server.stop()
@@ -0,0 +1,117 @@
+import time
+import threading
+import pytest
+from modules.retry import RetryPolicy, deadline, time_remaining, bounded_timeout, is_retryable, detached_context
+from modules._dataclasses import JointPose
+from modules._exceptions import (RobotException, ConfigException, SDKCallException,
+                                 RetryBudgetExceededException, MotionCancelledException)
+
+
+def _failing(errors):
+    '''
+    callable raising the given errors in turn, then returning "ok"
+    '''
+    errors = list(errors)
+    calls = []
+
+    def func():
+        calls.append(time.monotonic())
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+    func.calls = calls
+    return func
+
+
+@pytest.mark.parametrize("error, retryable", [
+    (RobotException("x"), True),
+    (SDKCallException("x", code=1), True),
+    (SDKCallException("x", code=-8), False),
+    (SDKCallException("x", code=1, error_code=22), False),
+    (ConfigException("x"), False),
+    (MotionCancelledException("x"), False),
+    (RuntimeError("x"), False),
+])
+def test_errors_are_classified(error, retryable):
+    assert is_retryable(error) == retryable
+
+
+def test_backoff_grows_up_to_max_delay():
+    policy = RetryPolicy("test", attempts=5, base_delay=0.1, max_delay=0.3, jitter=0.0)
+    assert [policy.delay(attempt) for attempt in (1, 2, 3, 4)] == pytest.approx([0.1, 0.2, 0.3, 0.3])
+    jittered = RetryPolicy("test", attempts=5, base_delay=0.1, jitter=0.5)
+    assert all(0.05 <= jittered.delay(1) <= 0.1 for _ in range(100))
+
+
+def test_retryable_errors_are_retried_until_success():
+    func = _failing([RobotException("first"), RobotException("second")])
+    retries = []
+    policy = RetryPolicy("test", attempts=3, base_delay=0.001)
+    assert policy.call(func, on_retry=lambda attempt, e: retries.append((attempt, str(e)))) == "ok"
+    assert retries == [(1, "first"), (2, "second")]
+
+
+def test_gives_up_after_attempts_and_on_fatal_errors():
+    policy = RetryPolicy("test", attempts=2, base_delay=0.001)
+    func = _failing([RobotException("first"), RobotException("second"), RobotException("third")])
+    with pytest.raises(RobotException, match="second"):
+        policy.call(func)
+    func = _failing([ConfigException("fatal")])
+    with pytest.raises(ConfigException):
+        policy.call(func)
+    assert len(func.calls) == 1
+
+
+def test_deadline_leaving_no_time_stops_retrying():
+    policy = RetryPolicy("test", attempts=5, base_delay=0.2, jitter=0.0)
+    func = _failing([RobotException("first")] * 5)
+    with deadline(0.1):
+        with pytest.raises(RetryBudgetExceededException):
+            policy.call(func)
+    assert len(func.calls) == 1
+
+
+def test_nested_deadline_never_extends_outer():
+    assert time_remaining() is None and bounded_timeout(3.0) == 3.0
+    with deadline(1.0):
+        with deadline(10.0):
+            assert time_remaining() <= 1.0
+            assert bounded_timeout(3.0) <= 1.0
+        with deadline(None):
+            assert time_remaining() <= 1.0
+        assert detached_context().run(time_remaining) is None
+    assert time_remaining() is None
+
+
+def test_interrupt_cuts_backoff_short():
+    interrupt = threading.Event()
+    interrupt.set()
+    policy = RetryPolicy("test", attempts=3, base_delay=5.0)
+    func = _failing([RobotException("first")] * 3)
+    start = time.monotonic()
+    with pytest.raises(RobotException):
+        policy.call(func, interrupt=interrupt)
+    assert time.monotonic() - start < 1.0 and len(func.calls) == 1
+
+
+def test_move_retries_after_transient_sdk_failure(robot, sdk_calls, monkeypatch):
+    robot._set_mode(0)
+    set_servo_angle = robot._robot.set_servo_angle
+    codes = [9]
+
+    def flaky(*args, **kwargs):
+        return codes.pop(0) if codes else set_servo_angle(*args, **kwargs)
+    monkeypatch.setattr(robot._robot, "set_servo_angle", flaky)
+    sdk_calls.watch("set_servo_angle")
+    pose = JointPose(tuple(robot._robot.angles))
+    robot.move_to(pose, robot._config.velocities.reduced)
+    assert len(sdk_calls) == 2
+
+
+def test_move_to_unreachable_target_is_not_retried(robot, sdk_calls, monkeypatch):
+    robot._set_mode(0)
+    monkeypatch.setattr(robot._robot, "set_servo_angle", lambda *args, **kwargs: -8)
+    sdk_calls.watch("set_servo_angle")
+    with pytest.raises(SDKCallException) as raised:
+        robot.move_to(JointPose(tuple(robot._robot.angles)), robot._config.velocities.reduced)
+    assert raised.value.code == -8 and len(sdk_calls) == 1
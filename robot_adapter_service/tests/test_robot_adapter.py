@@ -0,0 +1,155 @@
+import time
+import pytest
+from modules.robot_adapter import MotionType
+from modules._dataclasses import JointPose, CartesianPose, Waypoint
+from modules._exceptions import ConfigException
+
+
+@pytest.fixture
+def offset_calls(robot, sdk_calls):
+    '''
+    (offset kind, offset) sent to the simulated arm during the test
+    '''
+    robot._set_mode(0)
+    return sdk_calls.watch("set_tcp_offset", "set_world_offset")
+
+
+def _offsets(calls):
+    return [(name, args[0][2]) for name, args, _ in calls]
+
+
+def test_same_tcp_config_is_set_once(robot, offset_calls):
+    robot._set_tcp_config("gripper")
+    offset_calls.clear()
+    robot._set_tcp_config("marker")
+    robot._set_tcp_config("marker")
+    assert _offsets(offset_calls) == [("set_tcp_offset", 100.0)]
+
+
+def test_changed_tcp_config_is_applied(robot, offset_calls):
+    robot._set_tcp_config("marker")
+    offset_calls.clear()
+    robot._set_tcp_config("gripper")
+    robot._set_tcp_config("marker")
+    assert _offsets(offset_calls) == [("set_tcp_offset", 150.0), ("set_tcp_offset", 100.0)]
+
+
+def test_offset_change_keeps_shadow(robot, offset_calls):
+    robot._set_base_config("base")
+    robot._set_tcp_config("marker")
+    robot._set_mode(0)
+    robot._set_tcp_config("gripper")
+    assert robot._shadow.mode == 0
+    assert robot._shadow.world_offset is not None
+    assert robot._shadow.tcp_offset is not None
+    offset_calls.clear()
+    robot._set_base_config("base")
+    assert offset_calls == []
+
+
+def test_linear_move_keeps_straight_line(robot, sdk_calls):
+    pose = robot._config.poses.park
+    velocity = robot._config.velocities.reduced
+    robot.precompute_ik()
+    sdk_calls.watch("set_position", "set_servo_angle")
+    robot.move_to(pose, velocity, linear=True)
+    assert [(name, kwargs.get("motion_type"), kwargs["speed"]) for name, _, kwargs in sdk_calls] == \
+        [("set_position", MotionType.linear, velocity.linear)]
+
+
+def test_joint_move_uses_cached_solution_at_matching_speed(robot, sdk_calls):
+    pose = robot._config.poses.park
+    velocity = robot._config.velocities.reduced
+    robot.precompute_ik()
+    sdk_calls.watch("set_position", "set_servo_angle", "get_inverse_kinematics")
+    robot.move_to(pose, velocity, linear=False)
+    assert [name for name, _, _ in sdk_calls] == ["set_servo_angle"]
+    # the speed set_position with MotionType.joint moves at: the same fraction of 4 rad/s as the linear speed is of 1000 mm/s
+    assert sdk_calls[0][2]["speed"] == pytest.approx(velocity.linear / 1000.0 * 229.183, rel=1e-3)
+
+
+def test_active_mode_is_not_set_again(robot, sdk_calls):
+    robot._set_mode(0)
+    sdk_calls.watch("set_mode", "set_state")
+    robot._set_mode(0)
+    robot._set_mode(0)
+    assert sdk_calls == []
+
+
+def test_error_invalidates_shadow(robot, sdk_calls):
+    robot._set_mode(0)
+    robot._set_tcp_config("marker")
+    robot._robot.inject_error(22)
+    assert robot._shadow.tcp_offset is None and robot._shadow.mode is None
+    sdk_calls.watch("set_tcp_offset")
+    robot._set_mode(0)
+    robot._set_tcp_config("marker")
+    assert [name for name, _, _ in sdk_calls] == ["set_tcp_offset"]
+
+
+def test_base_config_change_waits_for_report_only(robot):
+    robot._set_mode(0)
+    for name in ("table", "base"):
+        started = time.monotonic()
+        robot._set_base_config(name)
+        # the simulated controller reports the new offset within a report period (33 ms)
+        assert time.monotonic() - started < 0.3
+    assert robot._robot.world_offset[2] == pytest.approx(0.0)
+
+
+def test_mode_change_waits_for_state_only(robot):
+    robot._set_mode(0)
+    started = time.monotonic()
+    robot._set_mode(1)
+    robot._leave_servo_mode()
+    assert time.monotonic() - started < 0.3
+    assert robot._robot.mode == 0 and robot._robot.state == 0
+
+
+def test_trajectory_is_queued_without_stopping(robot, sdk_calls):
+    robot._set_mode(0)
+    waypoints = [Waypoint(pose=JointPose(values=[float(i * 5), 0, 0, 0, 0, 0]), velocity=90.0, blend_radius=10.0)
+                 for i in range(1, 5)]
+    sdk_calls.watch("set_servo_angle")
+    robot.execute_trajectory(waypoints)
+    assert [(kwargs["wait"], kwargs["radius"]) for _, _, kwargs in sdk_calls] == \
+        [(False, 10.0), (False, 10.0), (False, 10.0), (True, None)]
+    assert robot._robot.angles[0] == pytest.approx(20.0)
+
+
+def test_trajectory_with_several_tcps_is_rejected(robot):
+    waypoints = [Waypoint(pose=CartesianPose(position=[300, 0, 250], orientation=[180, 0, 0], frame="base", tcp=tcp), velocity=50.0)
+                 for tcp in ("marker", "gripper")]
+    with pytest.raises(ConfigException):
+        robot.execute_trajectory(waypoints)
+
+
+def test_configured_pose_is_solved_once(robot, sdk_calls):
+    pose = robot._config.poses.park
+    sdk_calls.watch("get_inverse_kinematics")
+    robot.precompute_ik()
+    tcp_config = robot._set_tcp_config(pose.tcp)
+    assert robot._joint_solution(pose, tcp_config) is not None
+    assert len(sdk_calls) == 1
+    robot._on_catalog_changed("tcp_configs", {})
+    assert robot._joint_solution(pose, tcp_config) is None
+
+
+def test_other_poses_are_solved_by_controller(robot, sdk_calls):
+    robot.precompute_ik()
+    cached = dict(robot._ik_cache)
+    pose = CartesianPose(position=[320, 10, 240], orientation=[180, 0, 0], frame="base", tcp="marker")
+    sdk_calls.watch("get_inverse_kinematics", "set_position", "set_servo_angle")
+    robot.move_to(pose, robot._config.velocities.reduced, linear=False)
+    assert [(name, kwargs.get("motion_type")) for name, _, kwargs in sdk_calls] == [("set_position", MotionType.joint)]
+    assert robot._ik_cache == cached
+
+
+def test_stop_invalidates_mode_shadow(robot, sdk_calls):
+    robot._set_mode(0)
+    robot.stop_motion()
+    assert robot._shadow.mode is None
+    sdk_calls.watch("set_state")
+    robot._set_mode(0)
+    assert [name for name, _, _ in sdk_calls] == ["set_state"]
+    assert robot._shadow.mode == 0 and robot._robot.state == 0
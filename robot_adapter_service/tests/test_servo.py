@@ -0,0 +1,101 @@
+import threading
+import grpc
+import numpy as np
+import pytest
+from cafebot_proto import pb2
+from modules.servo import interpolate_path, check_path, ServoStreamer
+from modules._dataclasses import JointPose, Waypoint
+from modules._exceptions import ServoPathException, SDKCallException, MotionPreemptedException
+
+RATE = 100.0
+
+
+def test_joint_path_is_sampled_at_rate():
+    points = interpolate_path([0.0] * 6, [[10.0, 0, 0, 0, 0, 0], [10.0, 5.0, 0, 0, 0, 0]], [10.0, 50.0], rate=10.0, cartesian=False)
+    # 1 s at 10 deg/s, then 0.1 s at 50 deg/s
+    assert len(points) == 11
+    assert points[:10, 0] == pytest.approx(np.arange(1, 11))
+    assert points[-1].tolist() == [10.0, 5.0, 0.0, 0.0, 0.0, 0.0]
+
+
+def test_cartesian_path_turns_the_short_way():
+    start = [300.0, 0.0, 200.0, 180.0, 0.0, 170.0]
+    points = interpolate_path(start, [[300.0, 0.0, 200.0, 180.0, 0.0, -170.0]], [100.0], rate=10.0, cartesian=True,
+                              angular_speed=10.0)
+    # 20 degrees through 180 at 10 deg/s
+    assert len(points) == 20
+    assert np.abs(points[:, 5]).min() >= 170.0 - 1e-9
+    assert points[-1, 5] == pytest.approx(-170.0)
+
+
+def test_check_path_rejects_fast_and_malformed_paths():
+    start = [0.0] * 6
+    check_path(start, np.array([[0.5, 0, 0, 0, 0, 0]]), RATE, cartesian=False, max_joint_speed=60.0, max_linear_speed=250.0)
+    with pytest.raises(ServoPathException, match="too fast"):
+        check_path(start, np.array([[1.0, 0, 0, 0, 0, 0]]), RATE, cartesian=False, max_joint_speed=60.0, max_linear_speed=250.0)
+    with pytest.raises(ServoPathException, match="too fast"):
+        check_path(start, np.array([[3.0, 0, 0, 0, 0, 0]]), RATE, cartesian=True, max_joint_speed=60.0, max_linear_speed=250.0)
+    with pytest.raises(ServoPathException, match="non-empty"):
+        check_path(start, np.zeros((2, 5)), RATE, cartesian=False, max_joint_speed=60.0, max_linear_speed=250.0)
+    with pytest.raises(ServoPathException, match="non-finite"):
+        check_path(start, np.array([[np.nan, 0, 0, 0, 0, 0]]), RATE, cartesian=False, max_joint_speed=60.0, max_linear_speed=250.0)
+
+
+def test_streamer_sends_points_at_rate():
+    sent = []
+    stats = ServoStreamer("sim_stand").run(np.zeros((20, 6)), RATE, lambda point: sent.append(point) or 0)
+    assert len(sent) == stats.points == 20
+    assert stats.duration == pytest.approx(19 / RATE, abs=0.05)
+    assert stats.rate == RATE and stats.max_lateness >= stats.mean_lateness >= 0.0
+
+
+def test_streamer_stops_on_failure_and_request():
+    with pytest.raises(SDKCallException) as error:
+        ServoStreamer("sim_stand").run(np.zeros((5, 6)), RATE, lambda point: 1)
+    assert error.value.code == 1
+    stop = threading.Event()
+    sent = []
+
+    def send(point):
+        sent.append(point)
+        if len(sent) == 2:
+            stop.set()
+        return 0
+    with pytest.raises(MotionPreemptedException):
+        ServoStreamer("sim_stand").run(np.zeros((5, 6)), RATE, send, stop=stop)
+    assert len(sent) == 2
+
+
+def _joint_targets(robot, *moves):
+    start = np.array(robot._robot.angles[:6])
+    return [(start + np.array([move, 0, 0, 0, 0, 0])).tolist() for move in moves]
+
+
+def test_servo_trajectory_moves_simulated_arm(robot, scheduler, sdk_calls):
+    sdk_calls.watch("set_servo_angle_j")
+    targets = _joint_targets(robot, 2.0, 0.0)
+    waypoints = [Waypoint(pose=JointPose(tuple(target)), velocity=40.0) for target in targets]
+    stats = scheduler.submit("servo_trajectory", lambda: robot.servo_trajectory(waypoints, rate=RATE)).result(timeout=10.0)
+    # 2 degrees and back at 40 deg/s
+    assert stats.points == len(sdk_calls) == 10
+    assert robot._robot.mode == 0
+    assert robot._robot.angles[:6] == pytest.approx(targets[-1])
+
+
+def test_stream_servo_rpc(movements, robot):
+    target = _joint_targets(robot, 0.2)[0]
+    stats = movements.stream_servo(iter([pb2.ServoPoint(settings=pb2.ServoSettings(rate=RATE), values=target)]), timeout=10.0)
+    assert stats.points == 1 and stats.rate == RATE
+    for values in ([0.0] * 5, _joint_targets(robot, 30.0)[0]):
+        with pytest.raises(grpc.RpcError) as error:
+            movements.stream_servo(iter([pb2.ServoPoint(values=values)]), timeout=10.0)
+        assert error.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+
+
+def test_servo_trajectory_rpc(movements, robot):
+    waypoints = [pb2.Waypoint(joint=pb2.JointTarget(values=target), velocity=40.0) for target in _joint_targets(robot, 1.0, 0.0)]
+    stats = movements.servo_trajectory(pb2.ServoTrajectoryRequest(waypoints=waypoints, rate=RATE), timeout=10.0)
+    assert stats.points == 6
+    with pytest.raises(grpc.RpcError) as error:
+        movements.servo_trajectory(pb2.ServoTrajectoryRequest(rate=RATE), timeout=10.0)
+    assert error.value.code() == grpc.StatusCode.INVALID_ARGUMENT
@@ -0,0 +1,81 @@
+import json
+import time
+import pytest
+from websocket import create_connection
+from simulator.fake_xarm import FakeXArmAPI
+from simulator.fake_ws_server import FakeWebsocketServer
+from modules._utils import wait_until
+
+_STATE_NOT_READY = 9
+_MODE_IS_NOT_CORRECT = 51
+_HAS_ERROR = 1
+_OUT_OF_RANGE = -8
+
+
+@pytest.fixture
+def api():
+    api = FakeXArmAPI(time_scale=0.1)
+    yield api
+    api.disconnect()
+
+
+def _enable(api, mode: int = 0):
+    api.motion_enable(True)
+    api.set_mode(mode)
+    api.set_state(0)
+
+
+def test_motion_needs_enabled_arm_in_position_mode(api):
+    assert api.set_position(300, 0, 200, 180, 0, 0, wait=True) == _STATE_NOT_READY
+    _enable(api, mode=1)
+    assert api.set_position(300, 0, 200, 180, 0, 0, wait=True) == _MODE_IS_NOT_CORRECT
+    assert api.set_servo_angle_j([1.0, 0, 0, 0, 0, 0]) == 0
+    _enable(api, mode=0)
+    assert api.set_position(300, 0, 200, 180, 0, 0, wait=True) == 0
+    assert api.position[:3] == pytest.approx([300.0, 0.0, 200.0])
+    assert api.set_position(900, 0, 200, 180, 0, 0) == _OUT_OF_RANGE
+
+
+def test_motion_takes_scaled_duration(api):
+    _enable(api)
+    started = time.monotonic()
+    # 20 deg at 10 deg/s takes 2 s on the arm, 0.2 s simulated
+    assert api.set_servo_angle(angle=[20.0, 0, 0, 0, 0, 0], speed=10.0, wait=True) == 0
+    assert 0.18 <= time.monotonic() - started < 0.6
+    assert api.angles[0] == pytest.approx(20.0)
+
+
+def test_error_aborts_motion_until_cleaned(api):
+    _enable(api)
+    api.set_servo_angle(angle=[90.0, 0, 0, 0, 0, 0], speed=10.0)
+    api.inject_error(31)
+    assert api.has_error and not api.get_is_moving()
+    assert api.set_state(0) == _HAS_ERROR
+    api.clean_error()
+    assert api.set_state(0) == 0
+
+
+def test_world_offset_is_reported_with_next_report(api):
+    api.set_world_offset([0, 0, 20, 0, 0, 0], is_radian=True)
+    assert api.world_offset[2] == 0.0
+    reports = []
+    api.register_report_callback(reports.append)
+    assert wait_until(lambda: reports, timeout=5.0)
+    assert api.world_offset[2] == pytest.approx(20.0)
+
+
+def test_websocket_server_answers_catalog_commands():
+    server = FakeWebsocketServer(host="127.0.0.1", port=0, latency=0.0).start()
+    try:
+        host, port = server.address
+        connection = create_connection(f"ws://{host}:{port}/ws", timeout=5.0)
+        connection.send(json.dumps({"cmd": "get_world_offset_config", "id": "7", "data": {}}))
+        response = json.loads(connection.recv())
+        assert response["id"] == "7" and response["code"] == 0
+        assert [config["name"]["en"] for config in response["data"]["configs"]] == ["base"]
+        connection.send(json.dumps({"cmd": "unknown", "id": "8", "data": {}}))
+        assert json.loads(connection.recv())["code"] == 1
+        connection.close()
+        assert server.stats["answered"] == 2
+    finally:
+        server.stop()
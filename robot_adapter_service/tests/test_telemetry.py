@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import pytest
+from cafebot_proto import pb2
+from modules.telemetry import TelemetryHub
+from modules._utils import wait_until
+from conftest import TEST_STAND
+
+
+@pytest.fixture
+def hub(request):
+    return TelemetryHub(f"telemetry_{request.node.name}")
+
+
+def _publish(hub, count: int):
+    for i in range(count):
+        hub.publish(joints=[float(i)] * 6, tcp_pose=[0.0] * 6, mode=0, state=0, error_code=0, warn_code=0)
+
+
+def test_frames_fan_out_to_every_subscriber(hub):
+    first, second = hub.subscribe(), hub.subscribe()
+    _publish(hub, 3)
+    for subscription in (first, second):
+        assert [subscription.poll().joints[0] for _ in range(3)] == [0.0, 1.0, 2.0]
+        assert subscription.poll() is None
+    assert hub.latest().seq == 2 and len(hub.history()) == 3
+
+
+def test_slow_subscriber_drops_oldest_frames(hub):
+    slow = hub.subscribe(queue_size=2)
+    _publish(hub, 5)
+    assert [slow.poll().joints[0] for _ in range(2)] == [3.0, 4.0]
+    assert slow.dropped == 3
+
+
+def test_frames_are_decimated_to_max_rate(hub):
+    decimated = hub.subscribe(max_rate=1.0)
+    _publish(hub, 5)
+    assert decimated.poll().joints[0] == 0.0
+    assert decimated.poll() is None
+
+
+def test_closed_subscription_stops_receiving(hub):
+    subscription = hub.subscribe()
+    subscription.close()
+    _publish(hub, 1)
+    assert hub.subscriber_count == 0
+    assert subscription.get(timeout=0.01) is None
+
+
+def test_async_subscriber_wakes_up_on_publish(hub):
+    subscription = hub.subscribe()
+
+    async def receive():
+        threading.Timer(0.05, _publish, args=(hub, 1)).start()
+        return await subscription.get_async(timeout=5.0)
+    assert asyncio.run(receive()).seq == 0
+
+
+def test_telemetry_streams_simulated_reports(movements):
+    hub = TelemetryHub(TEST_STAND)
+    subscribers = hub.subscriber_count
+    stream = movements.telemetry(pb2.TelemetryRequest(max_rate=0), timeout=10.0)
+    states = [next(stream) for _ in range(3)]
+    assert [state.seq for state in states] == sorted({state.seq for state in states})
+    assert all(len(state.joints) == 6 and len(state.tcp_pose) == 6 for state in states)
+    stream.cancel()
+    assert wait_until(lambda: hub.subscriber_count == subscribers, timeout=5.0)
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+from modules._utils import wait_until
+from modules.transforms import compose, pose_to_matrix
+
+
+def test_snapshots_follow_reports(robot):
+    assert wait_until(lambda: robot._tfs is not None, timeout=1.0)
+    first = robot.current_tfs()
+    assert wait_until(lambda: robot.current_tfs().seq > first.seq, timeout=1.0)
+    assert robot.current_tfs().timestamp >= first.timestamp
+
+
+def test_tcp_frame_matches_reported_pose(robot, scheduler):
+    scheduler.submit("park", robot.park).result(timeout=10.0)
+    seq = robot.current_tfs().seq
+    # the snapshot of a report sent after the motion
+    assert wait_until(lambda: robot.current_tfs().seq > seq + 1, timeout=1.0)
+    tfs = robot.current_tfs()
+    poses = dict(zip(tfs.frames, tfs.poses))
+    expected = compose(pose_to_matrix(robot._robot.world_offset, degrees=True),
+                       pose_to_matrix(robot._robot.position, degrees=True))
+    assert poses["tcp"][:3] == pytest.approx(expected[:3, 3], abs=1e-6)
+    assert poses["world_offset"][:3] == pytest.approx(robot._robot.world_offset[:3])
+    assert np.linalg.norm(poses["tcp"][3:]) == pytest.approx(1.0)
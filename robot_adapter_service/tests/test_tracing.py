@@ -0,0 +1,73 @@
+import json
+import logging
+import pytest
+from cafebot_proto import pb2
+from modules import tracing
+from modules._utils import wait_until
+from modules.tracing import trace_request, span, annotate
+
+
+def test_spans_nest_into_phase_paths():
+    with trace_request("request") as trace:
+        with span("outer"):
+            with span("inner", cmd="x") as attributes:
+                attributes["cmd_id"] = 7
+        annotate(stand="sim_stand")
+    phases = trace.summary()["phases"]
+    assert [(phase["name"], phase.get("cmd_id")) for phase in phases] == [("outer/inner", 7), ("outer", None)]
+    assert trace.summary()["stand"] == "sim_stand" and trace.status == "ok"
+
+
+def test_failed_span_records_error():
+    with pytest.raises(ValueError):
+        with trace_request("request") as trace:
+            with span("failing"):
+                raise ValueError("boom")
+    assert trace.status == "ValueError"
+    assert trace.summary()["phases"][0]["error"] == "ValueError"
+
+
+def test_span_outside_request_is_noop():
+    with span("alone") as attributes:
+        attributes["ignored"] = True
+    assert tracing.current_trace() is None
+
+
+def test_summary_is_logged_and_slow_requests_flagged(caplog):
+    tracing.configure(slow_threshold=0.0)
+    try:
+        with caplog.at_level(logging.INFO):
+            with trace_request("slow"):
+                pass
+    finally:
+        tracing.configure(slow_threshold=5.0)
+    summaries = [json.loads(record.getMessage()) for record in caplog.records if record.name in ("trace", "slow_ops")]
+    assert [summary["request"] for summary in summaries] == ["slow", "slow"]
+
+
+def test_motion_phases_land_in_request_trace(scheduler, robot):
+    with trace_request("park") as trace:
+        scheduler.submit("park", robot.park).result(timeout=10.0)
+    summary = trace.summary()
+    names = [phase["name"] for phase in summary["phases"]]
+    assert "park" in names
+    assert any(name.startswith("park/move_to") for name in names)
+    assert "queue_wait_ms" in summary
+
+
+def _logged_summaries(caplog, request: str) -> list:
+    return [summary for summary in (json.loads(record.getMessage()) for record in caplog.records if record.name == "trace")
+            if summary["request"] == request]
+
+
+def test_streaming_requests_are_traced(movements, robot, caplog):
+    with caplog.at_level(logging.INFO, logger="trace"):
+        stats = movements.stream_servo(iter([pb2.ServoPoint(settings=pb2.ServoSettings(rate=50.0), values=robot._robot.angles[:6])]),
+                                       timeout=10.0)
+        assert stats.points == 1
+        stream = movements.telemetry(pb2.TelemetryRequest(max_rate=0), timeout=10.0)
+        next(stream)
+        stream.cancel()
+        # the response stream is traced until the server notices the cancellation
+        assert wait_until(lambda: _logged_summaries(caplog, "telemetry"), timeout=5.0)
+    assert [summary["status"] for summary in _logged_summaries(caplog, "stream_servo")] == ["ok"]
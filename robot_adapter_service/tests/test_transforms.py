@@ -0,0 +1,66 @@
+import math
+import numpy as np
+import pytest
+from modules.transforms import (wrap_angle, offsets_from_degrees, rpy_to_matrix, matrix_to_rpy, pose_to_matrix,
+                                matrix_to_pose, matrix_to_quaternion, invert, compose, OffsetComparator, FrameChain)
+
+POSES = np.array([[100.0, -50.0, 300.0, 180.0, 0.0, 0.0],
+                  [0.0, 0.0, 150.0, 10.0, -30.0, 170.0],
+                  [-200.0, 400.0, 10.0, -90.0, 45.0, -135.0]])
+
+
+def test_wrap_angle():
+    assert wrap_angle([math.pi, -math.pi, 3 * math.pi / 2, 0.0]) == pytest.approx([-math.pi, -math.pi, -math.pi / 2, 0.0])
+    out = np.array([4 * math.pi + 0.5])
+    assert wrap_angle(out, out=out) is out and out[0] == pytest.approx(0.5)
+
+
+def test_offsets_from_degrees():
+    assert offsets_from_degrees([1, 2, 3, 180, 90, -90])[0] == pytest.approx([1, 2, 3, math.pi, math.pi / 2, -math.pi / 2])
+
+
+def test_pose_matrix_round_trip():
+    matrices = pose_to_matrix(POSES, degrees=True)
+    assert matrices.shape == (3, 4, 4)
+    poses = matrix_to_pose(matrices, degrees=True)
+    assert poses[:, :3] == pytest.approx(POSES[:, :3])
+    assert np.allclose(pose_to_matrix(poses, degrees=True), matrices)
+
+
+def test_gimbal_lock_keeps_rotation():
+    rotation = rpy_to_matrix([30.0, 90.0, 40.0], degrees=True)
+    rpy = matrix_to_rpy(rotation, degrees=True)
+    assert rpy[0] == 0.0
+    assert np.allclose(rpy_to_matrix(rpy, degrees=True), rotation)
+
+
+def test_quaternion_of_rotation_about_z():
+    quaternion = matrix_to_quaternion(rpy_to_matrix([0.0, 0.0, 90.0], degrees=True))
+    assert quaternion == pytest.approx([0.0, 0.0, math.sqrt(0.5), math.sqrt(0.5)])
+
+
+def test_invert_and_compose():
+    matrices = pose_to_matrix(POSES, degrees=True)
+    assert np.allclose(invert(matrices), np.linalg.inv(matrices))
+    assert np.allclose(compose(matrices[0], invert(matrices[0]), matrices[1]), matrices[1])
+
+
+def test_offset_comparator_wraps_orientation():
+    comparator = OffsetComparator(tolerance=0.01)
+    expected = offsets_from_degrees([0, 0, 100, 180, 0, 0])[0]
+    assert comparator.matches([0, 0, 100, -180, 0, 0], expected)
+    assert comparator.matches([0, 0, 100.005, 180, 0, 0], expected)
+    assert not comparator.matches([0, 0, 101, 180, 0, 0], expected)
+    assert not comparator.matches([0, 0, 100, 170, 0, 0], expected)
+
+
+def test_frame_chain_matches_composed_frames():
+    world_offset, tcp_pose, tcp_offset = POSES
+    frames = FrameChain().update(world_offset, tcp_pose, tcp_offset)
+    base_tcp = compose(pose_to_matrix(world_offset, degrees=True), pose_to_matrix(tcp_pose, degrees=True))
+    base_flange = compose(base_tcp, invert(pose_to_matrix(tcp_offset, degrees=True)))
+    expected = [pose_to_matrix(world_offset, degrees=True), base_flange, base_tcp]
+    assert frames.shape == (len(FrameChain.FRAMES), 7)
+    for frame, matrix in zip(frames, expected):
+        assert frame[:3] == pytest.approx(matrix[:3, 3])
+        assert frame[3:] == pytest.approx(matrix_to_quaternion(matrix[:3, :3]))
@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+import importlib
+import subprocess
+import threading
+import pytest
+from modules._utils import LazyModule, wait_until
+
+
+def test_wait_until_wakes_up_on_notify():
+    condition = threading.Condition()
+    state = {"ready": False}
+
+    def notify():
+        with condition:
+            state["ready"] = True
+            condition.notify_all()
+    threading.Timer(0.05, notify).start()
+    started = time.monotonic()
+    assert wait_until(lambda: state["ready"], timeout=5.0, interval=10.0, condition=condition)
+    assert time.monotonic() - started < 1.0
+
+
+def test_wait_until_times_out():
+    started = time.monotonic()
+    assert not wait_until(lambda: False, timeout=0.05)
+    assert 0.05 <= time.monotonic() - started < 0.5
+
+
+@pytest.fixture
+def lazy_package(tmp_path, monkeypatch):
+    '''
+    name of a package that is not imported yet, with a submodule its __init__ does not import
+    '''
+    package = tmp_path / "lazy_package"
+    package.mkdir()
+    (package / "__init__.py").write_text("VALUE = 1\nOTHER = 2\n")
+    (package / "sub.py").write_text("NAME = 'sub'\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield "lazy_package"
+    for name in ("lazy_package", "lazy_package.sub"):
+        sys.modules.pop(name, None)
+
+
+def test_lazy_module_imports_on_first_read(lazy_package):
+    module = LazyModule(lazy_package)
+    assert lazy_package not in sys.modules
+    assert module.VALUE == 1
+    assert lazy_package in sys.modules
+    # the namespace is copied, later reads skip __getattr__
+    assert module.__dict__["OTHER"] == 2
+    with pytest.raises(AttributeError):
+        module.MISSING
+
+
+def test_lazy_module_reads_submodules_loaded_later(lazy_package):
+    module = LazyModule(lazy_package)
+    assert module.VALUE == 1
+    importlib.import_module(f"{lazy_package}.sub")
+    assert module.sub.NAME == "sub"
+
+
+def test_service_modules_import_without_heavy_dependencies():
+    code = ("import sys; path = list(sys.path); import main; "
+            "print([name for name in ('numpy', 'xarm', 'websocket') if name in sys.modules], sys.path == path)")
+    service_dir = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+    output = subprocess.run([sys.executable, "-c", code], cwd=service_dir, env=dict(os.environ),
+                            capture_output=True, text=True, check=True).stdout
+    assert output.split("\n")[-2] == "[] True"
@@ -0,0 +1,68 @@
+import threading
+import pytest
+from grpc_health.v1 import health_pb2
+from conftest import TEST_STAND
+from main import MOVEMENTS_SERVICE, _health_statuses
+from modules.warmup import StandWarmup
+from modules.retry import RetryPolicy
+from modules.motion_scheduler import MotionScheduler
+from modules.robot_adapter import RobotAdapter
+from modules._utils import StandSingleton, wait_until
+from modules._exceptions import WebsocketException
+from simulator.fake_xarm import FakeXArmAPI
+
+
+class _FailingXArmAPI(FakeXArmAPI):
+    created = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        _FailingXArmAPI.created.append(self)
+
+
+    def register_report_callback(self, callback=None, **kwargs) -> bool:
+        raise ConnectionError("report socket closed")
+
+
+def test_failed_adapter_disconnects(robot, monkeypatch):
+    monkeypatch.setattr(RobotAdapter, "api_factory", _FailingXArmAPI)
+    # the stand may already be served by another test
+    monkeypatch.delitem(StandSingleton._instances, (RobotAdapter, "sim_stand_2"), raising=False)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            RobotAdapter("sim_stand_2")
+    assert not RobotAdapter.created("sim_stand_2")
+    assert len(_FailingXArmAPI.created) == 2
+    assert not any(api.connected for api in _FailingXArmAPI.created)
+
+
+def test_warmup_makes_stand_ready(robot, ws_server):
+    ready = []
+    warmup = StandWarmup([TEST_STAND], on_ready=ready.append)
+    assert _health_statuses(warmup)[f"{MOVEMENTS_SERVICE}/{TEST_STAND}"] == health_pb2.HealthCheckResponse.NOT_SERVING
+    warmup.start()
+    assert warmup.wait(TEST_STAND, timeout=10.0)
+    assert ready == [TEST_STAND] and warmup.status() == {TEST_STAND: None}
+    assert MotionScheduler.created(TEST_STAND)
+    assert _health_statuses(warmup)[f"{MOVEMENTS_SERVICE}/{TEST_STAND}"] == health_pb2.HealthCheckResponse.SERVING
+
+
+def test_failed_warmup_reports_error_and_retries(robot, ws_server, monkeypatch):
+    gate = threading.Event()
+    attempts = []
+
+    def fetch_catalogs(stand):
+        attempts.append(stand)
+        if len(attempts) == 1:
+            raise WebsocketException("catalogs unavailable")
+        gate.wait(5.0)
+    warmup = StandWarmup([TEST_STAND])
+    warmup._backoff = RetryPolicy("warmup", attempts=1, base_delay=0.01)
+    monkeypatch.setattr(warmup, "_fetch_catalogs", fetch_catalogs)
+    warmup.start()
+    assert wait_until(lambda: len(attempts) == 2, timeout=5.0)
+    assert not warmup.is_ready(TEST_STAND)
+    assert warmup.status() == {TEST_STAND: "catalogs unavailable"}
+    gate.set()
+    assert warmup.wait(TEST_STAND, timeout=5.0)
+    assert warmup.status() == {TEST_STAND: None}
@@ -0,0 +1,141 @@
+import time
+import threading
+import pytest
+from modules._exceptions import WebsocketException, WebsocketTimeoutException
+from modules.xarm_ws import ConnectionState
+from modules._utils import wait_until
+from simulator.fake_ws_server import PUSH_CMD, _OPCODE_TEXT
+
+WORLD_OFFSET_CMD = "get_world_offset_config"
+
+
+@pytest.fixture
+def dropping_server(ws_server):
+    ws_server.drop_rate = 1.0
+    yield ws_server
+    ws_server.drop_rate = 0.0
+
+
+def test_concurrent_commands_complete_independently(xarm_ws, ws_session):
+    results, errors = [], []
+
+    def run():
+        try:
+            results.append(xarm_ws._run_blocking_command(WORLD_OFFSET_CMD, {}))
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=run) for _ in range(16)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(results) == 16 and all("configs" in result for result in results)
+    # responses wake their waiters, nobody polls
+    assert time.monotonic() - started < 1.0
+    assert ws_session.pending_count == 0
+
+
+def test_unanswered_command_times_out(xarm_ws, ws_session, dropping_server):
+    started = time.monotonic()
+    with pytest.raises(WebsocketTimeoutException):
+        xarm_ws._run_blocking_command(WORLD_OFFSET_CMD, {}, timeout=0.2)
+    assert 0.2 <= time.monotonic() - started < 1.0
+    assert ws_session.pending_count == 0
+
+
+def test_lost_connection_fails_pending_command(xarm_ws, ws_session, dropping_server):
+    cmd_id = xarm_ws._send_command(WORLD_OFFSET_CMD, {})
+    threading.Timer(0.1, ws_session.close_connection).start()
+    started = time.monotonic()
+    with pytest.raises(WebsocketException) as error:
+        ws_session.wait_response(cmd_id, timeout=5.0)
+    assert not isinstance(error.value, WebsocketTimeoutException)
+    assert time.monotonic() - started < 1.0
+    assert ws_session.wait_connected(5.0)
+
+
+@pytest.fixture
+def state_changes(ws_session):
+    states = []
+    ws_session.add_state_listener(states.append)
+    yield states
+    ws_session._state_listeners.remove(states.append)
+
+
+@pytest.fixture
+def short_heartbeat(ws_session, ws_server):
+    '''
+    heartbeat short enough to notice a silent link within the test, applied from the next connection on
+    '''
+    interval, timeout = ws_session._heartbeat_interval, ws_session._heartbeat_timeout
+    ws_session._heartbeat_interval, ws_session._heartbeat_timeout = 0.05, 0.3
+    ws_session.update_connection()
+    yield ws_session
+    ws_server.frozen = False
+    ws_session._heartbeat_interval, ws_session._heartbeat_timeout = interval, timeout
+    ws_session.update_connection()
+
+
+def test_reconnects_after_server_drops_link(xarm_ws, ws_session, ws_server, state_changes):
+    ws_server.disconnect()
+    assert wait_until(lambda: ConnectionState.disconnected in state_changes, timeout=2.0)
+    assert ws_session.wait_connected(timeout=2.0)
+    assert state_changes[-1] == ConnectionState.connected
+    assert "configs" in xarm_ws._run_blocking_command(WORLD_OFFSET_CMD, {})
+
+
+def test_silent_link_is_dropped_by_heartbeat(short_heartbeat, ws_server, state_changes):
+    ws_server.frozen = True
+    started = time.monotonic()
+    assert wait_until(lambda: ConnectionState.disconnected in state_changes, timeout=2.0)
+    assert time.monotonic() - started < 1.0
+    ws_server.frozen = False
+    assert short_heartbeat.wait_connected(timeout=2.0)
+
+
+def _send_raw(ws_server, frame: bytes):
+    for client in list(ws_server._clients):
+        client.send(_OPCODE_TEXT, frame)
+
+
+def _counted(ws_session, before: dict) -> dict:
+    return {outcome: count - before[outcome] for outcome, count in ws_session.frame_stats.items() if count != before[outcome]}
+
+
+def test_pushes_reach_subscribers_until_unsubscribed(xarm_ws, ws_session, ws_server):
+    messages = []
+    before = ws_session.frame_stats
+    xarm_ws.subscribe(PUSH_CMD, messages.append)
+    ws_server.push(PUSH_CMD, {"seq": 1})
+    assert wait_until(lambda: messages, timeout=1.0)
+    assert messages == [{"cmd": PUSH_CMD, "data": {"seq": 1}}]
+    xarm_ws.unsubscribe(PUSH_CMD, messages.append)
+    ws_server.push(PUSH_CMD, {"seq": 2})
+    assert wait_until(lambda: _counted(ws_session, before) == {"push": 1, "dropped": 1}, timeout=1.0)
+    assert len(messages) == 1
+
+
+def test_frames_are_counted_by_outcome(xarm_ws, ws_session, ws_server):
+    handler = lambda message: None
+    xarm_ws.subscribe(PUSH_CMD, handler)
+    before = ws_session.frame_stats
+    xarm_ws._run_blocking_command(WORLD_OFFSET_CMD, {})
+    _send_raw(ws_server, b'{"id": 1, "cmd": "late_response", "data": {}}')
+    _send_raw(ws_server, b'{"cmd": "unknown_push", "data": {}}')
+    _send_raw(ws_server, b'{"cmd": "' + PUSH_CMD.encode() + b'", "data": ')
+    # a nested id must not complete a command
+    _send_raw(ws_server, b'{"cmd": "' + PUSH_CMD.encode() + b'", "data": {"id": 1}}')
+    expected = {"response": 1, "unmatched": 1, "dropped": 1, "malformed": 1, "push": 1}
+    assert wait_until(lambda: _counted(ws_session, before) == expected, timeout=1.0), _counted(ws_session, before)
+    xarm_ws.unsubscribe(PUSH_CMD, handler)
+
+
+def test_response_with_nested_id_ahead_completes_command(ws_session, ws_server):
+    before = ws_session.frame_stats
+    cmd_id = ws_session.register_command()
+    _send_raw(ws_server, b'{"data": {"items": [{"id": 7}]}, "cmd": "x", "id": "%d"}' % cmd_id)
+    response = ws_session.wait_response(cmd_id, timeout=1.0)
+    assert response["data"] == {"items": [{"id": 7}]}
+    assert _counted(ws_session, before) == {"response": 1}
@@ -0,0 +1,100 @@
+import sys
+import time
+import threading
+import pytest
+from modules.xarm_ws import ConfigCatalogCache
+from modules._dataclasses import TCPOffset, BaseOffset
+from modules._utils import wait_until
+
+
+@pytest.fixture
+def fast_switching():
+    # thread switches between the read and the write of an unlocked counter make lost updates likely
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def test_catalog_cache_counts_concurrent_gets(fast_switching):
+    cache = ConfigCatalogCache("tcp", fetch=lambda: {"marker": [0, 0, 100, 0, 0, 0]}, parse=dict, ttl=60.0)
+    threads, calls = 8, 5000
+
+    def get():
+        for _ in range(calls):
+            cache.get()
+    workers = [threading.Thread(target=get) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    stats = cache.stats
+    assert stats["hits"] + stats["misses"] == threads * calls
+    assert stats["refreshes"] == 1
+
+
+class _Fetcher:
+    def __init__(self, catalog: dict):
+        self.catalog = catalog
+        self.calls = 0
+
+
+    def __call__(self) -> dict:
+        self.calls += 1
+        return dict(self.catalog)
+
+
+def test_catalog_is_fetched_once_within_ttl():
+    fetch = _Fetcher({"marker": [0, 0, 100, 0, 0, 0]})
+    cache = ConfigCatalogCache("tcp", fetch, dict, ttl=60.0)
+    assert cache.get() == cache.get() == fetch.catalog
+    assert fetch.calls == 1
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 1
+
+
+def test_catalog_is_fetched_again_after_ttl_or_invalidation():
+    fetch = _Fetcher({"marker": [0, 0, 100, 0, 0, 0]})
+    cache = ConfigCatalogCache("tcp", fetch, dict, ttl=0.05)
+    cache.get()
+    time.sleep(0.06)
+    cache.get()
+    cache.invalidate()
+    cache.get()
+    assert fetch.calls == 3
+
+
+def test_listeners_are_called_on_change_only():
+    fetch = _Fetcher({"marker": [0, 0, 100, 0, 0, 0]})
+    cache = ConfigCatalogCache("tcp", fetch, dict, ttl=60.0)
+    changes = []
+    cache.add_listener(lambda name, catalog: changes.append(catalog))
+    cache.get()
+    cache.invalidate()
+    cache.get()
+    fetch.catalog = {"gripper": [0, 0, 150, 0, 0, 0]}
+    cache.invalidate()
+    assert cache.get() == fetch.catalog
+    assert changes == [{"marker": [0, 0, 100, 0, 0, 0]}, fetch.catalog]
+
+
+def test_snapshot_is_served_while_refreshing(tmp_path):
+    ConfigCatalogCache("tcp", _Fetcher({"marker": [0, 0, 100, 0, 0, 0]}), dict, ttl=60.0, snapshot_dir=str(tmp_path)).get()
+    refreshed = threading.Event()
+
+    def slow_fetch():
+        refreshed.wait(5.0)
+        return {"gripper": [0, 0, 150, 0, 0, 0]}
+    cache = ConfigCatalogCache("tcp", slow_fetch, dict, ttl=60.0, snapshot_dir=str(tmp_path))
+    assert cache.get() == {"marker": [0, 0, 100, 0, 0, 0]}
+    assert cache.stats["stale_hits"] == 1
+    refreshed.set()
+    assert wait_until(lambda: cache.stats["refreshes"] == 1, timeout=5.0)
+    assert cache.get() == {"gripper": [0, 0, 150, 0, 0, 0]}
+
+
+def test_catalogs_are_parsed_from_simulated_websocket(xarm_ws, ws_server):
+    tcp_configs = xarm_ws.get_tcp_configs()
+    assert set(tcp_configs) == set(ws_server.tcp_configs)
+    assert isinstance(tcp_configs["marker"], TCPOffset)
+    assert tcp_configs["marker"].z == pytest.approx(100.0)
+    assert isinstance(xarm_ws.get_base_configs()["base"], BaseOffset)
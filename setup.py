@@ -1,12 +1,17 @@
 #!/usr/bin/env python
-from setuptools import setup, find_packages
+from setuptools import setup
 
+# clients only need the generated code, grpcio-tools regenerates it (pip install cafebot_proto[build], make proto)
 setup(
     name='cafebot_proto',
-    version='0.1',
-    packages=find_packages(),
+    version='0.2',
+    packages=['cafebot_proto'],
+    package_data={'cafebot_proto': ['*.proto']},
     install_requires=[
         'grpcio',
-        'grpcio-tools',
-    ]
+        'protobuf>=4.21',
+    ],
+    extras_require={
+        'build': ['grpcio-tools'],
+    }
 )